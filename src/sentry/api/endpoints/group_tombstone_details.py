@@ -6,6 +6,7 @@ from sentry.api.api_publish_status import ApiPublishStatus
 from sentry.api.base import region_silo_endpoint
 from sentry.api.bases import ProjectEndpoint
 from sentry.api.exceptions import ResourceDoesNotExist
+from sentry.grouping.ingest.grouphashes import invalidate_grouphash_cache
 from sentry.models.grouphash import GroupHash
 from sentry.models.grouptombstone import GroupTombstone
 
@@ -40,6 +41,7 @@ class GroupTombstoneDetailsEndpoint(ProjectEndpoint):
             # will allow new events to be captured
             group_tombstone_id=None
         )
+        invalidate_grouphash_cache([project.id])
 
         tombstone.delete()
 
@@ -9,6 +9,7 @@ from rest_framework.response import Response
 
 from sentry import audit_log, eventstream
 from sentry.api.base import audit_logger
+from sentry.grouping.ingest.grouphashes import invalidate_grouphash_cache
 from sentry.issues.grouptype import GroupCategory
 from sentry.models.group import Group, GroupStatus
 from sentry.models.grouphash import GroupHash
@@ -52,6 +53,7 @@ def delete_group_list(
     GroupHash.objects.filter(project_id=project.id, group__id__in=group_ids).exclude(
         state=GroupHash.State.SPLIT
     ).delete()
+    invalidate_grouphash_cache([project.id])
 
     # We remove `GroupInbox` rows here so that they don't end up influencing queries for
     # `Group` instances that are pending deletion
@@ -0,0 +1,208 @@
+"""
+Bulk application of flushed buffer values.
+
+The regular flush path (``Buffer.process``) issues one ``UPDATE`` per buffered
+key. When a flush worker claims many keys at once, most of them are counter
+updates for ``Group`` and ``GroupRelease`` rows addressed by primary key, which
+can be applied together with a single ``UPDATE ... FROM (VALUES ...)`` per
+distinct set of columns.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import date, datetime
+from typing import Any, NamedTuple
+
+from django.db import connections, router, transaction
+from django.db.models import Field
+from django.db.models.signals import post_save
+from psycopg2.extras import execute_values
+
+from sentry.db import models
+from sentry.signals import buffer_incr_complete
+from sentry.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+#: Maximum number of rows sent in a single ``VALUES`` list.
+BULK_UPDATE_PAGE_SIZE = 500
+
+
+class BufferedUpdate(NamedTuple):
+    model: type[models.Model]
+    columns: dict[str, int]
+    filters: dict[str, str | datetime | date | int | float]
+    extra: dict[str, Any] | None
+    signal_only: bool | None
+
+
+def _get_bulk_models() -> tuple[type[models.Model], ...]:
+    from sentry.models.group import Group
+    from sentry.models.grouprelease import GroupRelease
+
+    return (Group, GroupRelease)
+
+
+def _get_primary_key(update: BufferedUpdate) -> int | None:
+    if len(update.filters) != 1:
+        return None
+    ((name, value),) = update.filters.items()
+    if name not in ("id", "pk") or not isinstance(value, int):
+        return None
+    return value
+
+
+def _has_score(update: BufferedUpdate) -> bool:
+    from sentry.models.group import Group
+
+    return (
+        update.model is Group
+        and "times_seen" in update.columns
+        and update.extra is not None
+        and isinstance(update.extra.get("last_seen"), datetime)
+    )
+
+
+def _group_key(update: BufferedUpdate) -> tuple[Any, ...]:
+    return (
+        update.model,
+        tuple(sorted(update.columns)),
+        tuple(sorted(update.extra or ())),
+        _has_score(update),
+    )
+
+
+def partition_updates(
+    updates: Sequence[BufferedUpdate],
+) -> tuple[dict[tuple[Any, ...], list[tuple[int, BufferedUpdate]]], list[BufferedUpdate]]:
+    """
+    Split updates into groups that can be applied with one bulk statement
+    each, and a remainder that has to go through ``Buffer.process`` one by
+    one.
+    """
+    bulk_models = _get_bulk_models()
+    groups: dict[tuple[Any, ...], list[tuple[int, BufferedUpdate]]] = defaultdict(list)
+    remainder: list[BufferedUpdate] = []
+    seen: set[tuple[type[models.Model], int]] = set()
+
+    for update in updates:
+        pk = _get_primary_key(update)
+        if (
+            update.signal_only
+            or update.model not in bulk_models
+            or pk is None
+            or (update.model, pk) in seen
+        ):
+            remainder.append(update)
+            continue
+        seen.add((update.model, pk))
+        groups[_group_key(update)].append((pk, update))
+
+    return groups, remainder
+
+
+def _get_concrete_field(model: type[models.Model], name: str) -> Field[Any, Any]:
+    field = model._meta.get_field(name)
+    assert isinstance(field, Field)
+    return field
+
+
+def bulk_update(
+    model: type[models.Model],
+    incr_columns: Sequence[str],
+    extra_columns: Sequence[str],
+    with_score: bool,
+    rows: Sequence[tuple[int, BufferedUpdate]],
+) -> None:
+    """
+    Apply buffered values for many rows of ``model`` with a single
+    ``UPDATE ... FROM (VALUES ...)`` statement.
+
+    Counter columns are incremented, extra columns are overwritten (last write
+    wins), and the ``Group`` score is recomputed the same way ``ScoreClause``
+    does for the per-row path. The rows are updated in a single transaction, so
+    if the statement fails none of them have been applied.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    table = quote(opts.db_table)
+    pk_field = opts.pk
+    assert pk_field is not None
+
+    fields = [_get_concrete_field(model, name) for name in (*incr_columns, *extra_columns)]
+    value_names = ["pk", *(f"c{i}" for i in range(len(fields)))]
+    casts = [pk_field.db_type(connection)] + [field.db_type(connection) for field in fields]
+    if with_score:
+        value_names.append("score_ts")
+        casts.append("bigint")
+
+    assignments = []
+    for i, field in enumerate(fields):
+        column = quote(field.column)
+        if i < len(incr_columns):
+            assignments.append(f"{column} = {table}.{column} + new_data.c{i}")
+        else:
+            assignments.append(f"{column} = new_data.c{i}")
+    if with_score:
+        times_seen = quote(_get_concrete_field(model, "times_seen").column)
+        times_seen_index = list(incr_columns).index("times_seen")
+        assignments.append(
+            f"{quote(_get_concrete_field(model, 'score').column)} = "
+            f"log({table}.{times_seen} + new_data.c{times_seen_index}) * 600 + new_data.score_ts"
+        )
+
+    query = (
+        f"UPDATE {table} SET {', '.join(assignments)} "
+        f"FROM (VALUES %s) AS new_data({', '.join(value_names)}) "
+        f"WHERE {table}.{quote(pk_field.column)} = new_data.pk"
+    )
+    template = "(" + ", ".join(f"%s::{cast}" for cast in casts) + ")"
+
+    values = []
+    for pk, update in rows:
+        extra = update.extra or {}
+        row: list[Any] = [pk]
+        for field in fields:
+            if field.name in update.columns:
+                row.append(update.columns[field.name])
+            else:
+                row.append(field.get_db_prep_save(extra[field.name], connection))
+        if with_score:
+            row.append(int(extra["last_seen"].timestamp()))
+        values.append(tuple(row))
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        execute_values(cursor, query, values, template=template, page_size=BULK_UPDATE_PAGE_SIZE)
+
+    # `Model.update` sends `post_save` so that cached instances (`Group` in
+    # particular) are refreshed. Mirror that with one query for the batch.
+    update_fields = [*incr_columns, *extra_columns] + (["score"] if with_score else [])
+    instances = model.objects.using(using).in_bulk([pk for pk, _ in rows])
+    for instance in instances.values():
+        post_save.send(
+            sender=model,
+            instance=instance,
+            created=False,
+            update_fields=update_fields,
+        )
+
+    for _, update in rows:
+        buffer_incr_complete.send_robust(
+            model=model,
+            columns=update.columns,
+            filters=update.filters,
+            extra=update.extra,
+            created=False,
+            sender=model,
+        )
+
+    metrics.distribution(
+        "buffer.bulk-update.rows",
+        len(rows),
+        tags={"model": model.__name__},
+    )
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import atexit
 import logging
 import pickle
 import threading
+import weakref
+from collections import defaultdict
 from collections.abc import Callable
 from datetime import date, datetime, timezone
 from enum import Enum
@@ -10,10 +13,12 @@ from time import time
 from typing import Any, TypeVar
 
 import rb
+from django.db import DatabaseError
 from django.utils.encoding import force_bytes, force_str
 from rediscluster import RedisCluster
 
 from sentry.buffer.base import Buffer
+from sentry.buffer.bulk import BufferedUpdate, bulk_update, partition_updates
 from sentry.db import models
 from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.utils import json, metrics
@@ -25,6 +30,7 @@ from sentry.utils.redis import (
     get_dynamic_cluster_from_options,
     is_instance_rb_cluster,
     is_instance_redis_cluster,
+    load_redis_script,
     validate_dynamic_cluster,
 )
 
@@ -33,6 +39,8 @@ _local_buffers_lock = threading.Lock()
 
 logger = logging.getLogger(__name__)
 
+claim_keys = load_redis_script("buffer/claim_keys.lua")
+
 T = TypeVar("T", str, bytes)
 # Debounce our JSON validation a bit in order to not cause too much additional
 # load everywhere
@@ -117,16 +125,162 @@ class PendingBuffer:
         return rv
 
 
+class _CoalescedIncr:
+    __slots__ = ("model", "filters", "columns", "extra", "signal_only", "count")
+
+    def __init__(
+        self, model: type[models.Model], filters: dict[str, models.Model | str | int]
+    ) -> None:
+        self.model = model
+        self.filters = filters
+        self.columns: dict[str, int] = {}
+        self.extra: dict[str, Any] = {}
+        self.signal_only: bool | None = None
+        self.count = 0
+
+
+class IncrCoalescer:
+    """
+    Merges `incr` calls for the same (model, filters) key inside a worker
+    before they are written to Redis.
+
+    Counter columns are summed, extra columns are last write wins and
+    `signal_only` sticks once set, which is exactly how the Redis hash behaves
+    when the calls are applied one after the other. Pending increments are
+    emitted as one merged `incr` per key once `window` seconds have passed
+    since the first buffered call, or as soon as `max_keys` distinct keys are
+    pending, whichever happens first.
+
+    Until then the increments only live in this process: `RedisBuffer.get`
+    sees the ones pending in the calling process but not those of other
+    workers, and they are lost if the process dies without running its exit
+    hooks. Pending increments of every coalescer are flushed on a clean exit.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[..., None],
+        window: float,
+        max_keys: int,
+    ) -> None:
+        assert window > 0
+        assert max_keys > 0
+        self._flush = flush
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._pending: dict[str, _CoalescedIncr] = {}
+        self._timer: threading.Timer | None = None
+        _coalescers.add(self)
+
+    def add(
+        self,
+        key: str,
+        model: type[models.Model],
+        columns: dict[str, int],
+        filters: dict[str, models.Model | str | int],
+        extra: dict[str, Any] | None,
+        signal_only: bool | None,
+    ) -> None:
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = _CoalescedIncr(model, filters)
+            for column, amount in columns.items():
+                entry.columns[column] = entry.columns.get(column, 0) + amount
+            if extra:
+                entry.extra.update(extra)
+            if signal_only is True:
+                entry.signal_only = True
+            entry.count += 1
+
+            full = len(self._pending) >= self.max_keys
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def get(self, key: str) -> dict[str, int]:
+        """
+        Returns the counters buffered locally for a key that have not been
+        written to Redis yet.
+        """
+        with self._lock:
+            entry = self._pending.get(key)
+            return dict(entry.columns) if entry is not None else {}
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return
+
+        received = 0
+        for entry in pending.values():
+            received += entry.count
+            try:
+                self._flush(
+                    entry.model,
+                    entry.columns,
+                    entry.filters,
+                    extra=entry.extra or None,
+                    signal_only=entry.signal_only,
+                )
+            except Exception:
+                logger.exception(
+                    "buffer.coalesce.flush-failed",
+                    extra={"model": entry.model.__name__, "count": entry.count},
+                )
+
+        metrics.incr("buffer.coalesce.received", amount=received, skip_internal=True)
+        metrics.incr("buffer.coalesce.emitted", amount=len(pending), skip_internal=True)
+        metrics.distribution("buffer.coalesce.ratio", received / len(pending))
+
+
+_coalescers: weakref.WeakSet[IncrCoalescer] = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_coalescers() -> None:
+    for coalescer in list(_coalescers):
+        coalescer.flush()
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions: int = 1, incr_batch_size: int = 2, **options: object):
+    def __init__(
+        self,
+        pending_partitions: int = 1,
+        incr_batch_size: int = 2,
+        bulk_flush: bool = False,
+        coalesce_window: float = 0,
+        coalesce_max_keys: int = 1000,
+        **options: object,
+    ):
         self.is_redis_cluster, self.cluster, options = get_dynamic_cluster_from_options(
             "SENTRY_BUFFER_OPTIONS", options
         )
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        # When enabled, every `process_incr` task claims its whole batch of
+        # keys at once and applies the updates with bulk SQL statements.
+        self.bulk_flush = bulk_flush
+        # When a window is configured, increments are merged per key inside
+        # the worker for up to that many seconds before they reach Redis.
+        self.coalescer = (
+            IncrCoalescer(self._incr, coalesce_window, coalesce_max_keys)
+            if coalesce_window > 0
+            else None
+        )
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
 
@@ -248,8 +402,11 @@ class RedisBuffer(Buffer):
             pipe.hget(key, f"i+{col}")
         results = pipe.execute()
 
+        local = self.coalescer.get(key) if self.coalescer is not None else {}
+
         return {
-            col: (int(results[i]) if results[i] is not None else 0) for i, col in enumerate(columns)
+            col: (int(results[i]) if results[i] is not None else 0) + local.get(col, 0)
+            for i, col in enumerate(columns)
         }
 
     def get_redis_connection(self, key: str, transaction: bool = True) -> Pipeline:
@@ -333,7 +490,26 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
             - Perform a set on signal_only (only if True)
         - Add hashmap key to pending flushes
+
+        If coalescing is enabled the increment is merged into the local
+        `IncrCoalescer` instead, which writes it to Redis later on.
         """
+        if self.coalescer is not None:
+            self.coalescer.add(
+                self._make_key(model, filters), model, columns, filters, extra, signal_only
+            )
+            return
+
+        self._incr(model, columns, filters, extra, signal_only)
+
+    def _incr(
+        self,
+        model: type[models.Model],
+        columns: dict[str, int],
+        filters: dict[str, models.Model | str | int],
+        extra: dict[str, Any] | None = None,
+        signal_only: bool | None = None,
+    ) -> None:
         key = self._make_key(model, filters)
         pending_key = self._make_pending_key_from_key(key)
         # We can't use conn.map() due to wanting to support multiple pending
@@ -432,6 +608,9 @@ class RedisBuffer(Buffer):
             batch_keys = [key]
 
         if batch_keys is not None:
+            if self.bulk_flush:
+                self._process_bulk_incr(batch_keys)
+                return
             for key in batch_keys:
                 self._process_single_incr(key)
 
@@ -472,29 +651,103 @@ class RedisBuffer(Buffer):
                 logger.debug("buffer.revoked.empty", extra={"redis_key": key})
                 return
 
-            model = import_string(force_str(values.pop("m")))
-
-            if values["f"].startswith(b"{" if not self.is_redis_cluster else "{"):
-                filters = self._load_values(json.loads(force_str(values.pop("f"))))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(force_bytes(values.pop("f")))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"[" if not self.is_redis_cluster else "["):
-                        extra_values[k[2:]] = self._load_value(json.loads(force_str(v)))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(force_bytes(v))
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            self._process(model, incr_values, filters, extra_values, signal_only)
+            self._process(*self._load_buffered_update(values))
         finally:
             client.delete(lock_key)
+
+    def _load_buffered_update(self, values: dict[str, Any]) -> BufferedUpdate:
+        """
+        Decodes the contents of a buffer hash (with string field names) into
+        the arguments expected by `Buffer.process`.
+        """
+        model = import_string(force_str(values.pop("m")))
+
+        if values["f"].startswith(b"{" if not self.is_redis_cluster else "{"):
+            filters = self._load_values(json.loads(force_str(values.pop("f"))))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(force_bytes(values.pop("f")))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"[" if not self.is_redis_cluster else "["):
+                    extra_values[k[2:]] = self._load_value(json.loads(force_str(v)))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(force_bytes(v))
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return BufferedUpdate(model, incr_values, filters, extra_values, signal_only)
+
+    def _claim_keys(self, keys: list[str]) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Reads and removes the buffer hashes for all of the given keys.
+
+        With a blaster (rb) cluster the keys are grouped by host, and every
+        host claims its share with a single script invocation. Redis Cluster
+        scripts cannot span hash slots, so there the keys are claimed with one
+        non-transactional pipeline instead.
+        """
+        claimed: list[tuple[str, dict[str, Any]]] = []
+
+        if is_instance_redis_cluster(self.cluster, self.is_redis_cluster):
+            pipe = self.cluster.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(key)
+                pipe.zrem(self._make_pending_key_from_key(key), key)
+                pipe.delete(key)
+            results = pipe.execute()
+            for i, key in enumerate(keys):
+                claimed.append((key, results[i * 3]))
+        elif is_instance_rb_cluster(self.cluster, self.is_redis_cluster):
+            router = self.cluster.get_router()
+            keys_by_host: dict[tuple[int, str], list[str]] = defaultdict(list)
+            for key in keys:
+                host_and_pending = (
+                    router.get_host_for_key(key),
+                    self._make_pending_key_from_key(key),
+                )
+                keys_by_host[host_and_pending].append(key)
+
+            for (host, pending_key), host_keys in keys_by_host.items():
+                responses = claim_keys(
+                    [pending_key, *host_keys], [], self.cluster.get_local_client(host)
+                )
+                for key, response in zip(host_keys, responses):
+                    claimed.append((key, dict(zip(response[::2], response[1::2]))))
+        else:
+            raise AssertionError("unreachable")
+
+        return claimed
+
+    def _process_bulk_incr(self, keys: list[str]) -> None:
+        updates = []
+        for key, values in self._claim_keys(keys):
+            values = {force_str(k): v for k, v in values.items()}
+            if not values:
+                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+                logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+                continue
+            updates.append(self._load_buffered_update(values))
+
+        groups, remainder = partition_updates(updates)
+        for (model, incr_columns, extra_columns, with_score), rows in groups.items():
+            try:
+                bulk_update(model, incr_columns, extra_columns, with_score, rows)
+            except DatabaseError:
+                # The claimed keys are already gone from Redis, so apply the
+                # rows one at a time instead of dropping the whole group.
+                logger.exception("buffer.bulk-update.failed", extra={"model": model.__name__})
+                metrics.incr("buffer.bulk-update.failed", tags={"model": model.__name__})
+                remainder.extend(update for _, update in rows)
+
+        for update in remainder:
+            self._process(*update)
+
+        metrics.distribution("buffer.bulk-flush.keys", len(keys))
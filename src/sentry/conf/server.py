@@ -134,6 +134,8 @@ SENTRY_MONITORS_REDIS_CLUSTER = "default"
 SENTRY_STATISTICAL_DETECTORS_REDIS_CLUSTER = "default"
 SENTRY_METRIC_META_REDIS_CLUSTER = "default"
 SENTRY_ESCALATION_THRESHOLDS_REDIS_CLUSTER = "default"
+SENTRY_GROUPING_HASH_CACHE_REDIS_CLUSTER = "default"
+SENTRY_GROUPHASH_CACHE_REDIS_CLUSTER = "default"
 SENTRY_SPAN_BUFFER_CLUSTER = "default"
 
 # Hosts that are allowed to use system token authentication.
@@ -779,6 +781,7 @@ CELERY_IMPORTS = (
     "sentry.tasks.servicehooks",
     "sentry.tasks.store",
     "sentry.tasks.symbolication",
+    "sentry.tasks.tsdb",
     "sentry.tasks.unmerge",
     "sentry.tasks.update_user_reports",
     "sentry.tasks.user_report",
@@ -914,6 +917,7 @@ CELERY_QUEUES_REGION = [
     Queue("similarity.index", routing_key="similarity.index"),
     Queue("sleep", routing_key="sleep"),
     Queue("stats", routing_key="stats"),
+    Queue("tsdb.compact_rollups", routing_key="tsdb.compact_rollups"),
     Queue("subscriptions", routing_key="subscriptions"),
     Queue(
         "symbolications.compute_low_priority_projects",
@@ -1021,6 +1025,12 @@ CELERYBEAT_SCHEDULE_REGION = {
         "schedule": crontab(minute="*/1"),
         "options": {"expires": 10, "queue": "buffers.process_pending_batch"},
     },
+    "compact-tsdb-rollups": {
+        "task": "sentry.tasks.tsdb.compact_rollups",
+        # Run every 1 minute
+        "schedule": crontab(minute="*/1"),
+        "options": {"expires": 60, "queue": "tsdb.compact_rollups"},
+    },
     "sync-options": {
         "task": "sentry.tasks.options.sync_options",
         # Run every 10 seconds
@@ -2267,6 +2277,9 @@ SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
 # Node storage backend
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS: dict[str, Any] = {}
+# Directory holding trained zstd dictionaries for node payloads. Dictionaries
+# must never be removed while nodes compressed with them are still retained.
+SENTRY_NODESTORE_DICTIONARIES_DIR: str | None = None
 
 # Node storage backend used for ArtifactBundle indexing (aka FlatFileIndex aka BundleIndex)
 SENTRY_INDEXSTORE = "sentry.nodestore.django.DjangoNodeStorage"
@@ -86,6 +86,12 @@ def ingest_replay_recordings_buffered_options() -> list[click.Option]:
             type=int,
             default=1,
         ),
+        click.Option(
+            ["--max-upload-workers", "max_upload_workers"],
+            type=int,
+            default=32,
+            help="Maximum number of recording segments uploaded concurrently.",
+        ),
     ]
     return options
 
@@ -10,7 +10,7 @@ from uuid import uuid4
 from django.db.models.signals import post_delete
 from django.utils.functional import cached_property
 
-from sentry import nodestore
+from sentry import nodestore, options
 from sentry.db.models.utils import Creator
 from sentry.utils import json
 from sentry.utils.canonical import CANONICAL_TYPES, CanonicalKeyDict
@@ -153,6 +153,11 @@ class NodeData(MutableMapping):
         if isinstance(to_write, CANONICAL_TYPES):
             to_write = dict(to_write.items())
 
+        if options.get("eventstore.compressor.enabled"):
+            from sentry.eventstore import compressor
+
+            to_write = compressor.deduplicate_and_store(to_write)
+
         subkeys = subkeys or {}
         subkeys[None] = to_write
 
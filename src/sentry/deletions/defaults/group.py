@@ -141,6 +141,10 @@ class GroupDeletionTask(ModelDeletionTask):
 
         self.delete_children(child_relations)
 
+        from sentry.grouping.ingest.grouphashes import invalidate_grouphash_cache
+
+        invalidate_grouphash_cache({group.project_id for group in instance_list})
+
         # Remove group objects with children removed.
         return self.delete_instance_bulk(instance_list)
 
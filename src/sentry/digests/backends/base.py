@@ -1,5 +1,6 @@
 import logging
-from collections.abc import Iterable, Mapping
+from collections.abc import Iterable, Mapping, Sequence
+from contextlib import ExitStack, contextmanager
 from typing import TYPE_CHECKING, Any
 
 from sentry.utils.imports import import_string
@@ -59,7 +60,16 @@ class Backend(Service):
     be transitioned to "waiting" instead.)
     """
 
-    __all__ = ("add", "delete", "digest", "enabled", "maintenance", "schedule", "validate")
+    __all__ = (
+        "add",
+        "delete",
+        "digest",
+        "digest_many",
+        "enabled",
+        "maintenance",
+        "schedule",
+        "validate",
+    )
 
     def __init__(self, **options: Any) -> None:
         # The ``minimum_delay`` option defines the default minimum amount of
@@ -169,6 +179,36 @@ class Backend(Service):
         """
         raise NotImplementedError
 
+    @contextmanager
+    def digest_many(
+        self,
+        keys: Sequence[str],
+        minimum_delays: Mapping[str, int | None] | None = None,
+    ) -> Any:
+        """
+        Extract records from several timelines at once.
+
+        This method acts as a context manager like ``digest``. The target of
+        the ``as`` clause is a mapping of timeline keys to their records.
+        Timelines that are not in the "ready" state are left out of the
+        mapping instead of raising ``InvalidState``. Minimum delays can be
+        provided per timeline key, otherwise the backend default is used.
+
+        Backends that can claim timelines more efficiently in bulk should
+        override this method.
+        """
+        minimum_delays = minimum_delays or {}
+        with ExitStack() as stack:
+            records_by_key = {}
+            for key in keys:
+                try:
+                    records_by_key[key] = stack.enter_context(
+                        self.digest(key, minimum_delay=minimum_delays.get(key))
+                    )
+                except InvalidState as error:
+                    logger.info("Skipped digest delivery: %s", error)
+            yield records_by_key
+
     def schedule(
         self, deadline: float, timestamp: float | None = None
     ) -> Iterable["ScheduleEntry"]:
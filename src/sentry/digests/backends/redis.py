@@ -1,6 +1,7 @@
 import logging
 import time
-from collections.abc import Iterable
+from collections import defaultdict
+from collections.abc import Iterable, Mapping, Sequence
 from contextlib import contextmanager
 from typing import Any
 
@@ -9,7 +10,7 @@ from redis.exceptions import ResponseError
 
 from sentry.digests import Record, ScheduleEntry
 from sentry.digests.backends.base import Backend, InvalidState
-from sentry.utils.locking.backends.redis import RedisLockBackend
+from sentry.utils.locking.backends.redis import RedisLockBackend, delete_lock
 from sentry.utils.locking.lock import Lock
 from sentry.utils.locking.manager import LockManager
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options, load_redis_script
@@ -141,6 +142,33 @@ class RedisBackend(Backend):
             )
         )
 
+    def _decode_records(
+        self, key: str, response: Iterable[tuple[bytes, bytes | None, bytes]]
+    ) -> tuple[list[Record], list[Record]]:
+        records = [
+            Record(
+                record_key.decode(),
+                self.codec.decode(value) if value is not None else None,
+                float(timestamp),
+            )
+            for record_key, value, timestamp in response
+        ]
+
+        # If the record value is `None`, this means the record data was
+        # missing (it was presumably evicted by Redis) so we don't need to
+        # return it here.
+        filtered_records = [record for record in records if record.value is not None]
+        if len(records) != len(filtered_records):
+            logger.warning(
+                "Filtered out missing records when fetching digest",
+                extra={
+                    "key": key,
+                    "record_count": len(records),
+                    "filtered_record_count": len(filtered_records),
+                },
+            )
+        return records, filtered_records
+
     def __schedule_partition(
         self, host: int, deadline: float, timestamp: float
     ) -> Iterable[tuple[bytes, float]]:
@@ -217,28 +245,7 @@ class RedisBackend(Backend):
                 else:
                     raise
 
-            records = [
-                Record(
-                    key.decode(),
-                    self.codec.decode(value) if value is not None else None,
-                    float(timestamp),
-                )
-                for key, value, timestamp in response
-            ]
-
-            # If the record value is `None`, this means the record data was
-            # missing (it was presumably evicted by Redis) so we don't need to
-            # return it here.
-            filtered_records = [record for record in records if record.value is not None]
-            if len(records) != len(filtered_records):
-                logger.warning(
-                    "Filtered out missing records when fetching digest",
-                    extra={
-                        "key": key,
-                        "record_count": len(records),
-                        "filtered_record_count": len(filtered_records),
-                    },
-                )
+            records, filtered_records = self._decode_records(key, response)
             yield filtered_records
 
             script(
@@ -248,6 +255,123 @@ class RedisBackend(Backend):
                 connection,
             )
 
+    @contextmanager
+    def digest_many(
+        self,
+        keys: Sequence[str],
+        minimum_delays: Mapping[str, int | None] | None = None,
+        timestamp: float | None = None,
+    ) -> Any:
+        if minimum_delays is None:
+            minimum_delays = {}
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        router = self.cluster.get_router()
+
+        keys_by_host: dict[int, list[str]] = defaultdict(list)
+        for key in keys:
+            keys_by_host[router.get_host_for_key(f"{self.namespace}:t:{key}")].append(key)
+
+        # The timeline locks of a host are all taken, and released, in a single
+        # pipeline. They live on the same host as the timelines they guard.
+        lock_backend = self.locks.backend
+        locked_keys_by_host: dict[int, list[str]] = {}
+        try:
+            for host, host_keys in keys_by_host.items():
+                with self.cluster.get_local_client(host).pipeline(transaction=False) as pipeline:
+                    for key in host_keys:
+                        pipeline.set(
+                            lock_backend.prefix_key(f"{self.namespace}:t:{key}"),
+                            lock_backend.uuid,
+                            ex=30,
+                            nx=True,
+                        )
+                    acquired = pipeline.execute(raise_on_error=False)
+
+                locked_keys_by_host[host] = []
+                for key, response in zip(host_keys, acquired):
+                    if response is True:
+                        locked_keys_by_host[host].append(key)
+                    else:
+                        logger.info("Skipped digest delivery: unable to lock timeline %s", key)
+
+            records_by_key: dict[str, list[Record]] = {}
+            filtered_records_by_key: dict[str, list[Record]] = {}
+            for host, host_keys in locked_keys_by_host.items():
+                with self.cluster.get_local_client(host).pipeline(transaction=False) as pipeline:
+                    for key in host_keys:
+                        script(
+                            [key],
+                            [
+                                "DIGEST_OPEN",
+                                self.namespace,
+                                self.ttl,
+                                timestamp,
+                                key,
+                                self.capacity if self.capacity else -1,
+                            ],
+                            pipeline,
+                        )
+                    responses = pipeline.execute(raise_on_error=False)
+
+                for key, response in zip(host_keys, responses):
+                    if not isinstance(response, Exception):
+                        records, filtered_records = self._decode_records(key, response)
+                        records_by_key[key] = records
+                        filtered_records_by_key[key] = filtered_records
+                    elif "err(invalid_state):" in str(response):
+                        logger.info("Skipped digest delivery: %s is not in the ready state.", key)
+                    else:
+                        logger.error(
+                            "Failed to open digest %s due to error: %s",
+                            key,
+                            response,
+                            exc_info=response,
+                        )
+
+            yield filtered_records_by_key
+
+            for host, host_keys in locked_keys_by_host.items():
+                with self.cluster.get_local_client(host).pipeline(transaction=False) as pipeline:
+                    for key in host_keys:
+                        if key not in records_by_key:
+                            continue
+                        minimum_delay = minimum_delays.get(key)
+                        if minimum_delay is None:
+                            minimum_delay = self.minimum_delay
+                        script(
+                            [key],
+                            [
+                                "DIGEST_CLOSE",
+                                self.namespace,
+                                self.ttl,
+                                timestamp,
+                                key,
+                                minimum_delay,
+                                *(record.key for record in records_by_key[key]),
+                            ],
+                            pipeline,
+                        )
+                    pipeline.execute()
+        finally:
+            for host, host_keys in locked_keys_by_host.items():
+                if not host_keys:
+                    continue
+                with self.cluster.get_local_client(host).pipeline(transaction=False) as pipeline:
+                    for key in host_keys:
+                        delete_lock(
+                            [lock_backend.prefix_key(f"{self.namespace}:t:{key}")],
+                            [lock_backend.uuid],
+                            pipeline,
+                        )
+                    for key, response in zip(host_keys, pipeline.execute(raise_on_error=False)):
+                        if isinstance(response, Exception):
+                            logger.warning(
+                                "Failed to release lock of timeline %s: %s", key, response
+                            )
+
     def delete(self, key: str, timestamp: float | None = None) -> None:
         if timestamp is None:
             timestamp = time.time()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import functools
 import itertools
 import logging
@@ -24,11 +25,11 @@ Notification = namedtuple(
 )
 
 
-def split_key(
+def _parse_key(
     key: str,
-) -> tuple[Project, ActionTargetType, str | None, FallthroughChoiceType | None]:
+) -> tuple[int, ActionTargetType, str | None, FallthroughChoiceType | None]:
     key_parts = key.split(":", 5)
-    project_id = key_parts[2]
+    project_id = int(key_parts[2])
     # XXX: We transitioned to new style keys (len == 5) a while ago on
     # sentry.io. But self-hosted users might transition at any time, so we need
     # to keep this transition code around for a while, maybe indefinitely.
@@ -47,9 +48,32 @@ def split_key(
         target_type = ActionTargetType.ISSUE_OWNERS
         target_identifier = None
         fallthrough_choice = None
+    return project_id, target_type, target_identifier, fallthrough_choice
+
+
+def split_key(
+    key: str,
+) -> tuple[Project, ActionTargetType, str | None, FallthroughChoiceType | None]:
+    project_id, target_type, target_identifier, fallthrough_choice = _parse_key(key)
     return Project.objects.get(pk=project_id), target_type, target_identifier, fallthrough_choice
 
 
+def split_keys(
+    keys: Sequence[str],
+) -> Mapping[str, tuple[Project, ActionTargetType, str | None, FallthroughChoiceType | None]]:
+    """
+    Like `split_key`, but loads the projects of all keys with a single query.
+    Keys of projects that no longer exist are left out of the result.
+    """
+    parsed = {key: _parse_key(key) for key in keys}
+    projects = Project.objects.in_bulk({project_id for project_id, *_ in parsed.values()})
+    return {
+        key: (projects[project_id], *rest)
+        for key, (project_id, *rest) in parsed.items()
+        if project_id in projects
+    }
+
+
 def unsplit_key(
     project: Project,
     target_type: ActionTargetType,
@@ -75,6 +99,59 @@ def event_to_record(
 
 
 def fetch_state(project: Project, records: Sequence[Record]) -> Mapping[str, Any]:
+    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
+    return {
+        "project": project,
+        "groups": groups,
+        "rules": Rule.objects.in_bulk(
+            itertools.chain.from_iterable(record.value.rules for record in records)
+        ),
+        **fetch_counts(project, records, list(groups.keys())),
+    }
+
+
+def fetch_state_many(
+    digests: Sequence[tuple[Project, Sequence[Record]]]
+) -> list[Mapping[str, Any]]:
+    """
+    Equivalent to calling `fetch_state` for each project and its records, but
+    loads the groups and rules of all digests with one query each.
+    """
+    all_records = [record for _, records in digests for record in records]
+    groups = Group.objects.in_bulk({record.value.event.group_id for record in all_records})
+    rules = Rule.objects.in_bulk(
+        itertools.chain.from_iterable(record.value.rules for record in all_records)
+    )
+
+    states = []
+    for project, records in digests:
+        # Groups are annotated with the counts of each digest by
+        # `attach_state`, so every digest needs its own copies.
+        digest_groups = {
+            group_id: copy.copy(groups[group_id])
+            for group_id in {record.value.event.group_id for record in records}
+            if group_id in groups
+        }
+        digest_rules = {
+            rule_id: rules[rule_id]
+            for record in records
+            for rule_id in record.value.rules
+            if rule_id in rules
+        }
+        states.append(
+            {
+                "project": project,
+                "groups": digest_groups,
+                "rules": digest_rules,
+                **fetch_counts(project, records, list(digest_groups.keys())),
+            }
+        )
+    return states
+
+
+def fetch_counts(
+    project: Project, records: Sequence[Record], group_ids: list[int]
+) -> Mapping[str, Any]:
     # This reads a little strange, but remember that records are returned in
     # reverse chronological order, and we query the database in chronological
     # order.
@@ -82,24 +159,18 @@ def fetch_state(project: Project, records: Sequence[Record]) -> Mapping[str, Any
     start = records[-1].datetime
     end = records[0].datetime
 
-    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
     tenant_ids = {"organization_id": project.organization_id}
     return {
-        "project": project,
-        "groups": groups,
-        "rules": Rule.objects.in_bulk(
-            itertools.chain.from_iterable(record.value.rules for record in records)
-        ),
         "event_counts": tsdb.get_sums(
             TSDBModel.group,
-            list(groups.keys()),
+            group_ids,
             start,
             end,
             tenant_ids=tenant_ids,
         ),
         "user_counts": tsdb.get_distinct_counts_totals(
             TSDBModel.users_affected_by_group,
-            list(groups.keys()),
+            group_ids,
             start,
             end,
             tenant_ids=tenant_ids,
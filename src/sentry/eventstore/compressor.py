@@ -3,14 +3,30 @@ Eventstore compressor is responsible for pulling out repeating data across
 events such that they can be stored only once. For example SDK modules list, or
 debug_meta.
 
-This is not used in production yet, we are still collecting metrics there.
+Deduplicated chunks are content-addressed: they are stored in nodestore under
+the checksum of their contents and expire on their own. A chunk is rewritten
+(refreshing its TTL) at most once per `CHUNK_REFRESH_INTERVAL`, so as long as
+the chunk TTL exceeds the event TTL by that interval, every event outlives the
+chunks it references.
+
+This is only used when the `eventstore.compressor.enabled` option is set.
+Payloads are reassembled by nodestore itself when they are read, so readers
+never see the deduplicated form.
 """
 from __future__ import annotations
 
+import copy
 import hashlib
+from collections.abc import Callable, Mapping
+from datetime import timedelta
 from typing import Any
 
-from sentry.utils import json
+from django.core.cache import cache
+
+from sentry import nodestore, options
+from sentry.utils import json, metrics
+
+CHUNK_REFRESH_INTERVAL = timedelta(days=1)
 
 _INTERFACES = {}
 
@@ -53,6 +69,91 @@ class DebugMeta:
         return data
 
 
+@_deduplicate_interface("modules")
+class Modules:
+    @staticmethod
+    def encode(data):
+        return data, None
+
+    @staticmethod
+    def decode(dedup, data):
+        return dedup
+
+
+@_deduplicate_interface("contexts")
+class Contexts:
+    # Contexts that describe the environment rather than the individual event,
+    # and are therefore likely to repeat verbatim.
+    _DEDUP_CONTEXTS = ("browser", "culture", "gpu", "os", "runtime")
+
+    @staticmethod
+    def encode(data):
+        dedup = {}
+
+        if data:
+            for name in Contexts._DEDUP_CONTEXTS:
+                if name in data:
+                    dedup[name] = data.pop(name)
+
+        return dedup, data
+
+    @staticmethod
+    def decode(dedup, data):
+        if data is not None:
+            data.update(dedup)
+
+        return data
+
+
+def _pop_frames(container, field):
+    stacktrace = container.get(field) if isinstance(container, dict) else None
+    if isinstance(stacktrace, dict) and isinstance(stacktrace.get("frames"), list):
+        return stacktrace.pop("frames")
+    return None
+
+
+def _restore_frames(container, field, frames):
+    if frames is not None:
+        container[field]["frames"] = frames
+
+
+@_deduplicate_interface("exception", "threads")
+class Stacktraces:
+    _DEDUP_FIELDS = ("stacktrace", "raw_stacktrace")
+
+    @staticmethod
+    def encode(data):
+        dedup: dict[str, list[list[Any] | None]] = {}
+
+        if data:
+            for value in data.get("values") or []:
+                for field in Stacktraces._DEDUP_FIELDS:
+                    dedup.setdefault(field, []).append(_pop_frames(value, field))
+
+        return dedup, data
+
+    @staticmethod
+    def decode(dedup, data):
+        if data:
+            for i, value in enumerate(data.get("values") or []):
+                for field, arr in dedup.items():
+                    _restore_frames(value, field, arr[i])
+
+        return data
+
+
+@_deduplicate_interface("stacktrace")
+class Stacktrace:
+    @staticmethod
+    def encode(data):
+        return _pop_frames({"stacktrace": data}, "stacktrace"), data
+
+    @staticmethod
+    def decode(dedup, data):
+        _restore_frames({"stacktrace": data}, "stacktrace", dedup)
+        return data
+
+
 def deduplicate(data):
     patchsets = []
     extra_keys = {}
@@ -84,8 +185,85 @@ def assemble(data, get_extra_keys):
     deduplicated_interfaces = get_extra_keys(checksums)
 
     for key, checksum, inlined in data["__nodestore_patchsets"]:
+        if checksum not in deduplicated_interfaces:
+            # The chunk has expired or was never written. Keep whatever was
+            # inlined rather than failing to load the event altogether.
+            metrics.incr("eventstore.compressor.missing_chunk", tags={"interface": key})
+            data[key] = inlined
+            continue
         deduplicated = deduplicated_interfaces[checksum]
         data[key] = _INTERFACES[key].decode(deduplicated, inlined)
 
     del data["__nodestore_patchsets"]
     return data
+
+
+def _chunk_node_id(checksum: str) -> str:
+    return f"dedup:{checksum}"
+
+
+def deduplicate_and_store(data: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Split the repeating interfaces out of an event payload, write them to
+    nodestore as content-addressed chunks and return the remaining payload.
+    The given payload is left untouched.
+    """
+    payload = dict(data)
+    for key in _INTERFACES:
+        if key in payload:
+            payload[key] = copy.deepcopy(payload[key])
+
+    payload, extra_keys = deduplicate(payload)
+
+    ttl = timedelta(days=options.get("eventstore.compressor.chunk-ttl-days"))
+    bytes_saved = 0
+    for checksum, value in extra_keys.items():
+        bytes_saved += len(json.dumps(value))
+        marker = f"eventstore.compressor:{checksum}"
+        if cache.add(marker, 1, int(CHUNK_REFRESH_INTERVAL.total_seconds())):
+            try:
+                nodestore.backend.set(_chunk_node_id(checksum), value, ttl=ttl)
+            except Exception:
+                cache.delete(marker)
+                raise
+            metrics.incr("eventstore.compressor.chunk_written")
+
+    metrics.distribution("eventstore.compressor.bytes_saved", bytes_saved, unit="byte")
+    return payload
+
+
+def get_stored_extra_keys(
+    checksums: list[str],
+    get_multi: Callable[[list[str]], Mapping[str, Any]] | None = None,
+) -> dict[str, Any]:
+    if get_multi is None:
+        get_multi = nodestore.backend.get_multi
+    node_ids = {_chunk_node_id(checksum): checksum for checksum in checksums}
+    return {
+        node_ids[node_id]: value
+        for node_id, value in get_multi(list(node_ids)).items()
+        if value is not None
+    }
+
+
+def assemble_many(
+    items: dict[str, Any], get_multi: Callable[[list[str]], Mapping[str, Any]]
+) -> None:
+    """
+    Reassemble all deduplicated payloads in `items` in place, fetching the
+    chunks of all of them with a single `get_multi` call.
+    """
+    patched = {
+        id: data
+        for id, data in items.items()
+        if isinstance(data, dict) and data.get("__nodestore_patchsets")
+    }
+    if not patched:
+        return
+
+    checksums = {
+        checksum for data in patched.values() for _, checksum, _ in data["__nodestore_patchsets"]
+    }
+    chunks = get_stored_extra_keys(list(checksums), get_multi)
+    for id, data in patched.items():
+        items[id] = assemble(data, lambda _: chunks)
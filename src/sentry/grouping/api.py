@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import re
 from collections.abc import Sequence
 from dataclasses import dataclass
@@ -233,13 +234,19 @@ def get_fingerprinting_config_for_project(
     Returns the fingerprinting rules for a project.
     Merges the project's custom fingerprinting rules (if any) with the default built-in rules.
     """
+    bases = get_projects_default_fingerprinting_bases(project, config_id=config_id)
+    rules = project.get_option("sentry:fingerprinting_rules")
+    return _load_fingerprinting_rules(rules or "", tuple(bases or ()))
+
 
+@functools.lru_cache(maxsize=1000)
+def _load_fingerprinting_rules(rules: str, bases: tuple[str, ...]) -> FingerprintingRules:
+    # Rules are parsed (and their index compiled, see `FingerprintingRules.get_index`)
+    # only once per process for every distinct combination of rules and bases.
     from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
 
-    bases = get_projects_default_fingerprinting_bases(project, config_id=config_id)
-    rules = project.get_option("sentry:fingerprinting_rules")
     if not rules:
-        return FingerprintingRules([], bases=bases)
+        return FingerprintingRules([], bases=list(bases))
 
     from sentry.utils.cache import cache
     from sentry.utils.hashlib import md5_text
@@ -247,12 +254,12 @@ def get_fingerprinting_config_for_project(
     cache_key = "fingerprinting-rules:" + md5_text(rules).hexdigest()
     rv = cache.get(cache_key)
     if rv is not None:
-        return FingerprintingRules.from_json(rv, bases=bases)
+        return FingerprintingRules.from_json(rv, bases=list(bases))
 
     try:
-        rv = FingerprintingRules.from_config_string(rules, bases=bases)
+        rv = FingerprintingRules.from_config_string(rules, bases=list(bases))
     except InvalidFingerprintingConfig:
-        rv = FingerprintingRules([], bases=bases)
+        rv = FingerprintingRules([], bases=list(bases))
     cache.set(cache_key, rv.to_json())
     return rv
 
@@ -11,6 +11,7 @@ from parsimonious.exceptions import ParseError
 from parsimonious.grammar import Grammar
 from parsimonious.nodes import NodeVisitor
 
+from sentry import options
 from sentry.grouping.utils import get_rule_bool
 from sentry.stacktraces.functions import get_function_name_for_frame
 from sentry.stacktraces.platform import get_behavior_family_for_platform
@@ -20,6 +21,9 @@ from sentry.utils.safe import get_path
 from sentry.utils.strings import unescape_string
 from sentry.utils.tag_normalization import normalized_sdk_tag_from_event
 
+if TYPE_CHECKING:
+    from sentry.grouping.fingerprinting.index import RuleIndex
+
 logger = logging.getLogger(__name__)
 
 VERSION = 1
@@ -92,7 +96,7 @@ class EventAccess:
                 self._messages.append({"message": message})
         return self._messages
 
-    def get_log_info(self) -> list[str]:
+    def get_log_info(self) -> list[dict[str, str]]:
         if self._log_info is None:
             log_info = {}
             logger = get_path(self.event, "logger", filter=True)
@@ -136,8 +140,7 @@ class EventAccess:
     def get_frames(self) -> list[dict[str, object]]:
         if self._frames is None:
             self._frames = []
-
-        find_stack_frames(self.event.data, self._push_frame)
+            find_stack_frames(self.event.data, self._push_frame)
         return self._frames
 
     def get_toplevel(self) -> list[dict[str, str]]:
@@ -185,6 +188,7 @@ class FingerprintingRules:
         self.rules = rules
         self.changelog = changelog
         self.bases = bases or []
+        self._index: RuleIndex | None = None
 
     def iter_rules(self, include_builtin: bool = True) -> Generator[Rule, None, None]:
         if self.rules:
@@ -194,10 +198,26 @@ class FingerprintingRules:
                 base_rules = FINGERPRINTING_BASES.get(base, [])
                 yield from base_rules
 
+    def get_index(self) -> RuleIndex:
+        """
+        Returns the compiled index of all rules, including built-in ones.
+        """
+        if self._index is None:
+            from sentry.grouping.fingerprinting.index import RuleIndex
+
+            self._index = RuleIndex(list(self.iter_rules()))
+        return self._index
+
     def get_fingerprint_values_for_event(self, event: dict[str, object]) -> None | object:
         if not (self.bases or self.rules):
             return
         access = EventAccess(event)
+        if options.get("grouping.fingerprinting.indexed-rules"):
+            match = self.get_index().get_matching_rule(access)
+            if match is None:
+                return None
+            rule, new_values = match
+            return (rule,) + new_values
         for rule in self.iter_rules():
             new_values = rule.get_fingerprint_values_for_event_access(access)
             if new_values is not None:
@@ -0,0 +1,189 @@
+"""
+Indexed evaluation of fingerprinting rules.
+
+Evaluating a rule set means testing every rule against the event until one
+matches, with at least one glob match per matcher. For projects with hundreds
+of rules most of that work is wasted: a rule like ``type:DatabaseError`` can
+only ever match events that have an exception of exactly that type.
+
+`RuleIndex` takes advantage of that. For every rule it picks the positive
+matcher with the longest literal prefix (the part of the pattern before the
+first glob character) and files the rule under that prefix in a trie per
+matcher key. To evaluate an event, all of its values for the indexed keys are
+looked up in the tries, which yields the rules that can possibly match. Those
+candidates, along with all rules that couldn't be indexed, are then tested in
+their original order using the regular matchers, so the result is always the
+same as the one of the linear scan.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sentry.grouping.fingerprinting import EventAccess, Match, Rule
+
+GLOB_CHARS = frozenset("*?[]{}\\")
+
+#: Matcher keys that are compared to plain values with `glob_match`, mapped to
+#: whether the comparison ignores case. Paths, packages and releases are
+#: normalized before matching, so they are never indexed.
+GLOB_KEYS = {
+    "type": False,
+    "value": True,
+    "message": True,
+    "logger": False,
+    "level": True,
+    "module": False,
+    "function": False,
+}
+
+#: Matcher keys whose pattern is a comma-separated list of exact values.
+FLAG_KEYS = ("sdk", "family")
+
+
+class _TrieNode:
+    __slots__ = ("children", "prefix_rules", "exact_rules")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        # Rules whose literal prefix ends at this node
+        self.prefix_rules: list[int] = []
+        # Rules whose whole pattern ends at this node
+        self.exact_rules: list[int] = []
+
+
+class _Trie:
+    def __init__(self) -> None:
+        self.root = _TrieNode()
+
+    def add(self, literal: str, exact: bool, rule_index: int) -> None:
+        node = self.root
+        for char in literal:
+            node = node.children.setdefault(char, _TrieNode())
+        if exact:
+            node.exact_rules.append(rule_index)
+        else:
+            node.prefix_rules.append(rule_index)
+
+    def lookup(self, value: str, into: set[int]) -> None:
+        node = self.root
+        into.update(node.prefix_rules)
+        for char in value:
+            next_node = node.children.get(char)
+            if next_node is None:
+                return
+            node = next_node
+            into.update(node.prefix_rules)
+        into.update(node.exact_rules)
+
+
+def _get_literal_prefix(pattern: str) -> tuple[str, bool]:
+    """
+    Returns the literal prefix of a glob pattern, and whether that prefix is
+    the whole pattern.
+    """
+    for i, char in enumerate(pattern):
+        if char in GLOB_CHARS:
+            return pattern[:i], False
+    return pattern, True
+
+
+def _get_index_entry(matcher: Match) -> tuple[str, str, bool] | None:
+    if matcher.negated:
+        return None
+
+    if matcher.key in GLOB_KEYS or matcher.key.startswith("tags."):
+        literal, exact = _get_literal_prefix(matcher.pattern)
+        if not literal:
+            return None
+        if GLOB_KEYS.get(matcher.key):
+            # Only ASCII can be safely lowercased the same way the glob
+            # implementation does.
+            if not literal.isascii():
+                return None
+            literal = literal.lower()
+        return matcher.key, literal, exact
+
+    return None
+
+
+class RuleIndex:
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = rules
+        self.tries: dict[str, _Trie] = {}
+        self.flags: dict[str, dict[str, list[int]]] = {}
+        self.unindexed: list[int] = []
+
+        for rule_index, rule in enumerate(rules):
+            if not self._add_rule(rule_index, rule):
+                self.unindexed.append(rule_index)
+
+    def _add_rule(self, rule_index: int, rule: Rule) -> bool:
+        best: tuple[str, str, bool] | None = None
+        for matcher in rule.matchers:
+            entry = _get_index_entry(matcher)
+            if entry is not None and (best is None or len(entry[1]) > len(best[1])):
+                best = entry
+
+        if best is not None:
+            key, literal, exact = best
+            self.tries.setdefault(key, _Trie()).add(literal, exact, rule_index)
+            return True
+
+        for matcher in rule.matchers:
+            if matcher.key in FLAG_KEYS and not matcher.negated:
+                flags = matcher.pattern.split(",")
+                if "all" in flags:
+                    continue
+                by_flag = self.flags.setdefault(matcher.key, {})
+                for flag in flags:
+                    by_flag.setdefault(flag, []).append(rule_index)
+                return True
+
+        return False
+
+    def _iter_values(self, key: str, access: EventAccess) -> Iterator[str | None]:
+        if key == "message":
+            for toplevel in access.get_toplevel():
+                yield from (toplevel.get("message"), toplevel.get("value"))
+        elif key.startswith("tags."):
+            for tag in access.get_tags():
+                yield tag.get(key)
+        elif key in ("type", "value"):
+            for exception in access.get_exceptions():
+                yield exception.get(key)
+        elif key in ("logger", "level"):
+            for log_info in access.get_log_info():
+                yield log_info.get(key)
+        else:
+            for frame in access.get_frames():
+                value = frame.get(key)
+                yield value if isinstance(value, str) else None
+
+    def get_candidates(self, access: EventAccess) -> list[int]:
+        """
+        Returns the indices of all rules that can match the event, in order.
+        """
+        candidates = set(self.unindexed)
+
+        for key, trie in self.tries.items():
+            ignore_case = GLOB_KEYS.get(key, False)
+            for value in self._iter_values(key, access):
+                if value is not None:
+                    trie.lookup(value.lower() if ignore_case else value, candidates)
+
+        for key, by_flag in self.flags.items():
+            (values,) = access.get_values(key)
+            candidates.update(by_flag.get(values[key], ()))
+
+        return sorted(candidates)
+
+    def get_matching_rule(self, access: EventAccess) -> tuple[Rule, tuple[str, object]] | None:
+        for rule_index in self.get_candidates(access):
+            rule = self.rules[rule_index]
+            values = rule.get_fingerprint_values_for_event_access(access)
+            if values is not None:
+                return rule, values
+        return None
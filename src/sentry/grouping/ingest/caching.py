@@ -0,0 +1,204 @@
+"""
+Memoization of calculated grouping hashes.
+
+Building the strategy component tree is the most expensive part of grouping,
+and in practice most events of a project are repeats of a handful of crashes.
+Once stacktraces are normalized and server-side fingerprinting has run, the
+hashes of an event only depend on:
+
+- the grouping config id,
+- the enhancements of the grouping config,
+- the fingerprinting rules of the project, and
+- the grouping-relevant parts of the event payload.
+
+All of those go into the cache key, so changing the grouping config or the
+fingerprinting rules of a project invalidates its cached hashes on the spot:
+old entries can no longer be looked up and simply expire.
+
+Hashes are first looked up in a small in-process LRU which also keeps the
+variants, and then (if enabled) in redis, which only stores the hashes and tree
+labels.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+
+from cachetools import TTLCache
+from django.conf import settings
+
+from sentry import options
+from sentry.grouping.result import CalculatedHashes
+from sentry.grouping.utils import parse_fingerprint_var
+from sentry.utils import json, metrics
+from sentry.utils.hashlib import md5_text
+from sentry.utils.redis import redis_clusters
+
+if TYPE_CHECKING:
+    from sentry.eventstore.models import Event
+    from sentry.grouping.api import GroupingConfig
+    from sentry.grouping.strategies.base import StrategyConfiguration
+    from sentry.models.project import Project
+
+logger = logging.getLogger("sentry.events.grouping")
+
+#: Top-level event keys that are read while calculating hashes. Everything
+#: else in the payload (tags, contexts, breadcrumbs, ...) has no influence.
+GROUPING_INPUT_KEYS = (
+    "platform",
+    "checksum",
+    "fingerprint",
+    "_fingerprint_info",
+    "exception",
+    "threads",
+    "stacktrace",
+    "logentry",
+    "message",
+    "template",
+    "csp",
+    "expectct",
+    "expectstaple",
+    "hpkp",
+)
+
+LOCAL_CACHE_SIZE = 10000
+LOCAL_CACHE_TTL = 300
+REDIS_CACHE_TTL = 3600
+
+_canonical_json = json.JSONEncoder(separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+_local_cache: TTLCache[str, tuple[CalculatedHashes, Any]] = TTLCache(
+    maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL
+)
+_local_cache_lock = threading.Lock()
+
+
+def _is_cacheable(event: Event) -> bool:
+    # Fingerprint variables other than `{{ default }}` are resolved against
+    # arbitrary event attributes (tags, transaction, ...) that are not part of
+    # the cache key.
+    fingerprint = event.data.get("fingerprint") or ()
+    return all(parse_fingerprint_var(value) in (None, "default") for value in fingerprint)
+
+
+def get_grouping_cache_key(
+    project: Project, event: Event, grouping_config: GroupingConfig
+) -> str | None:
+    """
+    Returns the key under which the hashes of this event are cached, or `None`
+    if the hashes of this event cannot be cached.
+    """
+    if not _is_cacheable(event):
+        return None
+
+    enhancements_hash = md5_text(grouping_config["enhancements"]).hexdigest()
+    fingerprinting_hash = md5_text(
+        project.get_option("sentry:fingerprinting_rules") or ""
+    ).hexdigest()
+    grouping_input = {key: event.data.get(key) for key in GROUPING_INPUT_KEYS}
+    input_hash = md5_text(_canonical_json.encode(grouping_input)).hexdigest()
+
+    # The project id is part of the key as some parameterization experiments
+    # are rolled out per project.
+    digest = md5_text(
+        grouping_config["id"], enhancements_hash, fingerprinting_hash, input_hash
+    ).hexdigest()
+    return f"grouping:hashes:{project.id}:{digest}"
+
+
+def _get_redis_client():
+    return redis_clusters.get(settings.SENTRY_GROUPING_HASH_CACHE_REDIS_CLUSTER)
+
+
+def _get_from_redis(cache_key: str) -> tuple[CalculatedHashes, Any] | None:
+    try:
+        value = _get_redis_client().get(cache_key)
+    except Exception:
+        logger.exception("grouping.hash_cache.redis_get_failed")
+        return None
+
+    if value is None:
+        return None
+
+    payload = json.loads(value)
+    hashes = CalculatedHashes(
+        hashes=payload["hashes"],
+        hierarchical_hashes=payload["hierarchical_hashes"],
+        tree_labels=payload["tree_labels"],
+    )
+    return hashes, payload.get("main_exception_id")
+
+
+def _set_in_redis(cache_key: str, hashes: CalculatedHashes, main_exception_id: Any) -> None:
+    payload = {
+        "hashes": list(hashes.hashes),
+        "hierarchical_hashes": list(hashes.hierarchical_hashes),
+        "tree_labels": list(hashes.tree_labels),
+        "main_exception_id": main_exception_id,
+    }
+    try:
+        _get_redis_client().set(cache_key, json.dumps(payload), ex=REDIS_CACHE_TTL)
+    except Exception:
+        logger.exception("grouping.hash_cache.redis_set_failed")
+
+
+def get_hashes_cached(
+    project: Project,
+    event: Event,
+    grouping_config: GroupingConfig,
+    loaded_grouping_config: StrategyConfiguration,
+) -> CalculatedHashes:
+    """
+    Equivalent to `event.get_hashes(loaded_grouping_config)`, but reuses the
+    hashes of an earlier event with the same grouping input.
+    """
+    if not options.get("grouping.hash-cache.enabled"):
+        return event.get_hashes(loaded_grouping_config)
+
+    metric_tags = {"grouping_config": grouping_config["id"]}
+    cache_key = get_grouping_cache_key(project, event, grouping_config)
+    if cache_key is None:
+        metrics.incr("grouping.hash_cache", tags={**metric_tags, "result": "uncacheable"})
+        return event.get_hashes(loaded_grouping_config)
+
+    with _local_cache_lock:
+        cached = _local_cache.get(cache_key)
+    result = "hit_local"
+
+    use_redis = options.get("grouping.hash-cache.use-redis")
+    if cached is None and use_redis:
+        cached = _get_from_redis(cache_key)
+        result = "hit_redis"
+        if cached is not None:
+            with _local_cache_lock:
+                _local_cache[cache_key] = cached
+
+    if cached is not None:
+        hashes, main_exception_id = cached
+        # The exception strategy records the main exception as a side effect
+        # of calculating hashes, which needs to be replayed.
+        if main_exception_id is not None:
+            event.data["main_exception_id"] = main_exception_id
+        metrics.incr("grouping.hash_cache", tags={**metric_tags, "result": result})
+        # Hashes end up in the event payload, which must not share lists with
+        # the cache.
+        return dataclasses.replace(
+            hashes, hashes=list(hashes.hashes), hierarchical_hashes=list(hashes.hierarchical_hashes)
+        )
+
+    previous_main_exception_id = event.data.get("main_exception_id")
+    hashes = event.get_hashes(loaded_grouping_config)
+    main_exception_id = event.data.get("main_exception_id")
+    if main_exception_id == previous_main_exception_id:
+        main_exception_id = None
+
+    with _local_cache_lock:
+        _local_cache[cache_key] = (hashes, main_exception_id)
+    if use_redis:
+        _set_in_redis(cache_key, hashes, main_exception_id)
+
+    metrics.incr("grouping.hash_cache", tags={**metric_tags, "result": "miss"})
+    return hashes
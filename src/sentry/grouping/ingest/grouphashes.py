@@ -0,0 +1,180 @@
+"""
+Batched `GroupHash` lookups for ingest.
+
+Every error event needs the `GroupHash` rows for each of its hashes. Instead of
+one `get_or_create` per hash, all hashes of one or more jobs are resolved with a
+single `IN` query, and only hashes that don't exist yet are created.
+
+In front of that sits an optional read-through cache in redis. It only keeps
+grouphashes that are settled -- linked to a group or a tombstone, and not
+locked or split -- in one redis hash per project:
+
+    grouphashes:{project_id} -> {hash: "{id}:{group_id}:{tombstone_id}:{timestamp}"}
+
+Anything that moves grouphashes between groups (merge, unmerge, delete,
+discard, tombstone removal, splitting, reprocessing) has to call
+`invalidate_grouphash_cache`, which drops the cache of the whole project.
+Entries older than `CACHE_TTL` are ignored to bound the effect of a cache write
+racing with an invalidation.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+
+from django.conf import settings
+
+from sentry import options
+from sentry.models.grouphash import GroupHash
+from sentry.models.project import Project
+from sentry.utils import metrics
+from sentry.utils.redis import redis_clusters
+
+logger = logging.getLogger("sentry.events.grouping")
+
+CACHE_TTL = 300
+
+
+def _get_cache_key(project_id: int) -> str:
+    return f"grouphashes:{project_id}"
+
+
+def _get_redis_client():
+    return redis_clusters.get(settings.SENTRY_GROUPHASH_CACHE_REDIS_CLUSTER)
+
+
+def _is_cacheable(grouphash: GroupHash) -> bool:
+    return grouphash.state is None and (
+        grouphash.group_id is not None or grouphash.group_tombstone_id is not None
+    )
+
+
+def _encode(grouphash: GroupHash, now: int) -> str:
+    return f"{grouphash.id}:{grouphash.group_id or ''}:{grouphash.group_tombstone_id or ''}:{now}"
+
+
+def _decode(project_id: int, hash: str, value: str, now: int) -> GroupHash | None:
+    id, group_id, group_tombstone_id, timestamp = value.split(":")
+    if now - int(timestamp) > CACHE_TTL:
+        return None
+    return GroupHash(
+        id=int(id),
+        project_id=project_id,
+        hash=hash,
+        group_id=int(group_id) if group_id else None,
+        group_tombstone_id=int(group_tombstone_id) if group_tombstone_id else None,
+        state=None,
+    )
+
+
+def _get_cached(requests: Sequence[tuple[int, Sequence[str]]]) -> dict[tuple[int, str], GroupHash]:
+    try:
+        with _get_redis_client().pipeline(transaction=False) as pipeline:
+            for project_id, hashes in requests:
+                pipeline.hmget(_get_cache_key(project_id), hashes)
+            results = pipeline.execute()
+    except Exception:
+        logger.exception("grouphash_cache.get_failed")
+        return {}
+
+    now = int(time.time())
+    rv = {}
+    for (project_id, hashes), values in zip(requests, results):
+        for hash, value in zip(hashes, values):
+            if value is None:
+                continue
+            grouphash = _decode(project_id, hash, value, now)
+            if grouphash is not None:
+                rv[project_id, hash] = grouphash
+    return rv
+
+
+def _set_cached(grouphashes: Iterable[GroupHash]) -> None:
+    now = int(time.time())
+    by_project: dict[int, dict[str, str]] = defaultdict(dict)
+    for grouphash in grouphashes:
+        if _is_cacheable(grouphash):
+            by_project[grouphash.project_id][grouphash.hash] = _encode(grouphash, now)
+
+    if not by_project:
+        return
+
+    try:
+        with _get_redis_client().pipeline(transaction=False) as pipeline:
+            for project_id, mapping in by_project.items():
+                key = _get_cache_key(project_id)
+                pipeline.hset(key, mapping=mapping)
+                pipeline.expire(key, CACHE_TTL)
+            pipeline.execute()
+    except Exception:
+        logger.exception("grouphash_cache.set_failed")
+
+
+def invalidate_grouphash_cache(project_ids: Iterable[int]) -> None:
+    """
+    Drops all cached grouphashes of the given projects. Needs to be called
+    whenever grouphashes are moved to another group, unlinked from their group
+    or deleted.
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return
+
+    try:
+        with _get_redis_client().pipeline(transaction=False) as pipeline:
+            for project_id in project_ids:
+                pipeline.delete(_get_cache_key(project_id))
+            pipeline.execute()
+    except Exception:
+        # Stale entries expire after `CACHE_TTL` at the latest.
+        logger.exception("grouphash_cache.invalidate_failed")
+
+
+def get_or_create_grouphashes_many(
+    requests: Sequence[tuple[Project, Sequence[str]]]
+) -> list[list[GroupHash]]:
+    """
+    Returns the `GroupHash` rows for the hashes of each `(project, hashes)`
+    pair, creating the ones that don't exist yet. Grouphashes are returned in
+    the same order as the hashes.
+    """
+    keys = [(project.id, list(hashes)) for project, hashes in requests]
+    found: dict[tuple[int, str], GroupHash] = {}
+
+    use_cache = options.get("grouping.grouphash-cache.enabled")
+    if use_cache:
+        found.update(_get_cached(keys))
+
+    missing = {(project_id, hash) for project_id, hashes in keys for hash in hashes} - set(found)
+    if missing:
+        queried = GroupHash.objects.filter(
+            project_id__in={project_id for project_id, _ in missing},
+            hash__in={hash for _, hash in missing},
+        )
+        loaded = [gh for gh in queried if (gh.project_id, gh.hash) in missing]
+        for grouphash in loaded:
+            found[grouphash.project_id, grouphash.hash] = grouphash
+        if use_cache:
+            _set_cached(loaded)
+
+    projects = {project.id: project for project, _ in requests}
+    for project_id, hashes in keys:
+        for hash in hashes:
+            if (project_id, hash) not in found:
+                found[project_id, hash] = GroupHash.objects.get_or_create(
+                    project=projects[project_id], hash=hash
+                )[0]
+
+    if use_cache:
+        hits = sum(len(hashes) for _, hashes in keys) - len(missing)
+        metrics.incr("grouphash_cache.hit", amount=hits)
+        metrics.incr("grouphash_cache.miss", amount=len(missing))
+
+    return [[found[project_id, hash] for hash in hashes] for project_id, hashes in keys]
+
+
+def get_or_create_grouphashes(project: Project, hashes: Sequence[str]) -> list[GroupHash]:
+    return get_or_create_grouphashes_many([(project, hashes)])[0]
@@ -23,6 +23,7 @@ from sentry.grouping.api import (
     get_grouping_config_dict_for_project,
     load_grouping_config,
 )
+from sentry.grouping.ingest.caching import get_hashes_cached
 from sentry.grouping.ingest.config import _config_update_happened_recently, is_in_transition
 from sentry.grouping.ingest.metrics import record_hash_calculation_metrics
 from sentry.grouping.ingest.utils import extract_hashes
@@ -85,7 +86,7 @@ def _calculate_event_grouping(
             # default long before we get here. Should we consolidate bogus config handling into the
             # code actually getting the config?
             try:
-                hashes = event.get_hashes(loaded_grouping_config)
+                hashes = get_hashes_cached(project, event, grouping_config, loaded_grouping_config)
             except GroupingConfigNotFound:
                 event.data["grouping_config"] = get_grouping_config_dict_for_project(project)
                 hashes = event.get_hashes()
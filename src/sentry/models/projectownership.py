@@ -9,6 +9,7 @@ from django.db import models
 from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
+from sentry import options
 from sentry.backup.scopes import RelocationScope
 from sentry.db.models import Model, region_silo_only_model, sane_repr
 from sentry.db.models.fields import FlexibleForeignKey, JSONField
@@ -17,7 +18,7 @@ from sentry.models.activity import Activity
 from sentry.models.actor import ActorTuple
 from sentry.models.group import Group
 from sentry.models.groupowner import OwnerRuleType
-from sentry.ownership.grammar import Rule, load_schema, resolve_actors
+from sentry.ownership.grammar import Rule, load_schema, load_schema_compiled, resolve_actors
 from sentry.types.activity import ActivityType
 from sentry.utils import metrics
 from sentry.utils.cache import cache
@@ -376,6 +377,9 @@ class ProjectOwnership(Model):
         rules = []
 
         if ownership.schema is not None:
+            if options.get("ownership.compiled-schema.enabled"):
+                return load_schema_compiled(ownership.schema).get_matching_rules(data)
+
             for rule in load_schema(ownership.schema):
                 if rule.test(data):
                     rules.append(rule)
@@ -20,6 +20,14 @@ from sentry.db.models.manager import BaseManager
 from sentry.utils.cache import cache
 
 
+def get_rule_plan_cache_key(project_id: int) -> str:
+    return f"project:{project_id}:rule-plan"
+
+
+def invalidate_project_rules_cache(project_id: int) -> None:
+    cache.delete_many([f"project:{project_id}:rules", get_rule_plan_cache_key(project_id)])
+
+
 class RuleSource(IntEnum):
     ISSUE = 0
     CRON_MONITOR = 1
@@ -92,14 +100,12 @@ class Rule(Model):
 
     def delete(self, *args, **kwargs):
         rv = super().delete(*args, **kwargs)
-        cache_key = f"project:{self.project_id}:rules"
-        cache.delete(cache_key)
+        invalidate_project_rules_cache(self.project_id)
         return rv
 
     def save(self, *args, **kwargs):
         rv = super().save(*args, **kwargs)
-        cache_key = f"project:{self.project_id}:rules"
-        cache.delete(cache_key)
+        invalidate_project_rules_cache(self.project_id)
         return rv
 
     def get_audit_log_data(self):
@@ -1,7 +1,8 @@
-from typing import ClassVar
+from typing import Any, ClassVar
 
 from django.db import models
 from django.db.models import CheckConstraint, Q, UniqueConstraint
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
 from sentry.backup.scopes import RelocationScope
@@ -13,6 +14,7 @@ from sentry.db.models import (
     sane_repr,
 )
 from sentry.db.models.fields.hybrid_cloud_foreign_key import HybridCloudForeignKey
+from sentry.models.rule import Rule, invalidate_project_rules_cache
 
 
 class RuleSnoozeManager(BaseManager["RuleSnooze"]):
@@ -72,3 +74,18 @@ class RuleSnooze(Model):
         ]
 
     __repr__ = sane_repr("user_id", "owner_id", "rule_id", "alert_rule_id", "until", "date_added")
+
+
+def invalidate_rule_plan(instance: RuleSnooze, **kwargs: Any) -> None:
+    # Only snoozes for everyone are part of the rule plan of a project.
+    if instance.rule_id is None or instance.user_id is not None:
+        return
+    project_id = (
+        Rule.objects.filter(id=instance.rule_id).values_list("project_id", flat=True).first()
+    )
+    if project_id is not None:
+        invalidate_project_rules_cache(project_id)
+
+
+post_save.connect(invalidate_rule_plan, sender=RuleSnooze, weak=False)
+post_delete.connect(invalidate_rule_plan, sender=RuleSnooze, weak=False)
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import atexit
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from threading import local
+from threading import Lock, local
 from typing import Any
 
 import sentry_sdk
@@ -9,6 +12,13 @@ from django.core.cache import BaseCache, InvalidCacheBackendError, caches
 from django.utils.functional import cached_property
 
 from sentry import options
+from sentry.nodestore.dictionaries import (
+    ZSTD_MAGIC,
+    MissingDictionary,
+    get_dictionary_names,
+    get_dictionary_registry,
+)
+from sentry.nodestore.framing import encode_framed, is_framed, read_framed
 from sentry.utils import json, metrics
 from sentry.utils.services import Service
 
@@ -27,6 +37,22 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json.loads
 
+# Thread pools used by backends that fan out `get_multi` requests, shared by
+# all backend instances (and threads) with the same concurrency.
+_multi_get_pools: dict[int, ThreadPoolExecutor] = {}
+_multi_get_pools_lock = Lock()
+
+
+def _get_multi_get_pool(max_workers: int) -> ThreadPoolExecutor:
+    with _multi_get_pools_lock:
+        pool = _multi_get_pools.get(max_workers)
+        if pool is None:
+            pool = _multi_get_pools[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="nodestore-get-multi"
+            )
+            atexit.register(pool.shutdown, False)
+        return pool
+
 
 class NodeStorage(local, Service):
     """
@@ -61,6 +87,12 @@ class NodeStorage(local, Service):
 
     This is used in reprocessing to store a snapshot of the event from multiple
     stages of the pipeline.
+
+    If ``SENTRY_NODESTORE_DICTIONARIES_DIR`` points at trained zstd
+    dictionaries (see ``sentry nodestore train-dictionary``) and the
+    ``nodestore.zstd-dictionary.enabled`` option is set, payloads are
+    additionally compressed with the dictionary matching their project or
+    platform. Uncompressed payloads remain readable.
     """
 
     __all__ = (
@@ -95,10 +127,54 @@ class NodeStorage(local, Service):
         for id in id_list:
             self.delete(id)
 
+    def _decompress(self, value: bytes) -> bytes:
+        """
+        Undo dictionary compression applied by `_compress`, passing through
+        any other payload untouched.
+        """
+        if not value.startswith(ZSTD_MAGIC):
+            return value
+
+        registry = get_dictionary_registry()
+        if registry is None:
+            raise ValueError("Found a dictionary-compressed node but no dictionaries are set up")
+        try:
+            return registry.decompress(value)
+        except MissingDictionary:
+            # The node may have been written by a process that already loaded a
+            # newer dictionary.
+            metrics.incr("nodestore.dictionary-compression.reload")
+            registry = get_dictionary_registry(reload=True)
+            assert registry is not None
+            return registry.decompress(value)
+
+    def _compress(self, value: bytes, data: Any) -> bytes:
+        if not isinstance(data, dict) or not options.get("nodestore.zstd-dictionary.enabled"):
+            return value
+
+        registry = get_dictionary_registry()
+        if registry is None:
+            return value
+
+        compressed = registry.compress(value, get_dictionary_names(data))
+        if compressed is None:
+            metrics.incr("nodestore.dictionary-compression", tags={"result": "no_dictionary"})
+            return value
+
+        metrics.incr("nodestore.dictionary-compression", tags={"result": "compressed"})
+        metrics.distribution("nodestore.dictionary-compression.ratio", len(value) / len(compressed))
+        return compressed
+
     def _decode(self, value: None | bytes, subkey: str | None) -> Any | None:
         if value is None:
             return None
 
+        value = self._decompress(value)
+
+        if is_framed(value):
+            payload = read_framed(value, subkey)
+            return json_loads(payload) if payload is not None else None
+
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -142,12 +218,15 @@ class NodeStorage(local, Service):
                     metrics.incr("nodestore.get", tags={"cache": "hit"})
                     span.set_tag("origin", "from_cache")
                     span.set_tag("found", bool(item_from_cache))
-                    return item_from_cache
+                    # `set_subkeys` caches payloads as they are written, which
+                    # may still be deduplicated.
+                    return self._assemble({id: item_from_cache})[id]
 
             span.set_tag("subkey", str(subkey))
             bytes_data = self._get_bytes(id)
             rv = self._decode(bytes_data, subkey=subkey)
             if subkey is None:
+                rv = self._assemble({id: rv})[id]
                 # set cache item only after we know decoding did not fail
                 self._set_cache_item(id, rv)
 
@@ -159,6 +238,16 @@ class NodeStorage(local, Service):
 
             return rv
 
+    def _assemble(self, items: dict[str, Any]) -> dict[str, Any]:
+        """
+        Restores the interfaces that the eventstore compressor has moved out of
+        the given payloads, with one `get_multi` call for all of them.
+        """
+        from sentry.eventstore import compressor
+
+        compressor.assemble_many(items, self.get_multi)
+        return items
+
     def _get_bytes_multi(self, id_list: list[str]) -> dict[str, bytes | None]:
         """
         >>> nodestore._get_bytes_multi(['key1', 'key2')
@@ -169,6 +258,42 @@ class NodeStorage(local, Service):
         """
         return {id: self._get_bytes(id) for id in id_list}
 
+    def _get_bytes_multi_concurrent(
+        self,
+        id_list: list[str],
+        fetch_batch: Callable[[list[str]], dict[str, bytes | None]],
+        batch_size: int,
+        concurrency: int,
+    ) -> dict[str, bytes | None]:
+        """
+        Split `id_list` into batches of at most `batch_size` ids and fetch up
+        to `concurrency` of them at the same time with `fetch_batch`, so the
+        latency of the whole call is bound by the slowest batch rather than
+        the sum of all of them.
+
+        `fetch_batch` runs on other threads. Since `NodeStorage` is
+        thread-local, it must not access attributes through `self`, which
+        would initialize a new instance on each of those threads.
+        """
+        backend = type(self).__name__
+        batches = [id_list[i : i + batch_size] for i in range(0, len(id_list), batch_size)]
+
+        def timed_fetch(batch: list[str]) -> dict[str, bytes | None]:
+            with metrics.timer("nodestore.get_multi.request", tags={"backend": backend}):
+                return fetch_batch(batch)
+
+        if concurrency > 1 and len(batches) > 1:
+            results = list(_get_multi_get_pool(concurrency).map(timed_fetch, batches))
+        else:
+            results = [timed_fetch(batch) for batch in batches]
+
+        metrics.distribution("nodestore.get_multi.batches", len(batches), tags={"backend": backend})
+
+        rv: dict[str, bytes | None] = {id: None for id in id_list}
+        for result in results:
+            rv.update(result)
+        return rv
+
     def get_multi(self, id_list: list[str], subkey: str | None = None) -> dict[str, Any | None]:
         """
         >>> nodestore.get_multi(['key1', 'key2')
@@ -185,7 +310,7 @@ class NodeStorage(local, Service):
                 cache_items = self._get_cache_items(id_list)
                 if len(cache_items) == len(id_list):
                     span.set_tag("result", "from_cache")
-                    return cache_items
+                    return self._assemble(cache_items)
 
                 uncached_ids = [id for id in id_list if id not in cache_items]
             else:
@@ -196,8 +321,9 @@ class NodeStorage(local, Service):
                 for id, value in self._get_bytes_multi(uncached_ids).items()
             }
             if subkey is None:
-                self._set_cache_items(items)
                 items.update(cache_items)
+                items = self._assemble(items)
+                self._set_cache_items({id: items[id] for id in uncached_ids})
 
             span.set_tag("result", "from_service")
             span.set_tag("found", len(items))
@@ -221,6 +347,13 @@ class NodeStorage(local, Service):
 
         return b"\n".join(lines)
 
+    def _encode_framed(self, data: dict[str | None, dict[str, str]]) -> bytes:
+        """
+        Encode data dict into the framed layout, which allows reading a single
+        subkey without splitting or decoding the others.
+        """
+        return encode_framed({key: json_dumps(value).encode("utf8") for key, value in data.items()})
+
     def set_bytes(self, item_id: str, data: bytes, ttl: timedelta | None = None) -> None:
         """
         >>> nodestore.set_bytes('key1', b"{'foo': 'bar'}")
@@ -258,7 +391,11 @@ class NodeStorage(local, Service):
         {'foo': 'bam'}
         """
         cache_item = data.get(None)
-        bytes_data = self._encode(data)
+        if len(data) > 1 and options.get("nodestore.framed-subkeys.enabled"):
+            bytes_data = self._encode_framed(data)
+        else:
+            bytes_data = self._encode(data)
+        bytes_data = self._compress(bytes_data, cache_item)
         self.set_bytes(item_id, bytes_data, ttl=ttl)
         # set cache only after encoding and write to nodestore has succeeded
         if options.get("nodestore.set-subkeys.enable-set-cache-item"):
@@ -22,6 +22,10 @@ class BigtableNodeStorage(NodeStorage):
         valid for reading + returning)
     :param compression: A boolean whether to enable zlib-compression, or the
         string "zstd" to use zstd.
+    :param multi_get_batch_size: Maximum number of rows requested in one
+        Bigtable read for ``get_multi``.
+    :param multi_get_concurrency: How many of those reads may be in flight at
+        the same time.
 
     >>> from datetime import timedelta
     >>> BigtableNodeStorage(
@@ -43,6 +47,8 @@ class BigtableNodeStorage(NodeStorage):
         automatic_expiry: bool = False,
         default_ttl: timedelta | None = None,
         compression: bool = False,
+        multi_get_batch_size: int = 100,
+        multi_get_concurrency: int = 1,
         **client_options: object,
     ):
         if compression is True:
@@ -59,15 +65,23 @@ class BigtableNodeStorage(NodeStorage):
             client_options=client_options,
         )
         self.automatic_expiry = automatic_expiry
+        self.multi_get_batch_size = multi_get_batch_size
+        self.multi_get_concurrency = multi_get_concurrency
         self.skip_deletes = automatic_expiry and "_SENTRY_CLEANUP" in os.environ
 
     def _get_bytes(self, id: str) -> bytes | None:
         return self.store.get(id)
 
     def _get_bytes_multi(self, id_list: list[str]) -> dict[str, bytes | None]:
-        rv: dict[str, bytes | None] = {id: None for id in id_list}
-        rv.update(self.store.get_many(id_list))
-        return rv
+        # Batches are fetched on other threads, which would get their own
+        # (thread-local) store and Bigtable client through ``self``.
+        store = self.store
+        return self._get_bytes_multi_concurrent(
+            id_list,
+            lambda batch: dict(store.get_many(batch)),
+            batch_size=self.multi_get_batch_size,
+            concurrency=self.multi_get_concurrency,
+        )
 
     def _set_bytes(self, id: str, data: Any, ttl: timedelta | None = None) -> None:
         self.store.set(id, data, ttl)
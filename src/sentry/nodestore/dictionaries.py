@@ -0,0 +1,172 @@
+"""
+Trained zstd dictionaries for nodestore payloads.
+
+Event payloads from the same platform (or project) share most of their
+structure: SDK metadata, contexts and module lists are nearly identical across
+events. Compressing each blob on its own can't take advantage of that, but a
+zstd dictionary trained on a sample of existing nodes can.
+
+Dictionaries live in ``SENTRY_NODESTORE_DICTIONARIES_DIR``, one file per
+dictionary, named ``<name>.<dict_id>.zdict`` where ``name`` is either a
+platform (``python``) or a project (``project-42``). The zstd frame header of
+every compressed blob records the id of the dictionary it was written with, so
+newer dictionaries can be rolled out at any time while older blobs stay
+readable -- as long as the dictionary files they reference are never removed.
+Processes that come across a blob written with a dictionary they have not
+loaded yet read the directory again.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+import zstandard
+from django.conf import settings
+
+#: Magic number at the start of every zstd frame. JSON payloads start with
+#: ``{`` and legacy pickles with ``\x80``, so this is never ambiguous.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+DICTIONARY_SUFFIX = ".zdict"
+
+COMPRESSION_LEVEL = 3
+
+#: Minimum number of seconds between two reloads of the dictionary directory.
+RELOAD_INTERVAL = 10
+
+
+class MissingDictionary(Exception):
+    pass
+
+
+def get_dictionary_names(data: Mapping[str, Any], project_id: int | None = None) -> list[str]:
+    """
+    Returns the dictionary names to try for a payload, most specific first.
+    """
+    names = []
+    if project_id is None:
+        project_id = data.get("project")
+    if project_id is not None:
+        names.append(f"project-{project_id}")
+    platform = data.get("platform")
+    if isinstance(platform, str) and platform:
+        names.append(platform)
+    return names
+
+
+class DictionaryRegistry:
+    """
+    Holds every dictionary found in a directory. The highest ``dict_id`` for a
+    name is used to compress new payloads, while all of them can be used to
+    decompress.
+    """
+
+    def __init__(self, dictionaries: Sequence[tuple[str, zstandard.ZstdCompressionDict]]) -> None:
+        self.by_id: dict[int, zstandard.ZstdCompressionDict] = {}
+        self.by_name: dict[str, zstandard.ZstdCompressionDict] = {}
+
+        for name, dictionary in dictionaries:
+            dict_id = dictionary.dict_id()
+            if dict_id in self.by_id:
+                raise ValueError(f"duplicate zstd dictionary id: {dict_id}")
+            dictionary.precompute_compress(level=COMPRESSION_LEVEL)
+            self.by_id[dict_id] = dictionary
+            current = self.by_name.get(name)
+            if current is None or current.dict_id() < dict_id:
+                self.by_name[name] = dictionary
+
+        # Compressors and decompressors are not thread safe.
+        self._local = threading.local()
+
+    @classmethod
+    def from_directory(cls, path: str) -> DictionaryRegistry:
+        dictionaries = []
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith(DICTIONARY_SUFFIX):
+                continue
+            name, _, _ = filename[: -len(DICTIONARY_SUFFIX)].rpartition(".")
+            with open(os.path.join(path, filename), "rb") as f:
+                dictionaries.append((name, zstandard.ZstdCompressionDict(f.read())))
+        return cls(dictionaries)
+
+    def next_dict_id(self) -> int:
+        # zstd reserves id 0 for "no dictionary", and ids below 32768 for
+        # dictionaries registered with the zstd project.
+        return max(self.by_id, default=32767) + 1
+
+    def _get_compressor(
+        self, dictionary: zstandard.ZstdCompressionDict
+    ) -> zstandard.ZstdCompressor:
+        compressors = self._local.__dict__.setdefault("compressors", {})
+        dict_id = dictionary.dict_id()
+        if dict_id not in compressors:
+            compressors[dict_id] = zstandard.ZstdCompressor(
+                level=COMPRESSION_LEVEL, dict_data=dictionary, write_content_size=True
+            )
+        return compressors[dict_id]
+
+    def _get_decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        decompressors = self._local.__dict__.setdefault("decompressors", {})
+        if dict_id not in decompressors:
+            try:
+                dictionary = self.by_id[dict_id] if dict_id else None
+            except KeyError:
+                raise MissingDictionary(f"zstd dictionary {dict_id} is not available")
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return decompressors[dict_id]
+
+    def compress(self, value: bytes, names: Sequence[str]) -> bytes | None:
+        """
+        Compresses ``value`` with the first dictionary that matches one of
+        ``names``. Returns ``None`` if there is no such dictionary.
+        """
+        for name in names:
+            dictionary = self.by_name.get(name)
+            if dictionary is not None:
+                return self._get_compressor(dictionary).compress(value)
+        return None
+
+    def decompress(self, value: bytes) -> bytes:
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        return self._get_decompressor(dict_id).decompress(value)
+
+
+_registries: dict[str, tuple[DictionaryRegistry, float]] = {}
+_registries_lock = threading.Lock()
+
+
+def get_dictionary_registry(reload: bool = False) -> DictionaryRegistry | None:
+    """
+    Returns the registry of ``SENTRY_NODESTORE_DICTIONARIES_DIR``. With
+    ``reload``, the directory is read again to pick up dictionaries that were
+    added since, at most once every ``RELOAD_INTERVAL`` seconds.
+    """
+    path = settings.SENTRY_NODESTORE_DICTIONARIES_DIR
+    if not path:
+        return None
+
+    cached = _registries.get(path)
+    if cached is None or (reload and time.monotonic() - cached[1] >= RELOAD_INTERVAL):
+        with _registries_lock:
+            # Another thread may have loaded the directory in the meantime.
+            if _registries.get(path) is cached:
+                _registries[path] = (DictionaryRegistry.from_directory(path), time.monotonic())
+            cached = _registries[path]
+    return cached[0]
+
+
+def train_dictionary(
+    samples: Sequence[bytes], size: int, dict_id: int
+) -> zstandard.ZstdCompressionDict:
+    return zstandard.train_dictionary(size, list(samples), dict_id=dict_id, level=COMPRESSION_LEVEL)
+
+
+def write_dictionary(path: str, name: str, dictionary: zstandard.ZstdCompressionDict) -> str:
+    filename = os.path.join(path, f"{name}.{dictionary.dict_id()}{DICTIONARY_SUFFIX}")
+    with open(filename, "xb") as f:
+        f.write(dictionary.as_bytes())
+    return filename
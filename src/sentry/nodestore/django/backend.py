@@ -10,6 +10,7 @@ from django.utils import timezone
 
 from sentry.db.models import create_or_update
 from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.framing import is_framed
 from sentry.utils.strings import compress, decompress
 
 from .models import Node
@@ -26,8 +27,12 @@ class DjangoNodeStorage(NodeStorage):
         if value is None:
             return None
 
+        # Nodes compressed with a dictionary this process can't find must not
+        # be mistaken for empty ones.
+        value = self._decompress(value)
+
         try:
-            if value.startswith(b"{"):
+            if value.startswith(b"{") or is_framed(value):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
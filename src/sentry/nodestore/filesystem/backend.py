@@ -12,8 +12,9 @@ class FileSystemNodeStorage(NodeStorage):
     debugging and development!
     """
 
-    def __init__(self, path: str | None = None):
+    def __init__(self, path: str | None = None, multi_get_concurrency: int = 1):
         self.path: str = ""
+        self.multi_get_concurrency = multi_get_concurrency
 
         if not settings.DEBUG:
             raise ValueError("FileSystemNodeStorage should only be used in development!")
@@ -26,6 +27,19 @@ class FileSystemNodeStorage(NodeStorage):
         with open(self.node_path(id), "rb") as file:
             return file.read()
 
+    def _get_bytes_multi(self, id_list: list[str]) -> dict[str, bytes | None]:
+        # Files are read on other threads, which would get their own
+        # (thread-local) instance through ``self``.
+        paths = {id: self.node_path(id) for id in id_list}
+
+        def fetch(batch: list[str]) -> dict[str, bytes | None]:
+            with open(paths[batch[0]], "rb") as file:
+                return {batch[0]: file.read()}
+
+        return self._get_bytes_multi_concurrent(
+            id_list, fetch, batch_size=1, concurrency=self.multi_get_concurrency
+        )
+
     def _set_bytes(self, id: str, data: bytes, ttl: timedelta | None = None) -> None:
         with open(self.node_path(id), "wb") as file:
             file.write(data)
@@ -0,0 +1,76 @@
+"""
+Framed node layout with an offset table for subkeys.
+
+The original layout joins the main payload and all subkeys with newlines,
+which means that reading any single subkey has to split the whole blob. The
+framed layout starts with a table of contents instead, so one subkey can be
+sliced out of the blob and only that slice has to be JSON-decoded:
+
+.. code::
+
+    MAGIC (4 bytes) | count (u16) | count * entry | payloads...
+
+    entry = name length (u16) | name (ascii) | offset (u32) | length (u32)
+
+Offsets are relative to the first byte after the table. The main payload (the
+``None`` subkey) is stored under the empty name.
+"""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Mapping
+
+#: Neither JSON (``{``), pickle (``\x80``) nor zstd frames start with a NUL
+#: byte, so this cannot be confused with any other node layout.
+FRAMED_MAGIC = b"\x00nf1"
+
+_count = struct.Struct("<H")
+_name_length = struct.Struct("<H")
+_span = struct.Struct("<II")
+
+
+def is_framed(value: bytes) -> bool:
+    return value.startswith(FRAMED_MAGIC)
+
+
+def encode_framed(payloads: Mapping[str | None, bytes]) -> bytes:
+    header = [FRAMED_MAGIC, _count.pack(len(payloads))]
+    offset = 0
+    for key, payload in payloads.items():
+        name = b"" if key is None else key.encode("ascii")
+        header.append(_name_length.pack(len(name)))
+        header.append(name)
+        header.append(_span.pack(offset, len(payload)))
+        offset += len(payload)
+    return b"".join([*header, *payloads.values()])
+
+
+def read_framed(value: bytes, subkey: str | None) -> bytes | None:
+    """
+    Returns the slice of ``value`` holding ``subkey``, or ``None`` if the
+    subkey is not present. Only the table and the requested slice are read.
+    """
+    name = b"" if subkey is None else subkey.encode("ascii")
+    view = memoryview(value)
+    pos = len(FRAMED_MAGIC)
+    (count,) = _count.unpack_from(view, pos)
+    pos += _count.size
+
+    found = None
+    for _ in range(count):
+        (name_length,) = _name_length.unpack_from(view, pos)
+        pos += _name_length.size
+        entry_name = view[pos : pos + name_length]
+        pos += name_length
+        span = _span.unpack_from(view, pos)
+        pos += _span.size
+        if found is None and entry_name == name:
+            found = span
+
+    if found is None:
+        return None
+
+    # `pos` now points at the first byte after the table.
+    offset, length = found
+    return bytes(view[pos + offset : pos + offset + length])
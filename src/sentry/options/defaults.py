@@ -109,6 +109,13 @@ register("redis.options", type=Dict, flags=FLAG_NOSTORE)
 
 # See getsentry.processingstore
 register("eventstore.processing.rollout", type=Float, default=0.0, flags=FLAG_AUTOMATOR_MODIFIABLE)
+# Store repeating event interfaces (stacktraces, modules, contexts, debug_meta)
+# once in nodestore instead of inline with every event.
+register("eventstore.compressor.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+# TTL of deduplicated chunks. Must exceed the nodestore event TTL by at least a day.
+register(
+    "eventstore.compressor.chunk-ttl-days", type=Int, default=91, flags=FLAG_AUTOMATOR_MODIFIABLE
+)
 
 # Processing worker caches
 register(
@@ -456,6 +463,14 @@ register(
     default=[],
     flags=FLAG_ALLOW_EMPTY | FLAG_AUTOMATOR_MODIFIABLE,
 )
+# Scan recording segments instead of decoding them whole. Peak memory no longer grows
+# with the segment size but parsing costs several times more CPU than json.loads.
+register(
+    "replay.ingest.streaming-segment-parser",
+    type=Bool,
+    default=False,
+    flags=FLAG_AUTOMATOR_MODIFIABLE,
+)
 
 # User Feedback Options
 register(
@@ -981,6 +996,36 @@ register("store.background-grouping-config-id", default=None, flags=FLAG_AUTOMAT
 # Fraction of events that will pass through background grouping
 register("store.background-grouping-sample-rate", default=0.0, flags=FLAG_AUTOMATOR_MODIFIABLE)
 
+# Reuse the hashes of earlier events with identical grouping input, see
+# `sentry.grouping.ingest.caching`.
+register("grouping.hash-cache.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+# Whether cached grouping hashes are shared between processes through redis.
+register("grouping.hash-cache.use-redis", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+
+# Cache settled grouphashes in redis, see `sentry.grouping.ingest.grouphashes`.
+register("grouping.grouphash-cache.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+
+# Evaluate fingerprinting rules through a prefix index rather than a linear scan,
+# see `sentry.grouping.fingerprinting.index`.
+register("grouping.fingerprinting.indexed-rules", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+
+# Match ownership rules with a per-process cache of compiled schemas
+register("ownership.compiled-schema.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+
+# Apply issue alert rules through a cached per-project rule plan, see
+# `sentry.rules.processing.processor.RulePlan`.
+register("rules.processor.use-rule-plan", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+
+# Deliver scheduled digests in batches of `batch-size` timelines per task, see
+# `sentry.tasks.digests.deliver_digests`.
+register("digests.batch-delivery.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+register(
+    "digests.batch-delivery.batch-size", type=Int, default=100, flags=FLAG_AUTOMATOR_MODIFIABLE
+)
+# Number of threads sending the notifications of a batch. Every thread opens its own database
+# connection, so only raise this where the connection limit allows it.
+register("digests.batch-delivery.workers", type=Int, default=1, flags=FLAG_AUTOMATOR_MODIFIABLE)
+
 # Minimum number of files in an archive. Archives with fewer files are extracted and have their
 # contents stored as separate release files.
 register("processing.release-archive-min-files", default=10, flags=FLAG_AUTOMATOR_MODIFIABLE)
@@ -1225,6 +1270,12 @@ register(
     "sentry-metrics.ingest-consumer.enable-orjson", default=0.0, flags=FLAG_AUTOMATOR_MODIFIABLE
 )
 
+# Rollout of decoding indexer payloads from bytes and encoding the output with orjson,
+# skipping the intermediate strings and per-message spans
+register(
+    "sentry-metrics.indexer.enable-orjson-fast-path", default=0.0, flags=FLAG_AUTOMATOR_MODIFIABLE
+)
+
 # Option to disable misbehaving use case IDs
 register("sentry-metrics.indexer.disabled-namespaces", default=[], flags=FLAG_AUTOMATOR_MODIFIABLE)
 
@@ -1261,6 +1312,21 @@ register(
     flags=FLAG_AUTOMATOR_MODIFIABLE,
 )
 
+# Enables the in-process cache in front of memcache for the caching indexer's bulk_record
+register(
+    "sentry-metrics.indexer.local-cache.enabled",
+    default=False,
+    flags=FLAG_AUTOMATOR_MODIFIABLE,
+)
+
+# Maximum number of strings kept in the in-process cache of each indexer process
+register(
+    "sentry-metrics.indexer.local-cache.size",
+    default=10000,
+    type=Int,
+    flags=FLAG_AUTOMATOR_MODIFIABLE,
+)
+
 # Option to control sampling percentage of schema validation on the generic metrics pipeline
 # based on namespace.
 register(
@@ -1829,6 +1895,11 @@ register("span_descs.bump-lifetime-sample-rate", default=0.25, flags=FLAG_AUTOMA
 register(
     "nodestore.set-subkeys.enable-set-cache-item", default=True, flags=FLAG_AUTOMATOR_MODIFIABLE
 )
+# Compress new nodes with the trained zstd dictionaries in SENTRY_NODESTORE_DICTIONARIES_DIR.
+register("nodestore.zstd-dictionary.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
+# Write nodes with subkeys in the framed layout, which lets single subkeys be read
+# without splitting or decoding the whole node.
+register("nodestore.framed-subkeys.enabled", default=False, flags=FLAG_AUTOMATOR_MODIFIABLE)
 
 # === Backpressure related runtime options ===
 
@@ -2384,6 +2455,13 @@ register(
     default=[],
     flags=FLAG_PRIORITIZE_DISK | FLAG_AUTOMATOR_MODIFIABLE,
 )
+# Parse spans in the process-spans consumer first, and then push them to the
+# buffer with one pipeline per batch.
+register(
+    "standalone-spans.process-spans-consumer.batch-writes",
+    default=False,
+    flags=FLAG_PRIORITIZE_DISK | FLAG_AUTOMATOR_MODIFIABLE,
+)
 register(
     "standalone-spans.buffer-window.seconds",
     type=Int,
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import re
+import threading
 from collections import namedtuple
 from collections.abc import Callable, Iterable, Mapping, Sequence
 from typing import Any
 
+from cachetools import LRUCache
 from parsimonious.exceptions import ParseError
 from parsimonious.grammar import Grammar
 from parsimonious.nodes import Node, NodeVisitor
@@ -15,9 +17,11 @@ from sentry.models.actor import ActorTuple
 from sentry.models.integrations.repository_project_path_config import RepositoryProjectPathConfig
 from sentry.models.organizationmember import OrganizationMember
 from sentry.services.hybrid_cloud.user.service import user_service
+from sentry.utils import json
 from sentry.utils.codeowners import codeowners_match
 from sentry.utils.event_frames import find_stack_frames, get_sdk_name, munged_filename_and_frames
 from sentry.utils.glob import glob_match
+from sentry.utils.hashlib import md5_text
 from sentry.utils.safe import PathSearchable, get_path
 
 __all__ = ("parse_rules", "dump_schema", "load_schema")
@@ -176,6 +180,25 @@ class Matcher(namedtuple("Matcher", "type pattern")):
 
         return False
 
+    @staticmethod
+    def get_frame_values(frames: Sequence[Mapping[str, Any]], keys: Sequence[str]) -> list[Any]:
+        """
+        Returns the distinct values `test_frames` would test, in order.
+        """
+        values = []
+        seen = set()
+        for frame in (f for f in frames if isinstance(f, Mapping)):
+            for key in keys:
+                value = frame.get(key)
+                if not value:
+                    continue
+                if isinstance(value, str):
+                    if value in seen:
+                        continue
+                    seen.add(value)
+                values.append(value)
+        return values
+
     def test_tag(self, data: PathSearchable) -> bool:
         tag = self.type[5:]
 
@@ -299,6 +322,72 @@ def load_schema(schema: Mapping[str, Any]) -> Sequence[Rule]:
     return [Rule.load(r) for r in schema["rules"]]
 
 
+class CompiledSchema:
+    """
+    The rules of a schema, prepared for testing many events.
+
+    `Rule.test` collects (and for paths, munges) the frames of the event once
+    for every rule, which dominates post-processing for schemas with thousands
+    of CODEOWNERS-derived rules. Instead, this collects the distinct frame
+    values once per event and tests every distinct matcher only once.
+    """
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = rules
+
+    def _test_matcher(self, matcher: Matcher, data: PathSearchable, frame_values: dict) -> bool:
+        if matcher.type in (PATH, CODEOWNERS):
+            if PATH not in frame_values:
+                frame_values[PATH] = Matcher.get_frame_values(*Matcher.munge_if_needed(data))
+            values = frame_values[PATH]
+        elif matcher.type == MODULE:
+            if MODULE not in frame_values:
+                frame_values[MODULE] = Matcher.get_frame_values(find_stack_frames(data), ["module"])
+            values = frame_values[MODULE]
+        else:
+            return matcher.test(data)
+
+        if matcher.type == CODEOWNERS:
+            return any(codeowners_match(value, matcher.pattern) for value in values)
+        return any(
+            glob_match(value, matcher.pattern, ignorecase=True, path_normalize=True)
+            for value in values
+        )
+
+    def get_matching_rules(self, data: PathSearchable) -> list[Rule]:
+        frame_values: dict[str, list[Any]] = {}
+        results: dict[Matcher, bool] = {}
+        rules = []
+        for rule in self.rules:
+            matched = results.get(rule.matcher)
+            if matched is None:
+                matched = results[rule.matcher] = bool(
+                    self._test_matcher(rule.matcher, data, frame_values)
+                )
+            if matched:
+                rules.append(rule)
+        return rules
+
+
+_compiled_schemas: LRUCache[str, CompiledSchema] = LRUCache(maxsize=1000)
+_compiled_schemas_lock = threading.Lock()
+
+
+def load_schema_compiled(schema: Mapping[str, Any]) -> CompiledSchema:
+    """
+    Like `load_schema`, but returns a `CompiledSchema` which is only built
+    once per process for every version of a schema.
+    """
+    key = md5_text(json.dumps(schema)).hexdigest()
+    with _compiled_schemas_lock:
+        compiled = _compiled_schemas.get(key)
+    if compiled is None:
+        compiled = CompiledSchema(load_schema(schema))
+        with _compiled_schemas_lock:
+            _compiled_schemas[key] = compiled
+    return compiled
+
+
 def convert_schema_to_rules_text(schema: Mapping[str, Any]) -> str:
     rules = load_schema(schema)
     text = ""
@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
 from time import time
 
 import rb
@@ -9,6 +13,7 @@ from sentry.constants import DataCategory
 from sentry.models.project import Project
 from sentry.models.projectkey import ProjectKey
 from sentry.quotas.base import NotRateLimited, Quota, QuotaConfig, QuotaScope, RateLimited
+from sentry.utils import metrics
 from sentry.utils.redis import (
     get_dynamic_cluster_from_options,
     is_instance_rb_cluster,
@@ -19,6 +24,32 @@ from sentry.utils.redis import (
 
 is_rate_limited = load_redis_script("quotas/is_rate_limited.lua")
 
+#: Projects are only admitted locally while every quota is used at most this
+#: much.
+LOCAL_CACHE_MAX_USAGE = 0.5
+
+#: The share of the remaining quota that a process may admit locally.
+LOCAL_CACHE_BUDGET_FRACTION = 0.01
+
+#: Maximum number of projects (and keys) admitted locally at the same time.
+LOCAL_CACHE_MAX_SIZE = 10000
+
+#: How often (in seconds) expired entries are flushed to Redis, so that
+#: projects that stopped sending events are counted too.
+LOCAL_CACHE_SWEEP_INTERVAL = 1
+
+
+@dataclass
+class _LocalQuotaState:
+    # Counter keys and their expiry times, for flushing `pending`
+    routing_key: str
+    keys: list[str]
+    expiries: list[int]
+    # How many items may be admitted locally, and how many have been
+    budget: int
+    pending: int
+    expires_at: float
+
 
 class RedisQuota(Quota):
     #: The ``grace`` period allows accommodating for clock drift in TTL
@@ -26,7 +57,9 @@ class RedisQuota(Quota):
     #: metrics may not be in sync with the computer running this code.
     grace = 60
 
-    def __init__(self, **options: object):
+    def __init__(
+        self, local_cache_ttl: float = 0, local_cache_budget: int = 100, **options: object
+    ):
         self.is_redis_cluster, self.cluster, options = get_dynamic_cluster_from_options(
             "SENTRY_QUOTA_OPTIONS", options
         )
@@ -38,6 +71,20 @@ class RedisQuota(Quota):
         #  - true: `cluster` is a `RedisCluster`. It automatically dispatches to
         #    the correct node and can be used as a client directly.
 
+        # With ``local_cache_ttl``, ``is_rate_limited`` remembers projects
+        # that are far below all of their quotas for that many seconds, and
+        # admits up to ``local_cache_budget`` items for them without going to
+        # Redis. Those items are counted in Redis once the entry expires or its
+        # budget is spent, so every process can exceed a quota by at most its
+        # budget, and changes to the quotas take up to ``local_cache_ttl`` to
+        # apply. Expired entries of all projects are flushed by the next call,
+        # at most every ``LOCAL_CACHE_SWEEP_INTERVAL`` seconds.
+        self.local_cache_ttl: float = float(local_cache_ttl)
+        self.local_cache_budget: int = int(local_cache_budget)
+        self._local_cache: dict[tuple[int, int | None], _LocalQuotaState] = {}
+        self._local_cache_lock = threading.Lock()
+        self._local_cache_next_sweep = 0.0
+
         super().__init__(**options)
         self.namespace = "quota"
 
@@ -263,6 +310,13 @@ class RedisQuota(Quota):
         if timestamp is None:
             timestamp = time()
 
+        cache_key = (project.id, key.id if key else None)
+        if self.local_cache_ttl:
+            self.__sweep_local_cache(timestamp)
+            if self.__admit_locally(cache_key, timestamp):
+                metrics.incr("quotas.redis.local_cache", tags={"result": "hit"})
+                return NotRateLimited()
+
         # Relay supports separate rate limiting per data category and and can
         # handle scopes explicitly. This function implements a simplified logic
         # that treats all events the same and ignores transaction rate limits.
@@ -306,9 +360,18 @@ class RedisQuota(Quota):
             return NotRateLimited()
 
         client = self.__get_redis_client(str(project.organization_id))
-        rejections = is_rate_limited(keys, args, client)
+        if self.local_cache_ttl:
+            results = is_rate_limited(keys, [*args, 1], client)
+            rejections, usages = results[: len(quotas)], results[len(quotas) :]
+            metrics.incr("quotas.redis.local_cache", tags={"result": "miss"})
+        else:
+            rejections = is_rate_limited(keys, args, client)
 
         if not any(rejections):
+            if self.local_cache_ttl:
+                self.__cache_locally(
+                    cache_key, str(project.organization_id), keys, args, usages, timestamp
+                )
             return NotRateLimited()
 
         worst_case: tuple[float, int | None] = (0, None)
@@ -322,3 +385,83 @@ class RedisQuota(Quota):
                 worst_case = (delay, quota.reason_code)
 
         return RateLimited(retry_after=worst_case[0], reason_code=worst_case[1])
+
+    def __admit_locally(self, cache_key: tuple[int, int | None], timestamp: float) -> bool:
+        with self._local_cache_lock:
+            state = self._local_cache.get(cache_key)
+            if state is None:
+                return False
+            if timestamp < state.expires_at and state.pending < state.budget:
+                state.pending += 1
+                return True
+            del self._local_cache[cache_key]
+
+        self.__flush_local_states([state])
+        return False
+
+    def __sweep_local_cache(self, timestamp: float) -> None:
+        with self._local_cache_lock:
+            if timestamp < self._local_cache_next_sweep:
+                return
+            self._local_cache_next_sweep = timestamp + LOCAL_CACHE_SWEEP_INTERVAL
+            expired = [
+                cache_key
+                for cache_key, state in self._local_cache.items()
+                if timestamp >= state.expires_at
+            ]
+            states = [self._local_cache.pop(cache_key) for cache_key in expired]
+
+        self.__flush_local_states(states)
+
+    def __flush_local_states(self, states: list[_LocalQuotaState]) -> None:
+        """
+        Adds the items admitted locally to the counters in Redis, with one
+        pipeline per organization.
+        """
+        by_routing_key: dict[str, list[_LocalQuotaState]] = {}
+        for state in states:
+            if state.pending:
+                by_routing_key.setdefault(state.routing_key, []).append(state)
+
+        for routing_key, _states in by_routing_key.items():
+            pipe = self.__get_redis_client(routing_key).pipeline()
+            for state in _states:
+                for quota_key, expiry in zip(state.keys, state.expiries):
+                    pipe.incrby(quota_key, state.pending)
+                    pipe.expireat(quota_key, expiry)
+            pipe.execute()
+
+    def __cache_locally(
+        self,
+        cache_key: tuple[int, int | None],
+        routing_key: str,
+        keys: list[str],
+        args: list[int],
+        usages: list[int],
+        timestamp: float,
+    ) -> None:
+        budget = self.local_cache_budget
+        expires_at = timestamp + self.local_cache_ttl
+        for limit, expiry, usage in zip(args[::2], args[1::2], usages):
+            if limit >= 0:
+                if usage > limit * LOCAL_CACHE_MAX_USAGE:
+                    return
+                budget = min(budget, int((limit - usage) * LOCAL_CACHE_BUDGET_FRACTION))
+            # Items admitted locally must be counted in the current window.
+            expires_at = min(expires_at, expiry - self.grace)
+
+        if budget <= 0:
+            return
+
+        with self._local_cache_lock:
+            if len(self._local_cache) >= LOCAL_CACHE_MAX_SIZE:
+                metrics.incr("quotas.redis.local_cache", tags={"result": "full"})
+                return
+            self._local_cache[cache_key] = _LocalQuotaState(
+                routing_key=routing_key,
+                keys=keys[::2],
+                expiries=args[1::2],
+                budget=budget,
+                pending=0,
+                expires_at=expires_at,
+            )
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import threading
+import time
 from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Any
 
 from sentry_redis_tools.clients import RedisCluster, StrictRedis
@@ -11,11 +14,18 @@ from sentry_redis_tools.sliding_windows_rate_limiter import (
 from sentry_redis_tools.sliding_windows_rate_limiter import RequestedQuota, Timestamp
 
 from sentry.exceptions import InvalidConfiguration
-from sentry.utils import redis
+from sentry.utils import metrics, redis
 from sentry.utils.services import Service
 
 __all__ = ["Quota", "GrantedQuota", "RequestedQuota", "Timestamp"]
 
+#: The largest share of a quota's limit that a single lease may reserve.
+MAX_LEASE_FRACTION = 0.1
+
+#: Maximum number of leases held by a limiter at the same time. Requests for
+#: other prefixes and quotas go to Redis without leasing once it is reached.
+MAX_LEASES = 10000
+
 
 class SlidingWindowRateLimiter(Service):
     def __init__(self, **options: Any) -> None:
@@ -119,11 +129,55 @@ class SlidingWindowRateLimiter(Service):
         return grants
 
 
+@dataclass
+class _Lease:
+    # The quota tokens that have been reserved in Redis but not granted yet.
+    tokens: int
+    # The timestamp at which the tokens were counted in Redis.
+    timestamp: Timestamp
+    expires_at: Timestamp
+
+
 class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
+    """
+    Sliding window rate limiter backed by Redis.
+
+    By default every call makes a round trip to Redis. With the ``lease_size``
+    option, `check_and_use_quotas` instead reserves up to ``lease_size`` extra
+    tokens (but never more than `MAX_LEASE_FRACTION` of the smallest limit)
+    whenever it has to go to Redis. Those tokens are kept in a lease local to
+    this instance and spent by later calls for the same prefix and quotas
+    without a round trip. After ``lease_seconds``, unused tokens are given
+    back by decrementing the granule they were counted in.
+
+    Every leased token is counted in Redis before it is granted, so leasing
+    never admits more than the limit within the granules a token is counted
+    in. Tokens are however spent up to ``lease_seconds`` after they were
+    counted, which means that any window can admit at most ``lease_size``
+    tokens per limiter instance more than the limit. Conversely, tokens that
+    are leased but not spent can make other instances be rejected for up to
+    ``lease_seconds``. Quotas with a ``prefix_override`` are shared between
+    requests and are never leased.
+
+    Expired leases of all prefixes are returned by the next call, at most
+    once every ``lease_seconds``, so tokens of prefixes that stopped
+    receiving requests are not held back.
+    """
+
     def __init__(self, **options: Any) -> None:
         self.cluster_key = options.get("cluster", "default")
         self._client: RedisCluster | StrictRedis | None = None
         self._impl: RedisSlidingWindowRateLimiterImpl | None = None
+
+        # The maximum number of tokens reserved on top of a request when it
+        # has to go to Redis. Zero disables leasing.
+        self.lease_size = options.get("lease_size", 0)
+        # How long leased tokens can be spent before they are returned.
+        self.lease_seconds = options.get("lease_seconds", 1)
+        self._leases: dict[tuple[str, tuple[Quota, ...]], _Lease] = {}
+        self._leases_lock = threading.Lock()
+        self._next_lease_sweep: Timestamp = 0
+
         super().__init__(**options)
 
     @property
@@ -158,3 +212,152 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
         timestamp: Timestamp,
     ) -> None:
         return self.impl.use_quotas(requests, grants, timestamp)
+
+    def check_and_use_quotas(
+        self, requests: Sequence[RequestedQuota], timestamp: Timestamp | None = None
+    ) -> Sequence[GrantedQuota]:
+        if not self.lease_size:
+            return super().check_and_use_quotas(requests, timestamp)
+
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        grants: list[GrantedQuota | None] = [None] * len(requests)
+        returns: list[tuple[RequestedQuota, _Lease]] = []
+        remote: list[tuple[int, RequestedQuota]] = []
+
+        with self._leases_lock:
+            if timestamp >= self._next_lease_sweep:
+                self._next_lease_sweep = timestamp + self.lease_seconds
+                returns.extend(self._pop_expired_leases(timestamp))
+
+            for i, request in enumerate(requests):
+                if any(quota.prefix_override for quota in request.quotas):
+                    remote.append((i, request))
+                    continue
+
+                lease_key = (request.prefix, tuple(request.quotas))
+                lease = self._leases.get(lease_key)
+                if lease is not None and lease.expires_at > timestamp >= lease.timestamp:
+                    if lease.tokens >= request.requested:
+                        lease.tokens -= request.requested
+                        grants[i] = GrantedQuota(
+                            prefix=request.prefix, granted=request.requested, reached_quotas=[]
+                        )
+                        continue
+
+                # The lease is expired or too small, so it is given back and
+                # replaced by a new one.
+                if lease is not None:
+                    del self._leases[lease_key]
+                    returns.append((request, lease))
+
+                lease_tokens = min(
+                    self.lease_size,
+                    int(min(quota.limit for quota in request.quotas) * MAX_LEASE_FRACTION),
+                )
+                if len(self._leases) >= MAX_LEASES:
+                    lease_tokens = 0
+                remote.append(
+                    (
+                        i,
+                        RequestedQuota(
+                            prefix=request.prefix,
+                            requested=request.requested + lease_tokens,
+                            quotas=request.quotas,
+                        ),
+                    )
+                )
+
+        self._return_leases(returns, timestamp)
+        returns = []
+        metrics.incr("ratelimits.sliding_windows.leased", amount=len(requests) - len(remote))
+
+        if remote:
+            remote_requests = [remote_request for _, remote_request in remote]
+            timestamp, remote_grants = self.check_within_quotas(remote_requests, timestamp)
+            self.use_quotas(remote_requests, remote_grants, timestamp)
+
+            with self._leases_lock:
+                for (i, _), remote_grant in zip(remote, remote_grants):
+                    request = requests[i]
+                    granted = min(request.requested, remote_grant.granted)
+                    # Leased tokens are not part of the original request, so
+                    # only report quotas that the request itself reached.
+                    reached_quotas: Sequence[Quota] = []
+                    if granted < request.requested:
+                        reached_quotas = remote_grant.reached_quotas
+                    grants[i] = GrantedQuota(
+                        prefix=request.prefix, granted=granted, reached_quotas=reached_quotas
+                    )
+                    if remote_grant.granted > granted:
+                        lease_key = (request.prefix, tuple(request.quotas))
+                        previous = self._leases.pop(lease_key, None)
+                        if previous is not None:
+                            returns.append((request, previous))
+                        self._leases[lease_key] = _Lease(
+                            tokens=remote_grant.granted - granted,
+                            timestamp=timestamp,
+                            expires_at=timestamp + self.lease_seconds,
+                        )
+
+        # Another thread may have replaced the lease in the meantime.
+        self._return_leases(returns, timestamp)
+        return [grant for grant in grants if grant is not None]
+
+    def release_leases(self, timestamp: Timestamp | None = None) -> None:
+        """
+        Gives back the unused tokens of all leases, e.g. before shutting down.
+        """
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        with self._leases_lock:
+            leases = list(self._leases.items())
+            self._leases.clear()
+
+        self._return_leases(
+            [
+                (RequestedQuota(prefix=prefix, requested=0, quotas=quotas), lease)
+                for (prefix, quotas), lease in leases
+            ],
+            timestamp,
+        )
+
+    def _pop_expired_leases(self, timestamp: Timestamp) -> list[tuple[RequestedQuota, _Lease]]:
+        # Must be called with `_leases_lock` held.
+        expired = [
+            lease_key for lease_key, lease in self._leases.items() if lease.expires_at <= timestamp
+        ]
+        leases = []
+        for lease_key in expired:
+            prefix, quotas = lease_key
+            request = RequestedQuota(prefix=prefix, requested=0, quotas=quotas)
+            leases.append((request, self._leases.pop(lease_key)))
+        return leases
+
+    def _return_leases(
+        self, leases: Sequence[tuple[RequestedQuota, _Lease]], timestamp: Timestamp
+    ) -> None:
+        by_timestamp: dict[Timestamp, list[tuple[RequestedQuota, GrantedQuota]]] = {}
+        for request, lease in leases:
+            # Granules that have left the window are not read anymore, and
+            # their keys may already have expired.
+            if lease.tokens <= 0 or any(
+                timestamp - lease.timestamp >= quota.window_seconds - quota.granularity_seconds
+                for quota in request.quotas
+            ):
+                continue
+            by_timestamp.setdefault(lease.timestamp, []).append(
+                (
+                    request,
+                    GrantedQuota(prefix=request.prefix, granted=-lease.tokens, reached_quotas=[]),
+                )
+            )
+
+        for lease_timestamp, returned in by_timestamp.items():
+            self.use_quotas(
+                [request for request, _ in returned],
+                [grant for _, grant in returned],
+                lease_timestamp,
+            )
@@ -19,6 +19,12 @@ This option limits the amount of time a message will wait in the buffer before b
 this value exceeds the Kafka commit interval then the Kafka offsets will not be committed until the
 buffer has been flushed and fully committed.
 
+**max_upload_workers:**
+
+This option limits the number of recording segments uploaded concurrently. The pool of upload
+threads is shared by all batches. No new messages are buffered while a batch is being uploaded,
+so together with the buffer limits this bounds the amount of recording-bytes held in memory.
+
 # Errors
 
 All deterministic errors must be handled otherwise the consumer will deadlock and progress will
@@ -38,10 +44,11 @@ insofar as it impacts the throughput of the consumer.
 
 from __future__ import annotations
 
+import functools
 import logging
 import time
 from collections.abc import Mapping
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Any, TypedDict
 
 import sentry_sdk
@@ -55,6 +62,7 @@ from sentry_kafka_schemas import get_codec
 from sentry_kafka_schemas.codecs import ValidationError
 from sentry_kafka_schemas.schema_types.ingest_replay_recordings_v1 import ReplayRecording
 
+from sentry import options
 from sentry.replays.lib.storage import (
     RecordingSegmentStorageMeta,
     make_recording_filename,
@@ -65,6 +73,8 @@ from sentry.replays.usecases.ingest import decompress, process_headers, track_in
 from sentry.replays.usecases.ingest.dom_index import (
     ReplayActionsEvent,
     emit_replay_actions,
+    iter_custom_events,
+    iter_rrweb_events,
     parse_replay_actions,
 )
 from sentry.utils import json, metrics
@@ -113,10 +123,12 @@ class RecordingBufferedStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         max_buffer_message_count: int,
         max_buffer_size_in_bytes: int,
         max_buffer_time_in_seconds: int,
+        max_upload_workers: int = 32,
     ) -> None:
         self.max_buffer_message_count = max_buffer_message_count
         self.max_buffer_size_in_bytes = max_buffer_size_in_bytes
         self.max_buffer_time_in_seconds = max_buffer_time_in_seconds
+        self.uploader = SegmentUploader(max_workers=max_upload_workers)
 
     def create_with_partitions(
         self,
@@ -130,11 +142,14 @@ class RecordingBufferedStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
                 self.max_buffer_time_in_seconds,
             ),
             next_step=RunTask(
-                function=process_commit,
+                function=functools.partial(process_commit, uploader=self.uploader),
                 next_step=CommitOffsets(commit),
             ),
         )
 
+    def shutdown(self) -> None:
+        self.uploader.shutdown()
+
 
 class UploadEvent(TypedDict):
     key: str
@@ -245,6 +260,7 @@ def process_message(buffer: RecordingBuffer, message: bytes) -> None:
     buffer.upload_events.append(
         {"key": make_recording_filename(recording_segment), "value": recording_data}
     )
+    buffer._buffer_size_in_bytes += len(recording_data)
 
     if replay_video := decoded_message.get("replay_video"):
         # Record video size for COGS analysis.
@@ -256,6 +272,7 @@ def process_message(buffer: RecordingBuffer, message: bytes) -> None:
         buffer.upload_events.append(
             {"key": make_video_filename(recording_segment), "value": replay_video}  # type: ignore[typeddict-item]
         )
+        buffer._buffer_size_in_bytes += len(replay_video)  # type: ignore[arg-type]
 
     # Initial segment events are recorded in the state machine.
     if headers["segment_id"] == 0:
@@ -275,7 +292,11 @@ def process_message(buffer: RecordingBuffer, message: bytes) -> None:
             decompressed_segment = decompress(recording_data)
 
         with sentry_sdk.start_span(op="replays.consumer.recording.json_loads_segment"):
-            parsed_recording_data = json.loads(decompressed_segment)
+            if options.get("replay.ingest.streaming-segment-parser"):
+                # Events are scanned lazily and only the custom events are decoded.
+                parsed_recording_data = iter_custom_events(iter_rrweb_events(decompressed_segment))
+            else:
+                parsed_recording_data = json.loads(decompressed_segment)
             parsed_replay_event = (
                 json.loads(cast_payload_bytes(decoded_message["replay_event"]))
                 if decoded_message.get("replay_event")
@@ -320,39 +341,90 @@ def process_message(buffer: RecordingBuffer, message: bytes) -> None:
 
 
 def process_commit(
-    message: Message[tuple[list[UploadEvent], list[InitialSegmentEvent], list[ReplayActionsEvent]]]
+    message: Message[tuple[list[UploadEvent], list[InitialSegmentEvent], list[ReplayActionsEvent]]],
+    uploader: SegmentUploader,
 ) -> None:
     # High I/O section.
     with sentry_sdk.start_span(op="replays.consumer.recording.commit_buffer"):
         upload_events, initial_segment_events, replay_action_events = message.payload
-        commit_uploads(upload_events)
+        commit_uploads(upload_events, uploader)
         commit_initial_segments(initial_segment_events)
         commit_replay_actions(replay_action_events)
 
 
-def commit_uploads(upload_events: list[UploadEvent]) -> None:
+def commit_uploads(upload_events: list[UploadEvent], uploader: SegmentUploader) -> None:
     with sentry_sdk.start_span(op="replays.consumer.recording.upload_segments"):
+        uploader.upload(upload_events)
+
+
+class SegmentUploader:
+    """
+    Uploads the recording segments of a buffer with a bounded pool of threads.
+
+    Every upload is retried on its own. A batch only succeeds once all of its segments have been
+    written, otherwise the batch fails as a whole and no offsets are committed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 0.1,
+    ) -> None:
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="replays-recording-upload"
+        )
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    def upload(self, upload_events: list[UploadEvent]) -> None:
+        start = time.monotonic()
+
         # This will run to completion taking potentially an infinite amount of time. However,
         # that outcome is unlikely. In the event of an indefinite backlog the process can be
         # restarted.
-        with ThreadPoolExecutor(max_workers=len(upload_events)) as pool:
-            futures = [pool.submit(_do_upload, upload) for upload in upload_events]
-
-    has_errors = False
-
-    # These futures should never fail unless there is a service-provider issue.
-    for error in filter(lambda n: n is not None, (fut.exception() for fut in futures)):
-        has_errors = True
-        sentry_sdk.capture_exception(error)
-
-    # If errors were detected the batch is failed as a whole. This wastes computation and
-    # incurs some amount service-provider cost.  However, this strategy is an improvement
-    # over dropping messages or manually retrying indefinitely.
-    #
-    # Raising an exception crashes the process and forces a restart from the last committed
-    # offset. No rate-limiting is applied.
-    if has_errors:
-        raise BufferCommitFailed("Could not upload one or more recordings.")
+        futures = [self.pool.submit(self._upload, upload) for upload in upload_events]
+        wait(futures)
+
+        has_errors = False
+
+        # These futures should never fail unless there is a service-provider issue.
+        for error in filter(lambda n: n is not None, (fut.exception() for fut in futures)):
+            has_errors = True
+            sentry_sdk.capture_exception(error)
+
+        # If errors were detected the batch is failed as a whole. This wastes computation and
+        # incurs some amount service-provider cost.  However, this strategy is an improvement
+        # over dropping messages or manually retrying indefinitely.
+        #
+        # Raising an exception crashes the process and forces a restart from the last committed
+        # offset. No rate-limiting is applied.
+        if has_errors:
+            raise BufferCommitFailed("Could not upload one or more recordings.")
+
+        duration = time.monotonic() - start
+        size = sum(len(upload["value"]) for upload in upload_events)
+        metrics.timing("replays.recording_consumer.upload_batch.duration", duration)
+        metrics.distribution("replays.recording_consumer.upload_batch.size", size, unit="byte")
+        metrics.distribution("replays.recording_consumer.upload_batch.count", len(upload_events))
+        if duration > 0:
+            # Bytes uploaded per second.
+            metrics.distribution(
+                "replays.recording_consumer.upload_batch.throughput", size / duration
+            )
+
+    def _upload(self, upload_event: UploadEvent) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return _do_upload(upload_event)
+            except Exception:
+                if attempt == self.max_attempts:
+                    raise
+                metrics.incr("replays.recording_consumer.upload_retry")
+                time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
 
 
 def commit_initial_segments(initial_segment_events: list[InitialSegmentEvent]) -> None:
@@ -10,6 +10,7 @@ from sentry_kafka_schemas.schema_types.ingest_replay_recordings_v1 import Replay
 from sentry_sdk import Hub, set_tag
 from sentry_sdk.tracing import Span
 
+from sentry import options
 from sentry.constants import DataCategory
 from sentry.models.project import Project
 from sentry.replays.lib.storage import (
@@ -18,7 +19,13 @@ from sentry.replays.lib.storage import (
     make_video_filename,
     storage_kv,
 )
-from sentry.replays.usecases.ingest.dom_index import log_canvas_size, parse_and_emit_replay_actions
+from sentry.replays.usecases.ingest.dom_index import (
+    iter_custom_events,
+    iter_rrweb_events,
+    log_canvas_size,
+    log_raw_canvas_size,
+    parse_and_emit_replay_actions,
+)
 from sentry.signals import first_replay_received
 from sentry.utils import json, metrics
 from sentry.utils.outcomes import Outcome, track_outcome
@@ -215,10 +222,20 @@ def recording_post_processor(
     replay_event_bytes: bytes | None,
     transaction: Span,
 ) -> None:
+    streaming = options.get("replay.ingest.streaming-segment-parser")
+
     try:
-        with metrics.timer("replays.usecases.ingest.decompress_and_parse"):
+        with metrics.timer(
+            "replays.usecases.ingest.decompress_and_parse",
+            tags={"parser": "streaming" if streaming else "json"},
+        ):
             decompressed_segment = decompress(segment_bytes)
-            parsed_segment_data = json.loads(decompressed_segment)
+            if streaming:
+                # Full snapshots and mutations are only scanned, never decoded.
+                rrweb_events = list(iter_rrweb_events(decompressed_segment))
+                parsed_segment_data = list(iter_custom_events(rrweb_events))
+            else:
+                parsed_segment_data = json.loads(decompressed_segment)
             parsed_replay_event = json.loads(replay_event_bytes) if replay_event_bytes else None
             _report_size_metrics(len(segment_bytes), len(decompressed_segment))
 
@@ -236,12 +253,20 @@ def recording_post_processor(
             )
 
         # Log canvas mutations to bigquery.
-        log_canvas_size(
-            message.org_id,
-            message.project_id,
-            message.replay_id,
-            parsed_segment_data,
-        )
+        if streaming:
+            log_raw_canvas_size(
+                message.org_id,
+                message.project_id,
+                message.replay_id,
+                rrweb_events,
+            )
+        else:
+            log_canvas_size(
+                message.org_id,
+                message.project_id,
+                message.replay_id,
+                parsed_segment_data,
+            )
     except Exception:
         logging.exception(
             "Failed to parse recording org=%s, project=%s, replay=%s, segment=%s",
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import logging
 import random
+import re
 import time
 import uuid
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Iterator
 from hashlib import md5
-from typing import Any, Literal, TypedDict
+from typing import Any, Literal, NamedTuple, TypedDict
 
 from sentry import features
 from sentry.conf.types.kafka_definition import Topic
@@ -58,11 +59,27 @@ class ReplayActionsEvent(TypedDict):
     type: Literal["replay_event"]
 
 
+class RRWebEvent(NamedTuple):
+    type: int | None
+    # The "data.source" of incremental snapshot events.
+    source: int | None
+    raw: memoryview
+
+
+# A JSON string or a bracket. Everything else (numbers, literals, commas, white-space) is
+# skipped by the regex engine.
+_JSON_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]')
+# The colon following an object key, and the key's value if it is an integer.
+_JSON_KEY_SUFFIX = re.compile(rb"\s*:\s*(-?\d+)?")
+_JSON_CLOSERS = {ord("["): ord("]"), ord("{"): ord("}")}
+_JSON_QUOTE = ord('"')
+
+
 def parse_and_emit_replay_actions(
     project_id: int,
     replay_id: str,
     retention_days: int,
-    segment_data: list[dict[str, Any]],
+    segment_data: Iterable[dict[str, Any]],
     replay_event: dict[str, Any] | None,
 ) -> None:
     with metrics.timer("replays.usecases.ingest.dom_index.parse_and_emit_replay_actions"):
@@ -82,7 +99,7 @@ def parse_replay_actions(
     project_id: int,
     replay_id: str,
     retention_days: int,
-    segment_data: list[dict[str, Any]],
+    segment_data: Iterable[dict[str, Any]],
     replay_event: dict[str, Any] | None,
 ) -> ReplayActionsEvent | None:
     """Parse RRWeb payload to ReplayActionsEvent."""
@@ -121,6 +138,68 @@ def create_replay_actions_payload(
     }
 
 
+def iter_rrweb_events(segment: bytes) -> Iterator[RRWebEvent]:
+    """Yield the events of a decompressed recording segment one at a time.
+
+    Events are not decoded. The segment is only scanned for the bounds of each event, its type
+    and the source of incremental snapshots, so full snapshots and mutations are never
+    materialized. Use `iter_custom_events` to decode the events the indexer needs.
+
+    Raises ValueError if the brackets of the segment are unbalanced. Other syntax errors are only
+    detected when an event is decoded.
+    """
+    if not segment.lstrip().startswith(b"["):
+        raise ValueError("Recording segment is not a JSON array.")
+
+    view = memoryview(segment)
+    closers: list[int] = []
+    event_start = 0
+    event_type: int | None = None
+    source: int | None = None
+    event_key: bytes | None = None
+    in_data = False
+
+    for match in _JSON_TOKEN.finditer(segment):
+        char = segment[match.start()]
+        depth = len(closers)
+
+        if char == _JSON_QUOTE:
+            # Keys of the event (depth 2) and of its data object (depth 3).
+            if depth == 2 or (depth == 3 and in_data):
+                suffix = _JSON_KEY_SUFFIX.match(segment, match.end())
+                if suffix is None:
+                    continue
+                key, value = match.group(), suffix.group(1)
+                if depth == 2:
+                    event_key = key
+                    if key == b'"type"' and value is not None:
+                        event_type = int(value)
+                elif key == b'"source"' and value is not None:
+                    source = int(value)
+        elif char in _JSON_CLOSERS:
+            closers.append(_JSON_CLOSERS[char])
+            if depth == 1:
+                event_start = match.start()
+                event_type = source = event_key = None
+            elif depth == 2:
+                in_data = event_key == b'"data"'
+        else:
+            if not closers or closers.pop() != char:
+                raise ValueError("Recording segment is not valid JSON.")
+            if depth == 2:
+                yield RRWebEvent(event_type, source, view[event_start : match.end()])
+
+    if closers:
+        raise ValueError("Recording segment is truncated.")
+
+
+def iter_custom_events(events: Iterable[RRWebEvent]) -> Iterator[dict[str, Any]]:
+    """Decode the custom events (breadcrumbs, performance spans, options) of a segment."""
+    for event in events:
+        if event.type == 5:
+            yield json.loads(bytes(event.raw), skip_trace=True)
+
+
 def log_canvas_size(
     org_id: int,
     project_id: int,
@@ -129,26 +208,41 @@ def log_canvas_size(
 ) -> None:
     for event in events:
         if event.get("type") == 3 and event.get("data", {}).get("source") == 9:
-            logger.info(
-                # Logging to the sentry.replays.slow_click namespace because
-                # its the only one configured to use BigQuery at the moment.
-                #
-                # NOTE: Needs an ops request to create a new dataset.
-                "sentry.replays.slow_click",
-                extra={
-                    "event_type": "canvas_size",
-                    "org_id": org_id,
-                    "project_id": project_id,
-                    "replay_id": replay_id,
-                    "size": len(json.dumps(event)),
-                },
-            )
+            _log_canvas_size(org_id, project_id, replay_id, len(json.dumps(event)))
+
+
+def log_raw_canvas_size(
+    org_id: int,
+    project_id: int,
+    replay_id: str,
+    events: Iterable[RRWebEvent],
+) -> None:
+    for event in events:
+        if event.type == 3 and event.source == 9:
+            _log_canvas_size(org_id, project_id, replay_id, len(event.raw))
+
+
+def _log_canvas_size(org_id: int, project_id: int, replay_id: str, size: int) -> None:
+    logger.info(
+        # Logging to the sentry.replays.slow_click namespace because
+        # its the only one configured to use BigQuery at the moment.
+        #
+        # NOTE: Needs an ops request to create a new dataset.
+        "sentry.replays.slow_click",
+        extra={
+            "event_type": "canvas_size",
+            "org_id": org_id,
+            "project_id": project_id,
+            "replay_id": replay_id,
+            "size": size,
+        },
+    )
 
 
 def get_user_actions(
     project_id: int,
     replay_id: str,
-    events: list[dict[str, Any]],
+    events: Iterable[dict[str, Any]],
     replay_event: dict[str, Any] | None,
 ) -> list[ReplayActionsEventPayloadClick]:
     """Return a list of ReplayActionsEventPayloadClick types.
@@ -303,7 +397,7 @@ def _should_report_rage_click_issue(project_id: int) -> bool:
     return all([_project_has_feature_enabled(), _project_has_option_enabled()])
 
 
-def _iter_custom_events(events: list[dict[str, Any]]) -> Generator[dict[str, Any], None, None]:
+def _iter_custom_events(events: Iterable[dict[str, Any]]) -> Generator[dict[str, Any], None, None]:
     for event in events:
         if event.get("type") == 5:
             yield event
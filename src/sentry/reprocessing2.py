@@ -95,6 +95,7 @@ from sentry.deletions.defaults.group import DIRECT_GROUP_RELATED_MODELS
 from sentry.eventstore.models import Event
 from sentry.eventstore.processing import event_processing_store
 from sentry.eventstore.reprocessing import reprocessing_store
+from sentry.grouping.ingest.grouphashes import invalidate_grouphash_cache
 from sentry.models.eventattachment import EventAttachment
 from sentry.snuba.dataset import Dataset
 from sentry.types.activity import ActivityType
@@ -550,6 +551,9 @@ def start_group_reprocessing(
         for model in GROUP_MODELS_TO_MIGRATE:
             model.objects.filter(group_id=group_id).update(group_id=new_group.id)
 
+    # The grouphashes now point at the new group.
+    invalidate_grouphash_cache([project_id])
+
     # Get event counts of issue (for all environments etc). This was copypasted
     # and simplified from groupserializer.
     event_count = sync_count = snuba.aliased_query(
@@ -223,6 +223,30 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         """
         raise NotImplementedError
 
+    def get_query_windows(self, interval: str, end: datetime) -> list[tuple[datetime, datetime]]:
+        """
+        Returns the `(start, end)` windows that need to be queried to get the
+        rate of this condition at `end`: the interval itself, followed by the
+        comparison interval when comparing by percent.
+        """
+        _, duration = self.intervals[interval]
+        windows = [(end - duration, end)]
+        comparison_type = self.get_option("comparisonType", COMPARISON_TYPE_COUNT)
+        if comparison_type == COMPARISON_TYPE_PERCENT:
+            comparison_interval = comparison_intervals[self.get_option("comparisonInterval")][1]
+            comparison_end = end - comparison_interval
+            windows.append((comparison_end - duration, comparison_end))
+        return windows
+
+    @staticmethod
+    def get_rate_from_window_results(results: Sequence[int]) -> int:
+        """
+        Combines the results of the windows from `get_query_windows` into a rate.
+        """
+        if len(results) > 1:
+            return percent_increase(results[0], results[1])
+        return results[0]
+
     def get_rate(self, event: GroupEvent, interval: str, environment_id: str) -> int:
         _, duration = self.intervals[interval]
         end = timezone.now()
@@ -232,20 +256,15 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         if duration >= timedelta(hours=1):
             option_override_cm = options_override({"consistent": False})
         with option_override_cm:
-            result: int = self.query(event, end - duration, end, environment_id=environment_id)
-            comparison_type = self.get_option("comparisonType", COMPARISON_TYPE_COUNT)
-            if comparison_type == COMPARISON_TYPE_PERCENT:
-                comparison_interval = comparison_intervals[self.get_option("comparisonInterval")][1]
-                comparison_end = end - comparison_interval
-                # TODO: Figure out if there's a way we can do this less frequently. All queries are
-                # automatically cached for 10s. We could consider trying to cache this and the main
-                # query for 20s to reduce the load.
-                comparison_result = self.query(
-                    event, comparison_end - duration, comparison_end, environment_id=environment_id
-                )
-                result = percent_increase(result, comparison_result)
-
-        return result
+            # TODO: Figure out if there's a way we can do the comparison query less frequently. All
+            # queries are automatically cached for 10s. We could consider trying to cache this and
+            # the main query for 20s to reduce the load.
+            results = [
+                self.query(event, start, window_end, environment_id=environment_id)
+                for start, window_end in self.get_query_windows(interval, end)
+            ]
+
+        return self.get_rate_from_window_results(results)
 
     def get_snuba_query_result(
         self,
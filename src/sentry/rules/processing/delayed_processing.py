@@ -1,11 +1,23 @@
+import contextlib
 import logging
-from collections.abc import Mapping
+from collections import defaultdict
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, TypeGuard
+
+from django.utils import timezone
 
 from sentry.buffer.redis import BufferHookEvent, RedisBuffer, redis_buffer_registry
+from sentry.constants import ObjectStatus
 from sentry.models.project import Project
+from sentry.models.rule import Rule
+from sentry.rules import rules
+from sentry.rules.conditions.event_frequency import BaseEventFrequencyCondition
+from sentry.rules.processing.processor import get_match_function
 from sentry.utils import metrics
 from sentry.utils.query import RangeQuerySetWrapper
 from sentry.utils.safe import safe_execute
+from sentry.utils.snuba import options_override
 
 logger = logging.getLogger("sentry.rules.delayed_processing")
 
@@ -30,5 +42,154 @@ def process_delayed_alert_conditions(buffer: RedisBuffer) -> None:
                 )
 
 
+class UniqueConditionQuery(NamedTuple):
+    """
+    A single tsdb query shared by all frequency conditions of the same type
+    that count the same window in the same environment.
+    """
+
+    cls_id: str
+    environment_id: int | None
+    start: datetime
+    end: datetime
+
+
+class ConditionQueryPlanner:
+    """
+    Collects the windows every pending frequency condition needs for its
+    groups, merges them into the smallest set of batch queries, and fans the
+    results back out to the conditions.
+
+    All windows are anchored to the same point in time, so that rules with
+    the same interval (or a count comparison and the current window of a
+    percent comparison) share their queries.
+    """
+
+    def __init__(self, now: datetime | None = None) -> None:
+        self.now = now or timezone.now()
+        self.group_ids: dict[UniqueConditionQuery, set[int]] = defaultdict(set)
+        self.conditions: dict[UniqueConditionQuery, BaseEventFrequencyCondition] = {}
+        self.results: dict[UniqueConditionQuery, Mapping[int, int]] = {}
+
+    def get_queries(
+        self, condition: BaseEventFrequencyCondition, environment_id: int | None
+    ) -> list[UniqueConditionQuery] | None:
+        interval, value = condition._get_options()
+        if not (interval and value is not None):
+            return None
+        return [
+            UniqueConditionQuery(condition.id, environment_id, start, end)
+            for start, end in condition.get_query_windows(interval, self.now)
+        ]
+
+    def add(
+        self,
+        condition: BaseEventFrequencyCondition,
+        environment_id: int | None,
+        group_ids: Sequence[int],
+    ) -> None:
+        for query in self.get_queries(condition, environment_id) or ():
+            self.group_ids[query].update(group_ids)
+            self.conditions.setdefault(query, condition)
+
+    def execute(self) -> None:
+        for query, group_ids in self.group_ids.items():
+            # See `BaseEventFrequencyCondition.get_rate`
+            option_override_cm: contextlib.AbstractContextManager[object] = contextlib.nullcontext()
+            if query.end - query.start >= timedelta(hours=1):
+                option_override_cm = options_override({"consistent": False})
+            with option_override_cm:
+                self.results[query] = self.conditions[query].batch_query(
+                    group_ids=sorted(group_ids),
+                    start=query.start,
+                    end=query.end,
+                    environment_id=query.environment_id,  # type: ignore[arg-type]
+                )
+        metrics.incr("delayed_processing.condition_queries", amount=len(self.group_ids))
+
+    def passes(
+        self, condition: BaseEventFrequencyCondition, environment_id: int | None, group_id: int
+    ) -> bool:
+        queries = self.get_queries(condition, environment_id)
+        if not queries:
+            return False
+        rate = condition.get_rate_from_window_results(
+            [self.results[query].get(group_id, 0) for query in queries]
+        )
+        _, value = condition._get_options()
+        return rate > value  # type: ignore[operator]
+
+
+def supports_batch_query(condition_cls: Any) -> TypeGuard[type[BaseEventFrequencyCondition]]:
+    return (
+        isinstance(condition_cls, type)
+        and issubclass(condition_cls, BaseEventFrequencyCondition)
+        and condition_cls.batch_query_hook is not BaseEventFrequencyCondition.batch_query_hook
+    )
+
+
+def get_rules_to_groups(rule_group_pairs: Mapping[str, str]) -> dict[int, set[int]]:
+    rules_to_groups: dict[int, set[int]] = defaultdict(set)
+    for rule_group in rule_group_pairs.keys():
+        try:
+            rule_id, group_id = rule_group.split(":")
+            rules_to_groups[int(rule_id)].add(int(group_id))
+        except ValueError:
+            logger.warning("delayed_processing.invalid_rule_group", extra={"key": rule_group})
+    return rules_to_groups
+
+
+def get_batch_conditions(rule: Rule) -> list[BaseEventFrequencyCondition]:
+    conditions: list[BaseEventFrequencyCondition] = []
+    for condition_data in rule.data.get("conditions", ()):
+        condition_cls = rules.get(condition_data["id"])
+        if supports_batch_query(condition_cls):
+            conditions.append(condition_cls(rule.project, data=condition_data, rule=rule))
+    return conditions
+
+
+def get_rules_to_fire(
+    project: Project, rules_to_groups: Mapping[int, set[int]], now: datetime | None = None
+) -> dict[Rule, set[int]]:
+    """
+    Evaluates the frequency conditions of the given rules for their groups,
+    and returns the groups each rule fires for.
+    """
+    rules_ = Rule.objects.filter(
+        id__in=rules_to_groups.keys(), project=project, status=ObjectStatus.ACTIVE
+    ).select_related("project")
+
+    planner = ConditionQueryPlanner(now)
+    rule_conditions = []
+    for rule in rules_:
+        conditions = get_batch_conditions(rule)
+        if not conditions:
+            continue
+        for condition in conditions:
+            planner.add(condition, rule.environment_id, list(rules_to_groups[rule.id]))
+        rule_conditions.append((rule, conditions))
+
+    with metrics.timer("delayed_processing.execute_condition_queries.duration"):
+        planner.execute()
+
+    rules_to_fire: dict[Rule, set[int]] = defaultdict(set)
+    for rule, conditions in rule_conditions:
+        match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
+        predicate_func = get_match_function(match)
+        if predicate_func is None:
+            continue
+        for group_id in rules_to_groups[rule.id]:
+            if predicate_func(
+                planner.passes(condition, rule.environment_id, group_id) for condition in conditions
+            ):
+                rules_to_fire[rule].add(group_id)
+    return rules_to_fire
+
+
 def apply_delayed(project: Project, rule_group_pairs: Mapping[str, str]) -> None:
-    pass
+    rules_to_groups = get_rules_to_groups(rule_group_pairs)
+    rules_to_fire = get_rules_to_fire(project, rules_to_groups)
+    metrics.incr(
+        "delayed_processing.rules_to_fire",
+        amount=sum(len(group_ids) for group_ids in rules_to_fire.values()),
+    )
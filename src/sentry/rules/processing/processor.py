@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import logging
+import time
 import uuid
-from collections.abc import Callable, Collection, Mapping, MutableMapping, Sequence
+from collections.abc import Callable, Collection, Hashable, Mapping, MutableMapping, Sequence
+from dataclasses import dataclass
 from datetime import timedelta
 from random import randrange
 from typing import Any
@@ -10,11 +12,11 @@ from typing import Any
 from django.core.cache import cache
 from django.utils import timezone
 
-from sentry import analytics
+from sentry import analytics, options
 from sentry.eventstore.models import GroupEvent
 from sentry.models.environment import Environment
 from sentry.models.grouprulestatus import GroupRuleStatus
-from sentry.models.rule import Rule
+from sentry.models.rule import Rule, get_rule_plan_cache_key
 from sentry.models.rulefirehistory import RuleFireHistory
 from sentry.models.rulesnooze import RuleSnooze
 from sentry.rules import EventState, history, rules
@@ -22,10 +24,23 @@ from sentry.rules.actions.base import instantiate_action
 from sentry.rules.conditions.base import EventCondition
 from sentry.rules.filters.base import EventFilter
 from sentry.types.rules import RuleFuture
+from sentry.utils import json, metrics
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
 
 SLOW_CONDITION_MATCHES = ["event_frequency"]
+# Filters that need to hit the cache or the database to make a decision.
+SLOW_FILTER_MATCHES = ["latest_release", "latest_adopted_release", "assigned_to"]
+
+# Bump whenever the structure of `RulePlan` changes, so that plans cached by an
+# older version are rebuilt instead of being unpickled.
+RULE_PLAN_VERSION = 1
+RULE_PLAN_CACHE_TTL = 60
+
+# Rules taking longer than this (in seconds) to evaluate are logged.
+SLOW_RULE_THRESHOLD = 1.0
+
+logger = logging.getLogger("sentry.rules")
 
 
 def get_match_function(match_name: str) -> Callable[..., bool] | None:
@@ -45,6 +60,109 @@ def is_condition_slow(condition: Mapping[str, str]) -> bool:
     return False
 
 
+def is_filter_slow(condition: Mapping[str, str]) -> bool:
+    for slow_filter in SLOW_FILTER_MATCHES:
+        if slow_filter in condition["id"]:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class PlannedPredicate:
+    condition: dict[str, Any]
+    # Identical predicates (of rules in the same environment) share a key, and
+    # are only evaluated once per event.
+    key: Hashable
+
+
+@dataclass(frozen=True)
+class PlannedRule:
+    rule: Rule
+    filters: Sequence[PlannedPredicate]
+    conditions: Sequence[PlannedPredicate]
+    filter_match: str
+    condition_match: str
+    frequency: int
+
+    @property
+    def has_slow_conditions(self) -> bool:
+        return any(is_condition_slow(predicate.condition) for predicate in self.conditions)
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    version: int
+    rules: Sequence[PlannedRule]
+    snoozed_rule_ids: frozenset[int]
+
+
+def _get_predicate_key(condition: dict[str, Any], rule: Rule) -> Hashable:
+    # `name` is a rendered label and `uuid` identifies the predicate within the
+    # rule, neither has any effect on the outcome.
+    data = sorted((k, v) for k, v in condition.items() if k not in ("name", "uuid"))
+    return json.dumps(data), rule.environment_id
+
+
+def plan_rule(rule: Rule) -> PlannedRule:
+    """
+    Splits the predicates of a rule into filters and conditions, and orders
+    both so that the cheapest ones are evaluated first. Match functions
+    short-circuit, and their outcome does not depend on the order.
+    """
+    condition_list = []
+    filter_list = []
+    for rule_cond in rule.data.get("conditions", ()):
+        rule_cls = rules.get(rule_cond["id"])
+        if rule_cls is None:
+            logger.warning("Unregistered condition or filter %r", rule_cond["id"])
+        predicate = PlannedPredicate(rule_cond, _get_predicate_key(rule_cond, rule))
+        if rule_cls is not None and rule_cls.rule_type == "condition/event":
+            condition_list.append(predicate)
+        else:
+            filter_list.append(predicate)
+
+    condition_list.sort(key=lambda predicate: is_condition_slow(predicate.condition))
+    filter_list.sort(key=lambda predicate: is_filter_slow(predicate.condition))
+
+    return PlannedRule(
+        rule=rule,
+        filters=filter_list,
+        conditions=condition_list,
+        filter_match=rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH,
+        condition_match=rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH,
+        frequency=rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY,
+    )
+
+
+def build_rule_plan(project_id: int) -> RulePlan:
+    rules_: Sequence[Rule] = Rule.get_for_project(project_id)
+    snoozed_rule_ids = frozenset(
+        RuleSnooze.objects.filter(rule__in=rules_, user_id=None).values_list("rule", flat=True)
+    )
+    return RulePlan(
+        version=RULE_PLAN_VERSION,
+        rules=[plan_rule(rule) for rule in rules_ if rule.id not in snoozed_rule_ids],
+        snoozed_rule_ids=snoozed_rule_ids,
+    )
+
+
+def get_rule_plan(project_id: int) -> RulePlan:
+    """
+    Returns the rule plan of a project from the cache, or builds it. Saving or
+    deleting a `Rule` or a `RuleSnooze` of the project invalidates the plan.
+    """
+    cache_key = get_rule_plan_cache_key(project_id)
+    plan = cache.get(cache_key)
+    if isinstance(plan, RulePlan) and plan.version == RULE_PLAN_VERSION:
+        metrics.incr("rules.processor.rule_plan", tags={"result": "hit"})
+        return plan
+
+    metrics.incr("rules.processor.rule_plan", tags={"result": "miss"})
+    plan = build_rule_plan(project_id)
+    cache.set(cache_key, plan, RULE_PLAN_CACHE_TTL)
+    return plan
+
+
 class RuleProcessor:
     logger = logging.getLogger("sentry.rules")
 
@@ -70,6 +188,8 @@ class RuleProcessor:
         self.grouped_futures: MutableMapping[
             str, tuple[Callable[[GroupEvent, Sequence[RuleFuture]], None], list[RuleFuture]]
         ] = {}
+        # Outcomes of predicates shared between rules, see `PlannedPredicate`.
+        self.predicate_results: MutableMapping[Hashable, bool | None] = {}
 
     def get_rules(self) -> Sequence[Rule]:
         """Get all of the rules for this project from the DB (or cache)."""
@@ -157,6 +277,16 @@ class RuleProcessor:
         )
         return passes
 
+    def predicate_matches(
+        self, predicate: PlannedPredicate, state: EventState, rule: Rule
+    ) -> bool | None:
+        if predicate.key in self.predicate_results:
+            metrics.incr("rules.processor.predicate_deduplicated")
+            return self.predicate_results[predicate.key]
+        passes = self.condition_matches(predicate.condition, state, rule)
+        self.predicate_results[predicate.key] = passes
+        return passes
+
     def get_rule_type(self, condition: Mapping[str, Any]) -> str | None:
         rule_cls = rules.get(condition["id"])
         if rule_cls is None:
@@ -175,11 +305,15 @@ class RuleProcessor:
             has_escalated=self.has_escalated,
         )
 
-    def apply_rule(self, rule: Rule, status: GroupRuleStatus) -> None:
+    def apply_rule(
+        self, rule: Rule, status: GroupRuleStatus, planned_rule: PlannedRule | None = None
+    ) -> None:
         """
         If all conditions and filters pass, execute every action.
 
         :param rule: `Rule` object
+        :param planned_rule: the `PlannedRule` of `rule`, if it is applied
+            as part of a `RulePlan`
         :return: void
         """
         logging_details = {
@@ -194,10 +328,13 @@ class RuleProcessor:
             "new_group_environment": self.is_new_group_environment,
         }
 
-        condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
-        filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
-        rule_condition_list = rule.data.get("conditions", ())
-        frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
+        if planned_rule is None:
+            planned_rule = plan_rule(rule)
+            # Predicates are only shared between the rules of a plan.
+            self.predicate_results.clear()
+        condition_match = planned_rule.condition_match
+        filter_match = planned_rule.filter_match
+        frequency = planned_rule.frequency
         try:
             environment = self.event.get_environment()
         except Environment.DoesNotExist:
@@ -213,24 +350,13 @@ class RuleProcessor:
 
         state = self.get_state()
 
-        condition_list = []
-        filter_list = []
-        for rule_cond in rule_condition_list:
-            if self.get_rule_type(rule_cond) == "condition/event":
-                condition_list.append(rule_cond)
-            else:
-                filter_list.append(rule_cond)
-
-        # Sort `condition_list` so that most expensive conditions run last.
-        condition_list.sort(key=lambda condition: is_condition_slow(condition))
-
         for predicate_list, match, name in (
-            (filter_list, filter_match, "filter"),
-            (condition_list, condition_match, "condition"),
+            (planned_rule.filters, filter_match, "filter"),
+            (planned_rule.conditions, condition_match, "condition"),
         ):
             if not predicate_list:
                 continue
-            predicate_iter = (self.condition_matches(f, state, rule) for f in predicate_list)
+            predicate_iter = (self.predicate_matches(p, state, rule) for p in predicate_list)
             predicate_func = get_match_function(match)
             if predicate_func:
                 if not predicate_func(predicate_iter):
@@ -306,6 +432,10 @@ class RuleProcessor:
             return {}.values()
 
         self.grouped_futures.clear()
+        if options.get("rules.processor.use-rule-plan"):
+            self.apply_plan(get_rule_plan(self.project.id))
+            return self.grouped_futures.values()
+
         rules = self.get_rules()
         snoozed_rules = RuleSnooze.objects.filter(rule__in=rules, user_id=None).values_list(
             "rule", flat=True
@@ -316,3 +446,24 @@ class RuleProcessor:
                 self.apply_rule(rule, rule_statuses[rule.id])
 
         return self.grouped_futures.values()
+
+    def apply_plan(self, plan: RulePlan) -> None:
+        self.predicate_results.clear()
+        rule_statuses = self.bulk_get_rule_status([planned.rule for planned in plan.rules])
+        for planned_rule in plan.rules:
+            rule = planned_rule.rule
+            start = time.monotonic()
+            self.apply_rule(rule, rule_statuses[rule.id], planned_rule)
+            duration = time.monotonic() - start
+
+            # Rule ids are unbounded, so they are only logged for slow rules.
+            metrics.timing(
+                "rules.processor.apply_rule.duration",
+                duration,
+                tags={"has_slow_conditions": planned_rule.has_slow_conditions},
+            )
+            if duration > SLOW_RULE_THRESHOLD:
+                self.logger.info(
+                    "rule_processor.slow_rule",
+                    extra={"rule_id": rule.id, "project_id": self.project.id, "duration": duration},
+                )
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import click
+
+from sentry.runner.decorators import configuration
+
+
+@click.group()
+def nodestore() -> None:
+    """Tools for interacting with node storage."""
+
+
+@nodestore.command("train-dictionary")
+@click.option("--platform", help="Train a dictionary for all projects of this platform.")
+@click.option("--project", "project_id", type=int, help="Train a dictionary for one project.")
+@click.option("--samples", default=2000, show_default=True, help="Number of nodes to sample.")
+@click.option("--size", default=112640, show_default=True, help="Maximum dictionary size in bytes.")
+@click.option("--days", default=7, show_default=True, help="Sample events from the last N days.")
+@configuration
+def train_dictionary(
+    platform: str | None, project_id: int | None, samples: int, size: int, days: int
+) -> None:
+    """
+    Train a zstd dictionary from a sample of existing nodes.
+
+    The dictionary is written to SENTRY_NODESTORE_DICTIONARIES_DIR, and is
+    picked up for new nodes of that platform or project once workers restart.
+    """
+    from django.conf import settings
+    from django.utils import timezone
+
+    from sentry import eventstore, nodestore
+    from sentry.eventstore.models import Event
+    from sentry.models.project import Project
+    from sentry.nodestore.dictionaries import DictionaryRegistry, train_dictionary, write_dictionary
+
+    if (platform is None) == (project_id is None):
+        raise click.UsageError("Provide exactly one of --platform or --project.")
+
+    path = settings.SENTRY_NODESTORE_DICTIONARIES_DIR
+    if not path:
+        raise click.ClickException("SENTRY_NODESTORE_DICTIONARIES_DIR is not configured.")
+
+    if project_id is not None:
+        projects = list(Project.objects.filter(id=project_id))
+        name = f"project-{project_id}"
+    else:
+        projects = list(Project.objects.filter(platform=platform).order_by("-id")[:100])
+        name = str(platform)
+
+    if not projects:
+        raise click.ClickException("No matching projects found.")
+
+    end = timezone.now()
+    start = end - timedelta(days=days)
+    per_project = max(samples // len(projects), 1)
+    node_ids: list[str] = []
+    for project in projects:
+        events = eventstore.backend.get_unfetched_events(
+            filter=eventstore.Filter(project_ids=[project.id], start=start, end=end),
+            limit=min(per_project, 10000),
+            referrer="nodestore.train_dictionary",
+            tenant_ids={"organization_id": project.organization_id},
+        )
+        node_ids.extend(Event.generate_node_id(project.id, event.event_id) for event in events)
+        if len(node_ids) >= samples:
+            break
+
+    sample_data = []
+    for node_id in node_ids[:samples]:
+        value = nodestore.backend.get_bytes(node_id)
+        if value:
+            sample_data.append(nodestore.backend._decompress(value))
+
+    if len(sample_data) < 10:
+        raise click.ClickException(f"Only found {len(sample_data)} nodes, not enough to train.")
+
+    dict_id = DictionaryRegistry.from_directory(path).next_dict_id()
+    dictionary = train_dictionary(sample_data, size, dict_id)
+    filename = write_dictionary(path, name, dictionary)
+    click.echo(f"Trained dictionary {dict_id} for {name} from {len(sample_data)} nodes: {filename}")
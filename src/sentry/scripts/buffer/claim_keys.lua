@@ -0,0 +1,18 @@
+-- Atomically claim a batch of buffered counter hashes for flushing.
+--
+-- For every buffer key this reads the whole hash, deletes it and removes it
+-- from the pending set, so that a concurrent `incr` either lands before the
+-- claim (and is flushed with it) or after it (and starts a fresh hash.)
+assert(#KEYS >= 1, "provide the pending set key followed by the buffer keys")
+
+local pending_key = KEYS[1]
+local results = {}
+
+for i = 2, #KEYS do
+    local key = KEYS[i]
+    results[i - 1] = redis.call("HGETALL", key)
+    redis.call("DEL", key)
+    redis.call("ZREM", pending_key, key)
+end
+
+return results
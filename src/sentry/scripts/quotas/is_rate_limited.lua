@@ -17,29 +17,47 @@
 -- quotas are unaffected. The result is a Lua table/array (Redis multi bulk
 -- reply) that specifies whether or not the item was *rejected* based on the
 -- provided limit.
-assert(#KEYS == #ARGV, "incorrect number of keys and arguments provided")
+--
+-- If an additional ``1`` is passed as the last value of ``ARGV``, the
+-- rejections are followed by the usage of each quota (including the item if it
+-- was accepted). Quotas without a limit report a usage of 0.
+assert(#KEYS == #ARGV or #KEYS + 1 == #ARGV, "incorrect number of keys and arguments provided")
 assert(#KEYS % 2 == 0, "there must be an even number of keys")
 
+local report_usage = #KEYS + 1 == #ARGV and ARGV[#ARGV] == "1"
 local results = {}
+local usages = {}
 local failed = false
 for i=1, #KEYS, 2 do
     local limit = tonumber(ARGV[i])
     local rejected = false
+    local usage = 0
     -- limit=-1 means "no limit"
     if limit >= 0 then
-        rejected = (redis.call('GET', KEYS[i]) or 0) - (redis.call('GET', KEYS[i + 1]) or 0) + 1 > limit
+        usage = (redis.call('GET', KEYS[i]) or 0) - (redis.call('GET', KEYS[i + 1]) or 0)
+        rejected = usage + 1 > limit
     end
 
     if rejected then
         failed = true
     end
     results[(i + 1) / 2] = rejected
+    usages[(i + 1) / 2] = usage
 end
 
 if not failed then
     for i=1, #KEYS, 2 do
         redis.call('INCR', KEYS[i])
         redis.call('EXPIREAT', KEYS[i], ARGV[i + 1])
+        if tonumber(ARGV[i]) >= 0 then
+            usages[(i + 1) / 2] = usages[(i + 1) / 2] + 1
+        end
+    end
+end
+
+if report_usage then
+    for i=1, #usages do
+        results[#KEYS / 2 + i] = usages[i]
     end
 end
 
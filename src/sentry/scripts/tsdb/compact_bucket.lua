@@ -0,0 +1,28 @@
+--[[
+
+Adds the counts of a bucket of the finest rollup to a hash of a coarser
+rollup, at most once.
+
+The last bucket that has been added to the hash is kept in its ``compacted``
+field. Buckets are compacted in order, so buckets up to and including that one
+are skipped. This makes retrying an interrupted compaction safe.
+
+KEYS[1] is the hash. ARGV contains the bucket, the expiration timestamp of
+the hash, and pairs of fields and amounts.
+
+Returns 1 if the counts have been added, 0 if the bucket was skipped.
+
+]]--
+
+local bucket = tonumber(ARGV[1])
+local compacted = tonumber(redis.call('HGET', KEYS[1], 'compacted'))
+if compacted ~= nil and compacted >= bucket then
+    return 0
+end
+
+for i = 3, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], 'compacted', bucket)
+redis.call('EXPIREAT', KEYS[1], ARGV[2])
+return 1
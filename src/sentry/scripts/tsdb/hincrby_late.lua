@@ -0,0 +1,21 @@
+--[[
+
+Increments fields of a hash of the finest rollup for events that are too late
+to be compacted, and that are therefore written to the coarser rollups
+directly.
+
+Next to every field, the same amount is added to a ``late:<field>`` field so
+that compaction can tell late writes apart from the ones it needs to add to
+the coarser rollups. Both are incremented atomically, so compaction never
+observes one without the other.
+
+KEYS[1] is the hash. ARGV contains the expiration timestamp of the hash,
+followed by pairs of fields and amounts.
+
+]]--
+
+for i = 2, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call('HINCRBY', KEYS[1], 'late:' .. ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIREAT', KEYS[1], ARGV[1])
@@ -0,0 +1,24 @@
+--[[
+
+Reads fields of many hashes in a single call.
+
+KEYS are the hashes to read from. ARGV contains, for every hash in KEYS (in
+the same order), the number of fields to read followed by the fields
+themselves.
+
+Returns a flat list with the value of every requested field, in the order
+they were requested. Fields that don't exist are returned as nil.
+
+]]--
+
+local results = {}
+local offset = 1
+for _, key in ipairs(KEYS) do
+    local count = tonumber(ARGV[offset])
+    local values = redis.call('HMGET', key, unpack(ARGV, offset + 1, offset + count))
+    for i = 1, count do
+        results[#results + 1] = values[i]
+    end
+    offset = offset + count + 1
+end
+return results
@@ -114,6 +114,12 @@ class IndexerBatch:
         self.filtered_msg_meta: set[BrokerMeta] = set()
         self.parsed_payloads_by_meta: MutableMapping[BrokerMeta, ParsedMessage] = {}
 
+        # Decode and encode payloads with orjson straight from and to bytes,
+        # decided once for the whole batch.
+        self._use_orjson_fast_path = in_random_rollout(
+            "sentry-metrics.indexer.enable-orjson-fast-path"
+        )
+
         self._extract_messages()
 
     @metrics.wraps("process_messages.extract_messages")
@@ -167,15 +173,16 @@ class IndexerBatch:
         msg: Message[KafkaPayload],
     ) -> ParsedMessage:
         assert isinstance(msg.value, BrokerValue)
-        decoded_str = msg.payload.value.decode()
 
         try:
-            if in_random_rollout("sentry-metrics.indexer.enable-orjson"):
+            if self._use_orjson_fast_path:
+                parsed_payload: ParsedMessage = orjson.loads(msg.payload.value)
+            elif in_random_rollout("sentry-metrics.indexer.enable-orjson"):
                 # Always create a span because json.loads passes skip_trace=False
                 with sentry_sdk.start_span(op="sentry.utils.json.loads"):
-                    parsed_payload: ParsedMessage = orjson.loads(decoded_str)
+                    parsed_payload = orjson.loads(msg.payload.value.decode())
             else:
-                parsed_payload = json.loads(decoded_str, use_rapid_json=True)
+                parsed_payload = json.loads(msg.payload.value.decode(), use_rapid_json=True)
         except (orjson.JSONDecodeError, rapidjson.JSONDecodeError):
             logger.exception(
                 "process_messages.invalid_json",
@@ -506,9 +513,13 @@ class IndexerBatch:
                 with metrics.timer(
                     "metrics_consumer.reconstruct_messages.build_new_payload.json_step"
                 ):
+                    if self._use_orjson_fast_path:
+                        encoded_payload = orjson.dumps(new_payload_value)
+                    else:
+                        encoded_payload = rapidjson.dumps(new_payload_value).encode()
                     kafka_payload = KafkaPayload(
                         key=message.payload.key,
-                        value=rapidjson.dumps(new_payload_value).encode(),
+                        value=encoded_payload,
                         headers=[
                             *message.payload.headers,
                             ("mapping_sources", mapping_header_content),
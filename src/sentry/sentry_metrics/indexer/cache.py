@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 import logging
+import os
 import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from collections.abc import Collection, Iterable, Mapping, MutableMapping, Sequence
 from datetime import datetime, timedelta
 
@@ -33,6 +38,7 @@ _INDEXER_CACHE_RESOLVE_CACHE_REPLENISHMENT_METRIC = (
 _INDEXER_CACHE_DOUBLE_WRITE_METRIC = "sentry_metrics.indexer.memcache.double-write"
 _INDEXER_CACHE_DOUBLE_READ_METRIC = "sentry_metrics.indexer.memcache.new-schema-read"
 _INDEXER_CACHE_STALE_KEYS_METRIC = "sentry_metrics.indexer.memcache.stale-keys"
+_INDEXER_LOCAL_CACHE_BULK_RECORD_METRIC = "sentry_metrics.indexer.local_cache"
 
 # only used to compare to the older version of the PGIndexer
 _INDEXER_CACHE_FETCH_METRIC = "sentry_metrics.indexer.memcache.fetch"
@@ -44,6 +50,21 @@ NAMESPACED_READ_FEAT_FLAG = "sentry-metrics.indexer.read-new-cache-namespace"
 BULK_RECORD_CACHE_NAMESPACE = "br"
 RESOLVE_CACHE_NAMESPACE = "res"
 
+LOCAL_CACHE_ENABLED_OPTION = "sentry-metrics.indexer.local-cache.enabled"
+LOCAL_CACHE_SIZE_OPTION = "sentry-metrics.indexer.local-cache.size"
+
+# Entries of the in-process cache expire much sooner than the ones in memcache,
+# which keeps the window in which a process can serve an id that has been
+# deleted from the indexer small.
+LOCAL_CACHE_TTL = 300
+
+
+def _randomize_ttl(cache_ttl: int) -> int:
+    # introduce jitter in the cache_ttl so that when we have large
+    # amount of new keys written into the cache, they don't expire all at once
+    jitter = random.uniform(0, 0.25) * cache_ttl
+    return int(cache_ttl + jitter)
+
 
 class StringIndexerCache:
     def __init__(self, cache_name: str, partition_key: str):
@@ -53,11 +74,7 @@ class StringIndexerCache:
 
     @property
     def randomized_ttl(self) -> int:
-        # introduce jitter in the cache_ttl so that when we have large
-        # amount of new keys written into the cache, they don't expire all at once
-        cache_ttl = settings.SENTRY_METRICS_INDEXER_CACHE_TTL
-        jitter = random.uniform(0, 0.25) * cache_ttl
-        return int(cache_ttl + jitter)
+        return _randomize_ttl(settings.SENTRY_METRICS_INDEXER_CACHE_TTL)
 
     def _make_cache_key(self, key: str) -> str:
         use_case_id, org_id, string = key.split(":", 2)
@@ -205,10 +222,138 @@ class StringIndexerCache:
             )
 
 
+# Halves a 4-bit counter, used with `bytearray.translate` to age the sketch.
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class FrequencySketch:
+    """
+    A count-min sketch of 4-bit counters that estimates how often a key has
+    been seen recently. Once the number of increments reaches ten times the
+    size of the cache, all counters are halved, so keys that were popular a
+    while ago don't stay in the cache forever (TinyLFU).
+    """
+
+    depth = 4
+    max_count = 15
+
+    def __init__(self, size: int) -> None:
+        width = 1 << max(2 * size - 1, 63).bit_length()
+        self._mask = width - 1
+        self._table = [bytearray(width) for _ in range(self.depth)]
+        self._sample_size = 10 * max(size, 1)
+        self._additions = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        h = hash(key)
+        step = (h >> 32) | 1
+        return [(h + i * step) & self._mask for i in range(self.depth)]
+
+    def increment(self, key: str) -> None:
+        added = False
+        for row, index in zip(self._table, self._indexes(key)):
+            if row[index] < self.max_count:
+                row[index] += 1
+                added = True
+
+        if added:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._table = [row.translate(_HALVE) for row in self._table]
+                self._additions //= 2
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._table, self._indexes(key)))
+
+
+_local_caches: weakref.WeakSet[LocalStringIndexerCache] = weakref.WeakSet()
+
+
+class LocalStringIndexerCache:
+    """
+    A bounded in-process cache of indexer ids that sits in front of
+    `StringIndexerCache`.
+
+    Entries are evicted in LRU order, but a new key only replaces the LRU entry
+    if it has been looked up more often, according to a `FrequencySketch`.
+    This keeps the few strings that make up most of the traffic cached even
+    when a batch is full of one-off tag values.
+    """
+
+    def __init__(self, maxsize: int, ttl: int = LOCAL_CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._sketch = FrequencySketch(maxsize)
+        self._lock = threading.Lock()
+        _local_caches.add(self)
+
+    def _reset_lock(self) -> None:
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, int]:
+        now = time.monotonic()
+        results = {}
+        with self._lock:
+            for key in keys:
+                self._sketch.increment(key)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                results[key] = value
+        return results
+
+    def set_many(self, key_values: Mapping[str, int]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key, value in key_values.items():
+                if key not in self._entries and len(self._entries) >= self.maxsize:
+                    victim = next(iter(self._entries))
+                    _, victim_expires_at = self._entries[victim]
+                    # Expired entries are always evicted, live ones only if the
+                    # new key is seen more often.
+                    if victim_expires_at > now:
+                        if self._sketch.estimate(key) <= self._sketch.estimate(victim):
+                            continue
+                    del self._entries[victim]
+
+                self._entries[key] = (value, now + _randomize_ttl(self.ttl))
+                self._entries.move_to_end(key)
+
+
+def _reset_local_cache_locks() -> None:
+    # A lock held by another thread while forking would never be released in
+    # the child. The entries themselves are still valid and are kept.
+    for local_cache in _local_caches:
+        local_cache._reset_lock()
+
+
+os.register_at_fork(after_in_child=_reset_local_cache_locks)
+
+
 class CachingIndexer(StringIndexer):
     def __init__(self, cache: StringIndexerCache, indexer: StringIndexer) -> None:
         self.cache = cache
         self.indexer = indexer
+        self._local_cache: LocalStringIndexerCache | None = None
+
+    def _get_local_cache(self) -> LocalStringIndexerCache | None:
+        if not options.get(LOCAL_CACHE_ENABLED_OPTION):
+            return None
+
+        size = options.get(LOCAL_CACHE_SIZE_OPTION)
+        local_cache = self._local_cache
+        if local_cache is None or local_cache.maxsize != size:
+            local_cache = self._local_cache = LocalStringIndexerCache(size)
+        return local_cache
 
     def bulk_record(
         self, strings: Mapping[UseCaseID, Mapping[OrgId, set[str]]]
@@ -216,9 +361,32 @@ class CachingIndexer(StringIndexer):
         cache_keys = UseCaseKeyCollection(strings)
         metrics.gauge("sentry_metrics.indexer.lookups_per_batch", value=cache_keys.size)
         cache_key_strs = cache_keys.as_strings()
-        cache_results = self.cache.get_many(BULK_RECORD_CACHE_NAMESPACE, cache_key_strs)
 
-        hits = [k for k, v in cache_results.items() if v is not None]
+        local_cache = self._get_local_cache()
+        if local_cache is not None:
+            local_results = local_cache.get_many(cache_key_strs)
+            metrics.incr(
+                _INDEXER_LOCAL_CACHE_BULK_RECORD_METRIC,
+                tags={"cache_hit": "true", "caller": "get_many_ids"},
+                amount=len(local_results),
+            )
+            metrics.incr(
+                _INDEXER_LOCAL_CACHE_BULK_RECORD_METRIC,
+                tags={"cache_hit": "false", "caller": "get_many_ids"},
+                amount=len(cache_key_strs) - len(local_results),
+            )
+            cache_key_strs = [k for k in cache_key_strs if k not in local_results]
+        else:
+            local_results = {}
+
+        if cache_key_strs:
+            cache_results = self.cache.get_many(BULK_RECORD_CACHE_NAMESPACE, cache_key_strs)
+        else:
+            cache_results = {}
+
+        hits = {k: v for k, v in cache_results.items() if v is not None}
+        if local_cache is not None and hits:
+            local_cache.set_many(hits)
 
         # record all the cache hits we had
         metrics.incr(
@@ -240,7 +408,10 @@ class CachingIndexer(StringIndexer):
 
         cache_key_results = UseCaseKeyResults()
         cache_key_results.add_use_case_key_results(
-            [UseCaseKeyResult.from_string(k, v) for k, v in cache_results.items() if v is not None],
+            [
+                UseCaseKeyResult.from_string(k, v)
+                for k, v in (*local_results.items(), *hits.items())
+            ],
             FetchType.CACHE_HIT,
         )
 
@@ -256,9 +427,10 @@ class CachingIndexer(StringIndexer):
             }
         )
 
-        self.cache.set_many(
-            BULK_RECORD_CACHE_NAMESPACE, db_record_key_results.get_mapped_strings_to_ints()
-        )
+        db_record_mapping = db_record_key_results.get_mapped_strings_to_ints()
+        self.cache.set_many(BULK_RECORD_CACHE_NAMESPACE, db_record_mapping)
+        if local_cache is not None:
+            local_cache.set_many(db_record_mapping)
 
         return cache_key_results.merge(db_record_key_results)
 
@@ -31,14 +31,24 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
         self.retention = retention
         self.candidate_set_limit = candidate_set_limit
 
-    def _build_signature_arguments(self, features):
-        if not features:
-            return [0] * self.bands
-
-        arguments = []
-        for bucket in band(self.bands, self.signature_builder(features)):
-            arguments.extend([1, ",".join(str(b) for b in bucket), 1])
-        return arguments
+    def _build_signature_arguments(self, feature_sets):
+        # Signatures of all items are built at once so that features shared
+        # between them are only hashed once.
+        signatures = iter(
+            self.signature_builder.build_many([features for features in feature_sets if features])
+        )
+
+        results: list[list[int | str]] = []
+        for features in feature_sets:
+            if not features:
+                results.append([0] * self.bands)
+                continue
+
+            arguments: list[int | str] = []
+            for bucket in band(self.bands, next(signatures)):
+                arguments.extend([1, ",".join(str(b) for b in bucket), 1])
+            results.append(arguments)
+        return results
 
     def __index(self, scope, args):
         # scope must be passed into the script call as a key to allow the
@@ -89,9 +99,12 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
             limit if limit is not None else -1,
         ]
 
-        for idx, threshold, features in items:
+        signature_arguments = self._build_signature_arguments(
+            [features for _, _, features in items]
+        )
+        for (idx, threshold, _), signature in zip(items, signature_arguments):
             arguments.extend([idx, threshold])
-            arguments.extend(self._build_signature_arguments(features))
+            arguments.extend(signature)
 
         return self._as_search_result(self.__index(scope, arguments))
 
@@ -136,9 +149,10 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
             key,
         ]
 
-        for idx, features in items:
+        signature_arguments = self._build_signature_arguments([features for _, features in items])
+        for (idx, _), signature in zip(items, signature_arguments):
             arguments.append(idx)
-            arguments.extend(self._build_signature_arguments(features))
+            arguments.extend(signature)
 
         return self.__index(scope, arguments)
 
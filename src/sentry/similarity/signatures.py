@@ -1,17 +1,63 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+import threading
+from collections.abc import Iterable, Sequence
 
 import mmh3
+from cachetools import LRUCache
 
 
 class MinHashSignatureBuilder:
-    def __init__(self, columns: int, rows: int) -> None:
+    """
+    Builds MinHash signatures of `columns` values in `[0, rows)` for sets of
+    features.
+
+    Most features (frames, message shingles) recur in many events of a
+    project, so the column hashes of every feature are cached. A signature is
+    then the column-wise minimum of the cached hash vectors of its features.
+    """
+
+    def __init__(self, columns: int, rows: int, cache_size: int = 10000) -> None:
         self.columns = columns
         self.rows = rows
+        self._cache: LRUCache[str, tuple[int, ...]] = LRUCache(maxsize=cache_size)
+        self._cache_lock = threading.Lock()
 
-    def __call__(self, features: Iterable[str]) -> list[int]:
+    def _get_hashes(self, features: Iterable[str]) -> dict[str, tuple[int, ...]]:
+        hashes: dict[str, tuple[int, ...]] = {}
+        missing = []
+        with self._cache_lock:
+            for feature in set(features):
+                value = self._cache.get(feature)
+                if value is None:
+                    missing.append(feature)
+                else:
+                    hashes[feature] = value
+
+        if missing:
+            computed = {
+                feature: tuple(
+                    mmh3.hash(feature, column) % self.rows for column in range(self.columns)
+                )
+                for feature in missing
+            }
+            hashes.update(computed)
+            with self._cache_lock:
+                self._cache.update(computed)
+
+        return hashes
+
+    def build_many(self, feature_sets: Sequence[Iterable[str]]) -> list[list[int]]:
+        """
+        Builds the signatures of several feature sets, hashing every distinct
+        feature only once.
+        """
+        feature_sets = [set(features) for features in feature_sets]
+        hashes = self._get_hashes(feature for features in feature_sets for feature in features)
         return [
-            min(mmh3.hash(feature, column) % self.rows for feature in features)
-            for column in range(self.columns)
+            list(map(min, zip(*(hashes[feature] for feature in features))))
+            for features in feature_sets
         ]
+
+    def __call__(self, features: Iterable[str]) -> list[int]:
+        return self.build_many([features])[0]
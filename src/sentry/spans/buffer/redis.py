@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import dataclasses
+from collections import defaultdict
+from collections.abc import Sequence
+
 import sentry_sdk
 from django.conf import settings
 from sentry_redis_tools.clients import RedisCluster, StrictRedis
@@ -26,6 +30,15 @@ def get_unprocessed_segments_key(partition_index: int) -> str:
     return f"performance-issues:unprocessed-segments:partition:{partition_index}"
 
 
+@dataclasses.dataclass(frozen=True)
+class BufferedSpan:
+    project_id: str | int
+    segment_id: str
+    timestamp: int
+    partition: int
+    span: bytes
+
+
 class RedisSpansBuffer:
     def __init__(self):
         self.client: RedisCluster | StrictRedis = get_redis_client()
@@ -63,6 +76,58 @@ class RedisSpansBuffer:
 
         return timestamp > int(last_processed_timestamp)
 
+    def write_spans_and_check_processing(self, spans: Sequence[BufferedSpan]) -> dict[int, int]:
+        """
+        Bulk version of `write_span_and_check_processing`. The spans of each
+        segment are pushed with one RPUSH, and new segments are added to the
+        unprocessed segments of their partition with one RPUSH per partition.
+
+        Returns the timestamp of the latest span that should trigger processing
+        for every partition that has one.
+        """
+        if not spans:
+            return {}
+
+        spans_by_segment: dict[str, list[BufferedSpan]] = defaultdict(list)
+        timestamps_by_partition: dict[int, list[int]] = defaultdict(list)
+        for span in spans:
+            spans_by_segment[get_segment_key(span.project_id, span.segment_id)].append(span)
+            timestamps_by_partition[span.partition].append(span.timestamp)
+
+        with self.client.pipeline() as p:
+            for segment_key, segment_spans in spans_by_segment.items():
+                p.rpush(segment_key, *(span.span for span in segment_spans))
+            for partition, timestamps in timestamps_by_partition.items():
+                p.getset(get_last_processed_timestamp_key(partition), timestamps[-1])
+            results = p.execute()
+
+        new_segments: dict[int, list[str]] = defaultdict(list)
+        with self.client.pipeline() as p:
+            for (segment_key, segment_spans), length in zip(spans_by_segment.items(), results):
+                if length == len(segment_spans):
+                    first_span = segment_spans[0]
+                    p.expire(segment_key, SEGMENT_TTL)
+                    new_segments[first_span.partition].append(
+                        json.dumps([first_span.timestamp, segment_key])
+                    )
+            for partition, values in new_segments.items():
+                p.rpush(get_unprocessed_segments_key(partition), *values)
+            p.execute()
+
+        processing_timestamps = {}
+        last_processed_timestamps = results[len(spans_by_segment) :]
+        for (partition, timestamps), last_processed_timestamp in zip(
+            timestamps_by_partition.items(), last_processed_timestamps
+        ):
+            # Replays the checks of writing the spans one by one.
+            previous = int(last_processed_timestamp) if last_processed_timestamp else None
+            for timestamp in timestamps:
+                if previous is not None and timestamp > previous:
+                    processing_timestamps[partition] = timestamp
+                previous = timestamp
+
+        return processing_timestamps
+
     def read_and_expire_many_segments(self, keys: list[str]) -> list[list[str | bytes]]:
         values = []
         with self.client.pipeline() as p:
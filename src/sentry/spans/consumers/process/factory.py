@@ -8,8 +8,10 @@ from arroyo import Topic as ArroyoTopic
 from arroyo.backends.kafka import KafkaProducer, build_kafka_configuration
 from arroyo.backends.kafka.consumer import Headers, KafkaPayload
 from arroyo.processing.strategies.abstract import ProcessingStrategy, ProcessingStrategyFactory
+from arroyo.processing.strategies.batching import BatchStep, ValuesBatch
 from arroyo.processing.strategies.produce import Produce
 from arroyo.processing.strategies.reduce import Reduce
+from arroyo.processing.strategies.run_task import RunTask
 from arroyo.processing.strategies.unfold import Unfold
 from arroyo.types import (
     FILTERED_PAYLOAD,
@@ -26,7 +28,7 @@ from sentry_kafka_schemas.schema_types.snuba_spans_v1 import SpanEvent
 
 from sentry import options
 from sentry.conf.types.kafka_definition import Topic
-from sentry.spans.buffer.redis import RedisSpansBuffer
+from sentry.spans.buffer.redis import BufferedSpan, RedisSpansBuffer
 from sentry.spans.consumers.process.strategy import CommitSpanOffsets, NoOp
 from sentry.utils.arroyo import MultiprocessingPool, RunTaskWithMultiprocessing
 from sentry.utils.kafka_config import get_kafka_producer_cluster_options, get_topic_definition
@@ -61,19 +63,27 @@ def _deserialize_span(value: bytes) -> Mapping[str, Any]:
     return SPAN_SCHEMA.decode(value)
 
 
-def _process_message(message: Message[KafkaPayload]) -> ProduceSegmentContext | FilteredPayload:
+def _get_allowed_project_id(message: Message[KafkaPayload]) -> int | None:
     if not options.get("standalone-spans.process-spans-consumer.enable"):
-        return FILTERED_PAYLOAD
+        return None
 
     try:
         project_id = get_project_id(message.payload.headers)
     except Exception:
         logger.exception("Failed to parse span message header")
-        return FILTERED_PAYLOAD
+        return None
 
     if project_id is None or project_id not in options.get(
         "standalone-spans.process-spans-consumer.project-allowlist"
     ):
+        return None
+
+    return project_id
+
+
+def _process_message(message: Message[KafkaPayload]) -> ProduceSegmentContext | FilteredPayload:
+    project_id = _get_allowed_project_id(message)
+    if project_id is None:
         return FILTERED_PAYLOAD
 
     assert isinstance(message.value, BrokerValue)
@@ -115,6 +125,59 @@ def process_message(message: Message[KafkaPayload]) -> ProduceSegmentContext | F
         return FILTERED_PAYLOAD
 
 
+def _parse_message(message: Message[KafkaPayload]) -> BufferedSpan | FilteredPayload:
+    project_id = _get_allowed_project_id(message)
+    if project_id is None:
+        return FILTERED_PAYLOAD
+
+    assert isinstance(message.value, BrokerValue)
+
+    payload_value = message.payload.value
+    segment_id = _deserialize_span(payload_value).get("segment_id", None)
+    if segment_id is None:
+        return FILTERED_PAYLOAD
+
+    return BufferedSpan(
+        project_id=project_id,
+        segment_id=segment_id,
+        timestamp=int(message.value.timestamp.timestamp()),
+        partition=message.value.partition.index,
+        span=payload_value,
+    )
+
+
+def parse_message(message: Message[KafkaPayload]) -> BufferedSpan | FilteredPayload:
+    try:
+        return _parse_message(message)
+    except Exception:
+        sentry_sdk.capture_exception()
+        return FILTERED_PAYLOAD
+
+
+def _buffer_spans(message: Message[ValuesBatch[BufferedSpan]]) -> dict[int, ProduceSegmentContext]:
+    spans = [value.payload for value in message.payload]
+
+    with sentry_sdk.start_transaction(op="process", name="spans.process.buffer_spans"):
+        sentry_sdk.set_measurement("spans.count", len(spans))
+        client = RedisSpansBuffer()
+        processing_timestamps = client.write_spans_and_check_processing(spans)
+
+    return {
+        partition: ProduceSegmentContext(
+            should_process_segments=True, timestamp=timestamp, partition=partition
+        )
+        for partition, timestamp in processing_timestamps.items()
+    }
+
+
+def buffer_spans(message: Message[ValuesBatch[BufferedSpan]]) -> dict[int, ProduceSegmentContext]:
+    try:
+        return _buffer_spans(message)
+    except Exception:
+        sentry_sdk.capture_exception()
+        return {}
+
+
 def _accumulator(result: dict[int, ProduceSegmentContext], value: BaseValue[ProduceSegmentContext]):
     context = value.payload
     if not context.should_process_segments:
@@ -134,6 +197,14 @@ def accumulator(
         return result
 
 
+def batch_accumulator(
+    result: dict[int, ProduceSegmentContext],
+    value: BaseValue[dict[int, ProduceSegmentContext]],
+) -> dict[int, ProduceSegmentContext]:
+    result.update(value.payload)
+    return result
+
+
 def _expand_segments(context_dict: dict[int, ProduceSegmentContext]):
     buffered_segments: list[KafkaPayload | FilteredPayload] = []
 
@@ -183,6 +254,8 @@ def expand_segments(context_dict: dict[int, ProduceSegmentContext]):
 class ProcessSpansStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
     """
     1. Process spans and push them to redis
+       (If `standalone-spans.process-spans-consumer.batch-writes` is set,
+       spans are parsed first, and then batched and pushed to redis in bulk)
     2. Commit offsets for processed spans
     3. Reduce the messages to find the latest timestamp to process
     4. Fetch all segments are two minutes or older and expire the keys so they
@@ -228,6 +301,34 @@ class ProcessSpansStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         unfold_step = Unfold(generator=expand_segments, next_step=produce_step)
 
         initial_value: Callable[[], dict[int, ProduceSegmentContext]] = lambda: {}
+
+        if options.get("standalone-spans.process-spans-consumer.batch-writes"):
+            batch_reduce_step: Reduce[
+                dict[int, ProduceSegmentContext], dict[int, ProduceSegmentContext]
+            ] = Reduce(
+                self.max_batch_size,
+                self.max_batch_time,
+                batch_accumulator,
+                initial_value=initial_value,
+                next_step=unfold_step,
+            )
+
+            batch_commit_step = CommitSpanOffsets(commit=commit, next_step=batch_reduce_step)
+            buffer_step = RunTask(function=buffer_spans, next_step=batch_commit_step)
+            batch_step: BatchStep[BufferedSpan] = BatchStep(
+                self.max_batch_size, self.max_batch_time, next_step=buffer_step
+            )
+
+            return RunTaskWithMultiprocessing(
+                function=parse_message,
+                next_step=batch_step,
+                max_batch_size=self.max_batch_size,
+                max_batch_time=self.max_batch_time,
+                pool=self.__pool,
+                input_block_size=self.input_block_size,
+                output_block_size=self.output_block_size,
+            )
+
         reduce_step: Reduce[ProduceSegmentContext, dict[int, ProduceSegmentContext]] = Reduce(
             self.max_batch_size,
             self.max_batch_time,
@@ -1,14 +1,20 @@
 import logging
 import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 
+from django.db import connections
+
+from sentry import options
 from sentry.digests import Record, get_option_key
 from sentry.digests.backends.base import InvalidState
-from sentry.digests.notifications import build_digest, split_key
+from sentry.digests.notifications import build_digest, fetch_state_many, split_key, split_keys
 from sentry.models.options.project_option import ProjectOption
 from sentry.models.project import Project
 from sentry.silo import SiloMode
 from sentry.tasks.base import instrumented_task
-from sentry.utils import snuba
+from sentry.utils import metrics, snuba
+from sentry.utils.iterators import chunked
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +40,14 @@ def schedule_digests():
     timeout = 300
     digests.maintenance(deadline - timeout)
 
-    for entry in digests.schedule(deadline):
-        deliver_digest.delay(entry.key, entry.timestamp)
+    if not options.get("digests.batch-delivery.enabled"):
+        for entry in digests.schedule(deadline):
+            deliver_digest.delay(entry.key, entry.timestamp)
+        return
+
+    batch_size = options.get("digests.batch-delivery.batch-size")
+    for entries in chunked(digests.schedule(deadline), batch_size):
+        deliver_digests.delay([(entry.key, entry.timestamp) for entry in entries])
 
 
 @instrumented_task(
@@ -91,6 +103,109 @@ def deliver_digest(key, schedule_timestamp=None, notification_uuid: str | None =
             )
 
 
+@instrumented_task(
+    name="sentry.tasks.digests.deliver_digests",
+    queue="digests.delivery",
+    silo_mode=SiloMode.REGION,
+)
+def deliver_digests(entries: Sequence[tuple[str, float | None]]) -> None:
+    """
+    Delivers the digests of many timelines at once.
+
+    All timelines are claimed together, and the projects, groups and rules
+    behind their records are loaded with one query each. Notifications are
+    then sent from a pool of `digests.batch-delivery.workers` threads, which
+    close their database connections once their share of the batch is sent.
+    """
+    from sentry import digests
+    from sentry.mail import mail_adapter
+
+    keys = [key for key, _ in entries]
+    targets = split_keys(keys)
+    for key in keys:
+        if key not in targets:
+            logger.info("Cannot deliver digest %s due to missing project", key)
+            digests.delete(key)
+
+    projects = {project.id: project for project, *_ in targets.values()}
+    minimum_delays = ProjectOption.objects.get_value_bulk(
+        list(projects.values()), get_option_key("mail", "minimum_delay")
+    )
+
+    with snuba.options_override({"consistent": True}):
+        with digests.digest_many(
+            list(targets),
+            minimum_delays={key: minimum_delays[project] for key, (project, *_) in targets.items()},
+        ) as records_by_key:
+            claimed = [(key, records) for key, records in records_by_key.items() if records]
+            states = fetch_state_many([(targets[key][0], records) for key, records in claimed])
+
+            deliveries = []
+            for (key, records), state in zip(claimed, states):
+                project, target_type, target_identifier, fallthrough_choice = targets[key]
+                digest, logs = build_digest(project, records, state)
+                if not digest:
+                    logger.info(
+                        "Skipped digest delivery due to empty digest",
+                        extra={
+                            "project": project.id,
+                            "target_type": target_type.value,
+                            "target_identifier": target_identifier,
+                            "build_digest_logs": logs,
+                            "fallthrough_choice": (
+                                fallthrough_choice.value if fallthrough_choice else None
+                            ),
+                        },
+                    )
+                    continue
+                deliveries.append(
+                    (
+                        project,
+                        digest,
+                        target_type,
+                        target_identifier,
+                        fallthrough_choice,
+                        get_notification_uuid_from_records(records),
+                    )
+                )
+
+        metrics.distribution("digests.batch_delivery.size", len(deliveries))
+
+        def deliver(delivery) -> None:
+            project, digest, target_type, target_identifier, fallthrough_choice, uuid = delivery
+            try:
+                mail_adapter.notify_digest(
+                    project,
+                    digest,
+                    target_type,
+                    target_identifier,
+                    fallthrough_choice=fallthrough_choice,
+                    notification_uuid=uuid,
+                )
+            except Exception:
+                logger.exception("Failed to deliver digest", extra={"project": project.id})
+
+        def deliver_all(deliveries) -> None:
+            # Notifications query the database from the pool's threads, which
+            # open connections of their own that Django never closes for us.
+            try:
+                for delivery in deliveries:
+                    deliver(delivery)
+            finally:
+                connections.close_all()
+
+        workers = options.get("digests.batch-delivery.workers")
+        if workers <= 1:
+            for delivery in deliveries:
+                deliver(delivery)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(
+                    deliver_all, [deliveries[i::workers] for i in range(workers)]
+                ):
+                    pass
+
+
 def get_notification_uuid_from_records(records: list[Record]) -> str | None:
     for record in records:
         try:
@@ -4,6 +4,7 @@ from django.db import DataError, IntegrityError, router, transaction
 from django.db.models import F
 
 from sentry import eventstream, similarity, tsdb
+from sentry.grouping.ingest.grouphashes import invalidate_grouphash_cache
 from sentry.silo import SiloMode
 from sentry.tasks.base import instrumented_task, track_group_async_operation
 from sentry.tsdb.base import TSDBModel
@@ -103,6 +104,7 @@ def merge_groups(
         has_more = merge_objects(
             model_list, group, new_group, logger=logger, transaction_id=transaction_id
         )
+        invalidate_grouphash_cache([group.project_id])
 
         if not has_more:
             # There are no more objects to merge for *this* "from" group, remove it
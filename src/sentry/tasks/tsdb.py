@@ -0,0 +1,35 @@
+import logging
+
+from sentry.tasks.base import instrumented_task
+from sentry.utils.locking import UnableToAcquireLock
+
+logger = logging.getLogger(__name__)
+
+
+@instrumented_task(name="sentry.tasks.tsdb.compact_rollups", queue="tsdb.compact_rollups")
+def compact_rollups():
+    """
+    Rolls the finest TSDB rollup up into the coarser ones, if the backend
+    only writes the finest rollup.
+    """
+    from sentry import tsdb
+    from sentry.locks import locks
+
+    enabled = getattr(tsdb.backend, "enable_rollup_compaction", None)
+    if enabled is None:
+        return
+
+    lock = locks.get("tsdb:compact_rollups", duration=60, name="tsdb_compact_rollups")
+    try:
+        with lock.acquire():
+            if enabled:
+                tsdb.backend.compact_rollups()
+            else:
+                # Everything is written to all rollups again. Buckets that were
+                # only written to the finest rollup are compacted right away,
+                # and compaction starts over at the next write of a backend
+                # that has it enabled.
+                tsdb.backend.compact_rollups(final=True)
+                tsdb.backend.reset_compaction_watermark()
+    except UnableToAcquireLock as error:
+        logger.warning("tsdb.compact_rollups.fail", extra={"error": error})
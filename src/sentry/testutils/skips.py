@@ -87,6 +87,18 @@ def _requires_symbolicator() -> None:
         pytest.fail(_requires_service_message("symbolicator"))
 
 
+def benchmark_available() -> bool:
+    try:
+        __import__("pytest_benchmark")
+    except ModuleNotFoundError:
+        return False
+    else:
+        return True
+
+
+requires_benchmark = pytest.mark.skipif(
+    not benchmark_available(), reason="requires pytest-benchmark"
+)
 requires_snuba = pytest.mark.usefixtures("_requires_snuba")
 requires_symbolicator = pytest.mark.usefixtures("_requires_symbolicator")
 requires_kafka = pytest.mark.usefixtures("_requires_kafka")
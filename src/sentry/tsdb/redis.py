@@ -1,22 +1,25 @@
 import itertools
 import logging
 import random
+import time
 import uuid
 from collections import defaultdict, namedtuple
 from collections.abc import Callable, Iterable
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import reduce
 from hashlib import md5
 from typing import Any, ContextManager, Generic, TypeVar
 
 import rb
 from django.utils import timezone
-from django.utils.encoding import force_bytes
+from django.utils.encoding import force_bytes, force_str
 from redis.client import Script
 
 from sentry.tsdb.base import BaseTSDB, IncrMultiOptions, TSDBModel
+from sentry.utils import metrics
 from sentry.utils.compat import crc32
 from sentry.utils.dates import to_datetime
+from sentry.utils.iterators import chunked
 from sentry.utils.redis import (
     check_cluster_versions,
     get_cluster_from_options,
@@ -32,6 +35,31 @@ T = TypeVar("T")
 SketchParameters = namedtuple("SketchParameters", "depth width capacity")
 
 CountMinScript = load_redis_script("tsdb/cmsketch.lua")
+HMGetMultiScript = load_redis_script("tsdb/hmget_multi.lua")
+HIncrByLateScript = load_redis_script("tsdb/hincrby_late.lua")
+CompactBucketScript = load_redis_script("tsdb/compact_bucket.lua")
+
+# Maximum number of hashes read by a single ``HMGetMultiScript`` call.
+HMGET_MULTI_BATCH_SIZE = 500
+
+# Time to live (in seconds) of the partial unions cached by
+# ``get_distinct_counts_union``.
+UNION_CACHE_TTL = 300
+
+# With rollup compaction, counters whose bucket of the finest rollup ended more
+# than this many seconds ago are written to every rollup. Buckets are only
+# compacted once they are twice as old, which leaves room for clock skew and
+# writes in flight.
+ROLLUP_COMPACTION_DELAY = 60
+
+# How often (in seconds) writers make sure the compaction watermark exists. It
+# is initialized to ``ROLLUP_COMPACTION_DELAY`` before the write, so this must
+# be shorter for the watermark to cover every bucket written in between.
+COMPACTION_WATERMARK_CHECK_INTERVAL = ROLLUP_COMPACTION_DELAY // 2
+
+# Prefix of the fields that count late writes in hashes of the finest rollup
+# (see ``hincrby_late.lua``).
+LATE_FIELD_PREFIX = "late:"
 
 
 class SuppressionWrapper(Generic[T]):
@@ -113,6 +141,41 @@ class RedisTSDB(BaseTSDB):
     frequency table can be displayed as percentages of the whole data set.
     (Additional documentation and the bulk of the logic for implementing the
     frequency table API can be found in the ``cmsketch.lua`` script.)
+
+    Range queries over counters read one hash field per key and rollup
+    period. By default, those are read with one ``HGET`` each. With the
+    ``enable_counter_scripts`` option, all fields that live on the same host
+    are read with a single script call instead (see ``hmget_multi.lua``),
+    which avoids the per-command overhead on both ends for range queries over
+    many keys or long periods.
+
+    With the ``enable_rollup_compaction`` option, counters are only written to
+    the finest rollup, and ``compact_rollups`` (called periodically by the
+    ``sentry.tasks.tsdb.compact_rollups`` task) adds every bucket of the finest
+    rollup that is older than twice ``ROLLUP_COMPACTION_DELAY`` to the coarser
+    rollups. Writers record the hashes they touch in one set per bucket and
+    vnode (``<prefix>dirty:<bucket>:<vnode>``), so only non-empty hashes are
+    read. Counters that are older than ``ROLLUP_COMPACTION_DELAY`` are written
+    to every rollup, and tracked separately in the finest rollup so that
+    compaction doesn't add them twice.
+
+    The compaction watermark (the first bucket that hasn't been compacted
+    yet) is stored in ``<prefix>compaction``. Writers initialize it whenever
+    it is missing, checking at least every
+    ``COMPACTION_WATERMARK_CHECK_INTERVAL`` seconds, and compaction advances
+    it after every bucket. Range
+    queries over coarser rollups add the buckets of the finest rollup from the
+    watermark onwards. Every hash of a coarser rollup keeps the last bucket
+    that has been added to it, so an interrupted compaction can be retried
+    without counting buckets twice.
+
+    With the ``enable_union_cache`` option, ``get_distinct_counts_union`` keeps
+    the union of all complete rollup periods of a window in a HyperLogLog on
+    every host for ``UNION_CACHE_TTL`` seconds, keyed by the set of keys and
+    the first and last period of the window. Later queries for the same window
+    only merge the current period into it. Writes to (or merges into) periods
+    that have already been cached are only visible once the cached union
+    expires, at most ``UNION_CACHE_TTL`` seconds after it was created.
     """
 
     DEFAULT_SKETCH_PARAMETERS = SketchParameters(3, 128, 50)
@@ -123,6 +186,10 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        self.enable_counter_scripts = options.pop("enable_counter_scripts", False)
+        self.enable_rollup_compaction = options.pop("enable_rollup_compaction", False)
+        self._compaction_watermark_checked_at = float("-inf")
+        self.enable_union_cache = options.pop("enable_union_cache", False)
         super().__init__(**options)
 
     def validate(self) -> None:
@@ -261,6 +328,17 @@ class RedisTSDB(BaseTSDB):
         if default_timestamp is None:
             default_timestamp = timezone.now()
 
+        fine_rollup = min(self.rollups)
+        check_watermark = False
+        if self.enable_rollup_compaction:
+            late_bucket = self.normalize_to_rollup(
+                timezone.now() - timedelta(seconds=ROLLUP_COMPACTION_DELAY), fine_rollup
+            )
+            check_watermark = (
+                time.monotonic() - self._compaction_watermark_checked_at
+                >= COMPACTION_WATERMARK_CHECK_INTERVAL
+            )
+
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
             manager = cluster.map()
             if not durable:
@@ -271,6 +349,13 @@ class RedisTSDB(BaseTSDB):
                 key_operations: dict[tuple[str, str | int], int] = defaultdict(int)
                 # (hash_key) -> "max expiration encountered"
                 key_expiries: dict[str, float] = defaultdict(float)
+                # Writes to the finest rollup that are too late to be compacted,
+                # (hash_key) -> (hash_field) -> count
+                late_operations: dict[str, dict[str | int, int]] = defaultdict(
+                    lambda: defaultdict(int)
+                )
+                # (dirty_key) -> model values
+                dirty_models: dict[str, set[int]] = defaultdict(set)
 
                 for rollup, max_values in self.rollups.items():
                     for item in items:
@@ -286,6 +371,14 @@ class RedisTSDB(BaseTSDB):
                         count = options.get("count", default_count)
                         _timestamp = options.get("timestamp", default_timestamp)
 
+                        late = False
+                        if self.enable_rollup_compaction:
+                            bucket = self.normalize_to_rollup(_timestamp, fine_rollup)
+                            late = bucket < late_bucket
+                            if rollup != fine_rollup and not late:
+                                # Filled in by ``compact_rollups``.
+                                continue
+
                         expiry = self.calculate_expiry(rollup, max_values, _timestamp)
 
                         for _environment_id in environment_ids:
@@ -296,13 +389,61 @@ class RedisTSDB(BaseTSDB):
                             if key_expiries[hash_key] < expiry:
                                 key_expiries[hash_key] = expiry
 
+                            if late and rollup == fine_rollup:
+                                late_operations[hash_key][hash_field] += count
+                                continue
+
                             key_operations[(hash_key, hash_field)] += count
+                            if self.enable_rollup_compaction and rollup == fine_rollup:
+                                dirty_key = self.make_dirty_key(bucket, hash_key)
+                                dirty_models[dirty_key].add(model.value)
+                                if key_expiries[dirty_key] < expiry:
+                                    key_expiries[dirty_key] = expiry
 
                 for (hash_key, hash_field), count in key_operations.items():
                     client.hincrby(hash_key, hash_field, count)
                     if key_expiries.get(hash_key):
                         client.expireat(hash_key, key_expiries.pop(hash_key))
 
+                for dirty_key, models in dirty_models.items():
+                    client.sadd(dirty_key, *models)
+                    client.expireat(dirty_key, key_expiries.pop(dirty_key))
+
+                if dirty_models and check_watermark:
+                    # The watermark is missing after enabling compaction, or
+                    # after it has been reset by a worker that has it disabled.
+                    # Every bucket written from now on is at least this one.
+                    client.set(self.get_compaction_watermark_key(), late_bucket, nx=True)
+
+            if late_operations:
+                commands = {
+                    hash_key: [
+                        (
+                            HIncrByLateScript,
+                            [hash_key],
+                            [
+                                key_expiries[hash_key],
+                                *itertools.chain.from_iterable(fields.items()),
+                            ],
+                        )
+                    ]
+                    for hash_key, fields in late_operations.items()
+                }
+                try:
+                    cluster.execute_commands(commands)
+                except Exception:
+                    if durable:
+                        raise
+
+            if dirty_models and check_watermark:
+                self._compaction_watermark_checked_at = time.monotonic()
+
+            metrics.incr(
+                "tsdb.redis.counter_writes",
+                amount=len(key_operations) + len(late_operations),
+                tags={"rollup_compaction": self.enable_rollup_compaction},
+            )
+
     def get_range(
         self,
         model: TSDBModel,
@@ -334,24 +475,243 @@ class RedisTSDB(BaseTSDB):
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         _series: list[datetime] = [to_datetime(item) for item in series]
 
-        results: list[tuple[float, int, Any]] = []
         cluster, _ = self.get_cluster(environment_id)
+        if self.enable_counter_scripts:
+            counter_keys = [
+                self.make_counter_key(model, rollup, timestamp, key, environment_id)
+                for key in keys
+                for timestamp in _series
+            ]
+            counts = self.get_counters(cluster, counter_keys)
+            epochs = [timestamp.timestamp() for timestamp in _series]
+            output = {
+                key: list(zip(epochs, counts[i * len(epochs) : (i + 1) * len(epochs)]))
+                for i, key in enumerate(keys)
+            }
+        else:
+            results: list[tuple[float, int, Any]] = []
+            with cluster.map() as client:
+                for key in keys:
+                    for timestamp in _series:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id
+                        )
+                        results.append(
+                            (timestamp.timestamp(), key, client.hget(hash_key, hash_field))
+                        )
+
+            results_by_key: dict[int, dict[float, int]] = defaultdict(dict)
+            for epoch, key, count in results:
+                results_by_key[key][epoch] = int(count.value or 0)
+
+            output = {}
+            for key, points in results_by_key.items():
+                output[key] = sorted(points.items())
+
+        if self.enable_rollup_compaction and rollup != min(self.rollups):
+            self.add_uncompacted_counts(cluster, model, rollup, output, environment_id)
+
+        return output
+
+    def get_compaction_watermark_key(self) -> str:
+        return f"{self.prefix}compaction"
+
+    def get_compaction_watermark(self, cluster: rb.Cluster) -> int | None:
         with cluster.map() as client:
-            for key in keys:
-                for timestamp in _series:
+            promise = client.get(self.get_compaction_watermark_key())
+        return int(promise.value) if promise.value is not None else None
+
+    def reset_compaction_watermark(self) -> None:
+        """
+        Drops the compaction watermark, so that compaction starts over at the
+        first write when it is enabled again.
+        """
+        cluster, _ = self.get_cluster(None)
+        with cluster.map() as client:
+            client.delete(self.get_compaction_watermark_key())
+
+    def make_dirty_key(self, bucket: int, hash_key: str) -> str:
+        """
+        Returns the key of the set of models written to a bucket of the finest
+        rollup, for the vnode of the given hash.
+        """
+        vnode = hash_key.rsplit(":", 1)[1]
+        return f"{self.prefix}dirty:{bucket}:{vnode}"
+
+    def add_uncompacted_counts(
+        self,
+        cluster: rb.Cluster,
+        model: TSDBModel,
+        rollup: int,
+        output: dict[int, list[tuple[float, int]]],
+        environment_id: int | None,
+    ) -> None:
+        """
+        Adds the buckets of the finest rollup that haven't been compacted yet
+        to the series of a coarser rollup, minus the late writes that have
+        been written to the coarser rollup directly.
+        """
+        watermark = self.get_compaction_watermark(cluster)
+        if watermark is None:
+            return
+
+        fine_rollup = min(self.rollups)
+        ratio = rollup // fine_rollup
+        current = self.normalize_to_rollup(timezone.now(), fine_rollup)
+
+        points: list[tuple[int, int]] = []
+        counter_keys: list[tuple[str, str | int]] = []
+        for key, series in output.items():
+            for index, (epoch, _) in enumerate(series):
+                bucket = self.normalize_ts_to_rollup(epoch, rollup)
+                for fine_bucket in range(
+                    max(bucket * ratio, watermark), min((bucket + 1) * ratio, current + 1)
+                ):
                     hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
+                        model, fine_rollup, fine_bucket * fine_rollup, key, environment_id
                     )
-                    results.append((timestamp.timestamp(), key, client.hget(hash_key, hash_field)))
+                    points.append((key, index))
+                    counter_keys.append((hash_key, hash_field))
+                    counter_keys.append((hash_key, f"{LATE_FIELD_PREFIX}{hash_field}"))
 
-        results_by_key: dict[int, dict[float, int]] = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        if not counter_keys:
+            return
 
-        output: dict[int, list[tuple[float, int]]] = {}
-        for key, points in results_by_key.items():
-            output[key] = sorted(points.items())
-        return output
+        if self.enable_counter_scripts:
+            counts = self.get_counters(cluster, counter_keys)
+        else:
+            with cluster.map() as client:
+                promises = [client.hget(hash_key, field) for hash_key, field in counter_keys]
+            counts = [int(promise.value or 0) for promise in promises]
+
+        for (key, index), count, late_count in zip(points, counts[::2], counts[1::2]):
+            epoch, value = output[key][index]
+            output[key][index] = (epoch, value + count - late_count)
+
+    def compact_rollups(self, timestamp: datetime | None = None, final: bool = False) -> int:
+        """
+        Adds all buckets of the finest rollup from the compaction watermark
+        up to twice ``ROLLUP_COMPACTION_DELAY`` ago to the coarser rollups,
+        advancing the watermark after each bucket. Returns the number of
+        compacted buckets.
+
+        With ``final``, all buckets up to and including the current one are
+        compacted, for when compaction is about to be disabled.
+
+        Buckets need to be compacted before they expire from the finest
+        rollup, so this must run more often than that rollup's retention.
+        """
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        fine_rollup = min(self.rollups)
+        if final:
+            end = self.normalize_to_rollup(timestamp, fine_rollup) + 1
+        else:
+            end = self.normalize_to_rollup(
+                timestamp - timedelta(seconds=2 * ROLLUP_COMPACTION_DELAY), fine_rollup
+            )
+        oldest = self.normalize_to_rollup(timestamp, fine_rollup) - self.rollups[fine_rollup] + 1
+
+        cluster, _ = self.get_cluster(None)
+        watermark = self.get_compaction_watermark(cluster)
+        if watermark is None:
+            # Nothing has been written since enabling compaction.
+            return 0
+        elif watermark < oldest:
+            logger.warning("tsdb.compaction.expired_buckets", extra={"buckets": oldest - watermark})
+            metrics.incr("tsdb.compaction.expired_buckets", amount=oldest - watermark)
+            watermark = oldest
+
+        for bucket in range(watermark, end):
+            self.compact_bucket(cluster, fine_rollup, bucket)
+            with cluster.map() as client:
+                client.set(self.get_compaction_watermark_key(), bucket + 1)
+
+        compacted = max(end - watermark, 0)
+        metrics.incr("tsdb.compaction.buckets", amount=compacted)
+        return compacted
+
+    def compact_bucket(self, cluster: rb.Cluster, fine_rollup: int, bucket: int) -> None:
+        with cluster.map() as client:
+            dirty = {
+                vnode: client.smembers(f"{self.prefix}dirty:{bucket}:{vnode}")
+                for vnode in range(self.vnodes)
+            }
+
+        with cluster.map() as client:
+            hashes = {
+                (int(model), vnode): client.hgetall(f"{self.prefix}{int(model)}:{bucket}:{vnode}")
+                for vnode, promise in dirty.items()
+                for model in promise.value or ()
+            }
+
+        timestamp = to_datetime(bucket * fine_rollup)
+        commands: dict[str, list[tuple[Script, list[str], list[Any]]]] = {}
+        for (model, vnode), promise in hashes.items():
+            values = {force_str(field): int(count) for field, count in promise.value.items()}
+            arguments: list[Any] = []
+            for field, count in values.items():
+                if field.startswith(LATE_FIELD_PREFIX):
+                    continue
+                count -= values.get(f"{LATE_FIELD_PREFIX}{field}", 0)
+                if count:
+                    arguments.extend((field, count))
+            if not arguments:
+                continue
+
+            for rollup, max_values in self.rollups.items():
+                if rollup == fine_rollup:
+                    continue
+                hash_key = "{prefix}{model}:{epoch}:{vnode}".format(
+                    prefix=self.prefix,
+                    model=model,
+                    epoch=self.normalize_to_rollup(timestamp, rollup),
+                    vnode=vnode,
+                )
+                expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                commands[hash_key] = [
+                    (CompactBucketScript, [hash_key], [bucket, expiry, *arguments])
+                ]
+
+        if commands:
+            cluster.execute_commands(commands)
+
+    def get_counters(
+        self, cluster: rb.Cluster, counter_keys: list[tuple[str, str | int]]
+    ) -> list[int]:
+        """
+        Returns the values of the given ``(hash key, hash field)`` pairs, with
+        one script call per host (and batch of hashes).
+        """
+        if is_instance_rb_cluster(cluster, False):
+            router = cluster.get_router()
+        else:
+            raise AssertionError("unreachable")
+
+        # host -> hash key -> indices of the fields read from that hash
+        hosts: dict[int, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+        for index, (hash_key, _) in enumerate(counter_keys):
+            hosts[router.get_host_for_key(hash_key)][hash_key].append(index)
+
+        counts = [0] * len(counter_keys)
+        for host, hashes in hosts.items():
+            client = cluster.get_local_client(host)
+            for batch in chunked(hashes.items(), HMGET_MULTI_BATCH_SIZE):
+                script_keys = []
+                script_args: list[str | int] = []
+                indices = []
+                for hash_key, hash_indices in batch:
+                    script_keys.append(hash_key)
+                    script_args.append(len(hash_indices))
+                    script_args.extend(counter_keys[index][1] for index in hash_indices)
+                    indices.extend(hash_indices)
+
+                values = HMGetMultiScript(script_keys, script_args, client=client)
+                for index, value in zip(indices, values):
+                    counts[index] = int(value or 0)
+
+        return counts
 
     def merge(
         self,
@@ -597,12 +957,64 @@ class RedisTSDB(BaseTSDB):
             hosts[router.get_host_for_key(key)].add(key)
             return hosts
 
+        def get_cached_partition_aggregate(host: int, _keys: set[int]) -> Any:
+            """
+            Like ``get_partition_aggregate``, but reuses the cached union of
+            all complete periods of the window.
+            """
+            complete, current = series[:-1], series[-1:]
+            cache_key = "{}u:{}".format(
+                self.prefix,
+                md5(
+                    f"{model.value}:{rollup}:{environment_id}:{series[0]}:{series[-1]}:".encode()
+                    + b",".join(str(key).encode() for key in sorted(_keys))
+                ).hexdigest(),
+            )
+            destination = make_temporary_key(f"p:{host}")
+            client = cluster.get_local_client(host)
+            # Read the cached union rather than merging from its key, which
+            # could expire in between.
+            cached = client.get(cache_key) if complete else None
+
+            with client.pipeline(transaction=False) as pipeline:
+                if cached is not None:
+                    pipeline.set(destination, cached)
+                elif complete:
+                    pipeline.execute_command(
+                        "PFMERGE",
+                        cache_key,
+                        *(
+                            self.make_key(model, rollup, timestamp, key, environment_id)
+                            for key in _keys
+                            for timestamp in complete
+                        ),
+                    )
+                    # The expiry is only set when the union is created, which
+                    # bounds how stale it can get.
+                    pipeline.expire(cache_key, UNION_CACHE_TTL)
+                pipeline.execute_command(
+                    "PFMERGE",
+                    destination,
+                    *([cache_key] if complete and cached is None else []),
+                    *(
+                        self.make_key(model, rollup, timestamp, key, environment_id)
+                        for key in _keys
+                        for timestamp in current
+                    ),
+                )
+                pipeline.get(destination)
+                pipeline.delete(destination)
+                return pipeline.execute()[-2]
+
         def get_partition_aggregate(value: tuple[int, set[int]]) -> tuple[int, int]:
             """
             Fetch the HyperLogLog value (in its raw byte representation) that
             results from merging all HyperLogLogs at the provided keys.
             """
             (host, _keys) = value
+            if self.enable_union_cache:
+                return host, get_cached_partition_aggregate(host, _keys)
+
             destination = make_temporary_key(f"p:{host}")
             client = cluster.get_local_client(host)
             with client.pipeline(transaction=False) as pipeline:
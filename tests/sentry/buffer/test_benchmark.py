@@ -0,0 +1,35 @@
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from sentry.buffer.redis import RedisBuffer
+from sentry.models.group import Group
+from sentry.testutils.pytest.fixtures import django_db_all
+from sentry.testutils.skips import requires_benchmark
+
+KEY_COUNT = 200
+
+
+@requires_benchmark
+@pytest.mark.parametrize("bulk_flush", [False, True], ids=["per_key", "bulk"])
+@django_db_all
+def test_benchmark_drain_pending(bulk_flush, default_project, task_runner, benchmark):
+    """
+    Compares keys drained per second by the per-key flush against the bulk flush.
+    """
+    buf = RedisBuffer(incr_batch_size=KEY_COUNT, bulk_flush=bulk_flush)
+    groups = [Group.objects.create(project=default_project) for _ in range(KEY_COUNT)]
+
+    def setup():
+        now = timezone.now()
+        for group in groups:
+            buf.incr(Group, {"times_seen": 1}, {"id": group.id}, {"last_seen": now})
+        return (), {}
+
+    def drain():
+        with task_runner(), mock.patch("sentry.buffer", buf):
+            buf.process_pending()
+
+    benchmark.pedantic(drain, setup=setup, rounds=10)
+    benchmark.extra_info["keys_per_second"] = KEY_COUNT / benchmark.stats.stats.mean
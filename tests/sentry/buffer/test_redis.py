@@ -1,14 +1,23 @@
 import datetime
+import gc
 import pickle
 from collections import defaultdict
 from unittest import mock
 from unittest.mock import Mock
 
 import pytest
+from django.db import DatabaseError
 from django.utils import timezone
 
 from sentry import options
-from sentry.buffer.redis import BufferHookEvent, RedisBuffer, redis_buffer_registry
+from sentry.buffer.redis import (
+    BufferHookEvent,
+    IncrCoalescer,
+    RedisBuffer,
+    _coalescers,
+    _flush_coalescers,
+    redis_buffer_registry,
+)
 from sentry.models.group import Group
 from sentry.models.project import Project
 from sentry.rules.processing.delayed_processing import PROJECT_ID_BUFFER_LIST_KEY
@@ -136,6 +145,77 @@ class TestRedisBuffer:
         group = Group.objects.get_from_cache(id=default_group.id)
         assert group.times_seen == orig_times_seen + times_seen_incr
 
+    @django_db_all
+    @freeze_time()
+    def test_bulk_flush(self, default_project, task_runner):
+        self.buf.bulk_flush = True
+        self.buf.incr_batch_size = 10
+        groups = [Group.objects.create(project=default_project) for _ in range(3)]
+        orig_times_seen = {
+            group.id: Group.objects.get_from_cache(id=group.id).times_seen for group in groups
+        }
+        now = timezone.now()
+        for i, group in enumerate(groups):
+            self.buf.incr(Group, {"times_seen": i + 1}, {"id": group.id}, {"last_seen": now})
+
+        with task_runner(), mock.patch("sentry.buffer", self.buf):
+            self.buf.process_pending()
+
+        for i, group in enumerate(groups):
+            cached = Group.objects.get_from_cache(id=group.id)
+            assert cached.times_seen == orig_times_seen[group.id] + i + 1
+            assert cached.last_seen == now
+
+        client = get_cluster_routing_client(self.buf.cluster, self.buf.is_redis_cluster)
+        for group in groups:
+            assert not client.exists(self.buf._make_key(Group, {"id": group.id}))
+
+    @django_db_all
+    @freeze_time()
+    def test_bulk_flush_falls_back_on_error(self, default_project, task_runner):
+        self.buf.bulk_flush = True
+        self.buf.incr_batch_size = 10
+        groups = [Group.objects.create(project=default_project) for _ in range(2)]
+        now = timezone.now()
+        for group in groups:
+            self.buf.incr(Group, {"times_seen": 2}, {"id": group.id}, {"last_seen": now})
+
+        with (
+            task_runner(),
+            mock.patch("sentry.buffer", self.buf),
+            mock.patch("sentry.buffer.redis.bulk_update", side_effect=DatabaseError),
+        ):
+            self.buf.process_pending()
+
+        for group in groups:
+            assert Group.objects.get(id=group.id).times_seen == group.times_seen + 2
+
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_bulk_flush_falls_back_for_other_models(self, process):
+        self.buf.bulk_flush = True
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        model.__module__ = "unittest.mock"
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1}, signal_only=True)
+        self.buf.process(batch_keys=[self.buf._make_key(model, {"pk": 1})])
+        process.assert_called_once_with(mock.Mock, {"times_seen": 1}, {"pk": 1}, {}, True)
+
+    def test_incr_coalesced(self):
+        self.buf.coalescer = IncrCoalescer(self.buf._incr, window=60, max_keys=10)
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        self.buf.incr(model, {"times_seen": 1}, filters)
+        self.buf.incr(model, {"times_seen": 5}, filters)
+        client = get_cluster_routing_client(self.buf.cluster, self.buf.is_redis_cluster)
+        assert not client.exists(self.buf._make_key(model, filters))
+        # Locally buffered counters are visible before they are flushed
+        assert self.buf.get(model, ["times_seen"], filters=filters) == {"times_seen": 6}
+
+        self.buf.coalescer.flush()
+        assert client.exists(self.buf._make_key(model, filters))
+        assert self.buf.get(model, ["times_seen"], filters=filters) == {"times_seen": 6}
+
     def test_get(self):
         model = mock.Mock()
         model.__name__ = "Mock"
@@ -389,6 +469,56 @@ class TestRedisBuffer:
 #
 
 
+class TestIncrCoalescer:
+    def test_merges_increments_and_extra(self):
+        flush = Mock()
+        coalescer = IncrCoalescer(flush, window=60, max_keys=10)
+        first = datetime.datetime(2017, 5, 3, 6, 6, 6, tzinfo=datetime.UTC)
+        second = first + datetime.timedelta(seconds=1)
+
+        coalescer.add("a", Group, {"times_seen": 1}, {"id": 1}, {"last_seen": first}, None)
+        coalescer.add("a", Group, {"times_seen": 2}, {"id": 1}, {"last_seen": second}, None)
+        coalescer.add("b", Group, {"times_seen": 1}, {"id": 2}, None, True)
+        assert coalescer.get("a") == {"times_seen": 3}
+        assert flush.call_count == 0
+
+        coalescer.flush()
+        assert flush.call_count == 2
+        flush.assert_any_call(
+            Group, {"times_seen": 3}, {"id": 1}, extra={"last_seen": second}, signal_only=None
+        )
+        flush.assert_any_call(Group, {"times_seen": 1}, {"id": 2}, extra=None, signal_only=True)
+        assert coalescer.get("a") == {}
+
+    def test_flushes_when_full(self):
+        flush = Mock()
+        coalescer = IncrCoalescer(flush, window=60, max_keys=2)
+        coalescer.add("a", Group, {"times_seen": 1}, {"id": 1}, None, None)
+        assert flush.call_count == 0
+        coalescer.add("b", Group, {"times_seen": 1}, {"id": 2}, None, None)
+        assert flush.call_count == 2
+
+    def test_flushes_after_window(self):
+        flush = Mock()
+        coalescer = IncrCoalescer(flush, window=0.01, max_keys=10)
+        coalescer.add("a", Group, {"times_seen": 1}, {"id": 1}, None, None)
+        assert coalescer._timer is not None
+        coalescer._timer.join()
+        assert flush.call_count == 1
+
+    def test_flushed_at_exit(self):
+        flush = Mock()
+        coalescer = IncrCoalescer(flush, window=60, max_keys=10)
+        coalescer.add("a", Group, {"times_seen": 1}, {"id": 1}, None, None)
+        _flush_coalescers()
+        assert flush.call_count == 1
+
+        # The exit hook doesn't keep coalescers alive.
+        del coalescer
+        gc.collect()
+        assert not any(coalescer._flush is flush for coalescer in _coalescers)
+
+
 @pytest.mark.parametrize(
     "value",
     [
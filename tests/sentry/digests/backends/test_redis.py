@@ -151,3 +151,39 @@ class RedisBackendTestCase(TestCase):
 
         with backend.digest("timeline", 0) as records:
             assert len(set(records)) == n
+
+    def test_digest_many(self):
+        backend = RedisBackend()
+
+        record_1 = Record("record:1", "value", time.time())
+        backend.add("timeline:1", record_1)
+        record_2 = Record("record:2", "value", time.time())
+        backend.add("timeline:2", record_2)
+
+        # Timelines that are not ready are left out.
+        with backend.digest_many(
+            ["timeline:1", "timeline:2", "timeline:3"], {"timeline:1": 0, "timeline:2": 0}
+        ) as records:
+            assert records == {"timeline:1": [record_1], "timeline:2": [record_2]}
+
+        assert {entry.key for entry in backend.schedule(time.time())} == {
+            "timeline:1",
+            "timeline:2",
+        }
+
+        # Timelines that are locked are left out as well.
+        with backend._get_timeline_lock("timeline:1", duration=30).acquire():
+            with backend.digest_many(["timeline:1", "timeline:2"]) as records:
+                assert records == {"timeline:2": []}
+
+        with backend.digest("timeline:1", 0) as records:
+            assert records == []
+
+        # Locks are released even if the delivery fails.
+        with pytest.raises(ValueError):
+            with backend.digest_many(["timeline:1", "timeline:2"]):
+                assert backend._get_timeline_lock("timeline:2", duration=30).locked()
+                raise ValueError
+
+        assert not backend._get_timeline_lock("timeline:1", duration=30).locked()
+        assert not backend._get_timeline_lock("timeline:2", duration=30).locked()
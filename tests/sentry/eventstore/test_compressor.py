@@ -1,6 +1,11 @@
 import copy
+from unittest import mock
 
+from sentry import nodestore
+from sentry.db.models.fields.node import NodeData
 from sentry.eventstore.compressor import assemble, deduplicate
+from sentry.testutils.helpers import override_options
+from sentry.testutils.pytest.fixtures import django_db_all
 
 
 def _assert_roundtrip(data, assert_extra_keys=None):
@@ -52,3 +57,141 @@ def test_basic():
             }
         },
     )
+
+
+def test_stacktraces():
+    frames = [{"function": "main", "lineno": 1}, {"function": "run", "lineno": 2}]
+    _assert_roundtrip({"exception": None})
+    _assert_roundtrip({"exception": {"values": None}})
+    _assert_roundtrip({"exception": {"values": [None, {"type": "Error"}]}})
+    _assert_roundtrip({"exception": {"values": [{"stacktrace": {"frames": None}}]}})
+    _assert_roundtrip(
+        {
+            "exception": {
+                "values": [
+                    {"type": "Error", "stacktrace": {"frames": frames}},
+                    {"type": "Other", "raw_stacktrace": {"frames": frames[:1]}},
+                ]
+            },
+            "threads": {"values": [{"id": 1, "stacktrace": {"frames": frames}}]},
+            "stacktrace": {"frames": frames, "registers": {"rip": "0x1"}},
+        }
+    )
+
+    data, extra_keys = deduplicate(
+        {"threads": {"values": [{"id": 1, "stacktrace": {"frames": frames}}]}}
+    )
+    ((checksum, deduplicated),) = extra_keys.items()
+    assert deduplicated == {"stacktrace": [frames], "raw_stacktrace": [None]}
+    assert data == {
+        "__nodestore_patchsets": [["threads", checksum, {"values": [{"id": 1, "stacktrace": {}}]}]]
+    }
+
+
+def test_modules_and_contexts():
+    _assert_roundtrip({"modules": None})
+    _assert_roundtrip({"contexts": None})
+    _assert_roundtrip({"contexts": {}})
+    _assert_roundtrip(
+        {
+            "modules": {"django": "5.0", "redis": "4.1"},
+            "contexts": {"os": {"name": "Linux"}, "trace": {"trace_id": "a" * 32}},
+        }
+    )
+
+    data, extra_keys = deduplicate(
+        {"contexts": {"os": {"name": "Linux"}, "trace": {"trace_id": "a" * 32}}}
+    )
+    ((checksum, deduplicated),) = extra_keys.items()
+    assert deduplicated == {"os": {"name": "Linux"}}
+    assert data == {
+        "__nodestore_patchsets": [["contexts", checksum, {"trace": {"trace_id": "a" * 32}}]]
+    }
+
+
+def test_identical_interfaces_share_checksums():
+    event = {"modules": {"django": "5.0"}, "contexts": {"os": {"name": "Linux"}}}
+    _, extra_keys_1 = deduplicate(copy.deepcopy(event))
+    _, extra_keys_2 = deduplicate(copy.deepcopy(event))
+    assert extra_keys_1 == extra_keys_2
+
+
+@django_db_all
+@override_options(
+    {"eventstore.compressor.enabled": True, "nodestore.set-subkeys.enable-set-cache-item": False}
+)
+def test_node_data_roundtrip():
+    data = {
+        "message": "hello",
+        "modules": {"django": "5.0"},
+        "contexts": {"os": {"name": "Linux"}},
+        "exception": {"values": [{"stacktrace": {"frames": [{"function": "main"}]}}]},
+    }
+    node = NodeData("a" * 32, data=copy.deepcopy(data))
+    node.save()
+    # The in-memory payload is not affected by deduplication
+    assert node.data == data
+
+    stored = nodestore.backend._decode(nodestore.backend._get_bytes("a" * 32), subkey=None)
+    assert stored["message"] == "hello"
+    assert "modules" not in stored
+    patchsets = {key: inlined for key, _, inlined in stored["__nodestore_patchsets"]}
+    assert patchsets["exception"] == {"values": [{"stacktrace": {}}]}
+
+    assert NodeData("a" * 32).data == data
+    # Nodestore reassembles payloads for readers that don't go through NodeData
+    assert nodestore.backend.get("a" * 32) == data
+
+
+@django_db_all
+@override_options(
+    {"eventstore.compressor.enabled": True, "nodestore.set-subkeys.enable-set-cache-item": False}
+)
+def test_get_multi_assembles_in_one_request():
+    nodes = {
+        str(i) * 32: {
+            "message": f"event {i}",
+            "modules": {"django": f"5.{i}"},
+            "contexts": {"os": {"name": "Linux"}},
+        }
+        for i in range(5)
+    }
+    for node_id, data in nodes.items():
+        NodeData(node_id, data=copy.deepcopy(data)).save()
+
+    backend = nodestore.backend
+    with mock.patch.object(
+        backend, "_get_bytes_multi", wraps=backend._get_bytes_multi
+    ) as get_bytes_multi:
+        assert backend.get_multi(list(nodes)) == nodes
+    # One request for the events and one for all of their chunks
+    assert get_bytes_multi.call_count == 2
+
+
+@django_db_all
+@override_options(
+    {"eventstore.compressor.enabled": True, "nodestore.set-subkeys.enable-set-cache-item": True}
+)
+def test_cached_node_data_is_assembled():
+    nodes = {
+        str(i) * 32: {
+            "message": f"event {i}",
+            "modules": {"django": f"5.{i}"},
+            "contexts": {"os": {"name": "Linux"}},
+        }
+        for i in range(3)
+    }
+    for node_id, data in nodes.items():
+        NodeData(node_id, data=copy.deepcopy(data)).save()
+
+    # Writes cache the deduplicated payload
+    backend = nodestore.backend
+    cached = backend._get_cache_item("0" * 32)
+    assert cached is not None
+    assert "__nodestore_patchsets" in cached
+
+    assert backend.get("0" * 32) == nodes["0" * 32]
+    assert backend.get_multi(list(nodes)) == nodes
+
+    backend._delete_cache_item("1" * 32)
+    assert backend.get_multi(list(nodes)) == nodes
@@ -1,22 +1,27 @@
 import pytest
 
-from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.api import (
+    get_default_grouping_config_dict,
+    get_grouping_config_dict_for_project,
+    load_grouping_config,
+)
+from sentry.grouping.fingerprinting import FingerprintingRules
+from sentry.grouping.ingest.caching import _local_cache, get_hashes_cached
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
+from sentry.testutils.helpers import override_options
+from sentry.testutils.pytest.fixtures import django_db_all
+from sentry.testutils.skips import requires_benchmark
+from tests.sentry.grouping import fingerprint_input as fingerprint_inputs
 from tests.sentry.grouping import grouping_input as grouping_inputs
 
-CONFIGS = {key: get_default_grouping_config_dict(key) for key in sorted(CONFIGURATIONS.keys())}
-
+# Production traffic is dominated by repeats of the same few crashes, which is
+# approximated by replaying the grouping inputs several times.
+REPLAYS = 5
 
-def benchmark_available() -> bool:
-    try:
-        __import__("pytest_benchmark")
-    except ModuleNotFoundError:
-        return False
-    else:
-        return True
+CONFIGS = {key: get_default_grouping_config_dict(key) for key in sorted(CONFIGURATIONS.keys())}
 
 
-@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@requires_benchmark
 @pytest.mark.parametrize(
     "config_name", sorted(CONFIGURATIONS.keys()), ids=lambda x: x.replace("-", "_")
 )
@@ -37,3 +42,51 @@ def run_configuration(grouping_input, config):
     event.project = None
 
     event.get_hashes()
+
+
+@requires_benchmark
+@django_db_all
+@pytest.mark.parametrize("cache_enabled", [False, True], ids=["uncached", "cached"])
+def test_benchmark_grouping_replay(cache_enabled, default_project, benchmark):
+    config = get_grouping_config_dict_for_project(default_project)
+    loaded_config = load_grouping_config(config)
+    events = [grouping_input.create_event(dict(config)) for grouping_input in grouping_inputs]
+
+    def replay():
+        for event in events * REPLAYS:
+            get_hashes_cached(default_project, event, config, loaded_config)
+
+    with override_options({"grouping.hash-cache.enabled": cache_enabled}):
+        benchmark.pedantic(replay, setup=_local_cache.clear, rounds=5)
+
+    benchmark.extra_info["events"] = len(events) * REPLAYS
+
+
+def make_fingerprinting_rules(count: int) -> FingerprintingRules:
+    templates = [
+        "type:GeneratedError{i} -> generated-type-{i}",
+        'message:"Generated message {i}*" -> generated-message-{i}',
+        "function:generated_function_{i} module:generated.module.* -> generated-function-{i}",
+        "tags.generated:value-{i} -> generated-tag-{i}",
+    ]
+    return FingerprintingRules.from_config_string(
+        "\n".join(templates[i % len(templates)].format(i=i) for i in range(count))
+    )
+
+
+@requires_benchmark
+@django_db_all
+@pytest.mark.parametrize("rule_count", [10, 100, 1000])
+@pytest.mark.parametrize("indexed", [False, True], ids=["linear", "indexed"])
+def test_benchmark_fingerprinting(rule_count, indexed, benchmark):
+    rules = make_fingerprinting_rules(rule_count)
+    events = [input.create_event()[1].data.data for input in fingerprint_inputs]
+
+    def run():
+        for event in events:
+            rules.get_fingerprint_values_for_event(event)
+
+    with override_options({"grouping.fingerprinting.indexed-rules": indexed}):
+        # Compile the index outside of the measured runs, as it is cached per project
+        rules.get_index()
+        benchmark(run)
@@ -3,7 +3,12 @@ from typing import Any
 import pytest
 
 from sentry.grouping.api import get_default_grouping_config_dict
-from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
+from sentry.grouping.fingerprinting import (
+    EventAccess,
+    FingerprintingRules,
+    InvalidFingerprintingConfig,
+)
+from sentry.testutils.helpers import override_options
 from sentry.testutils.pytest.fixtures import django_db_all
 from tests.sentry.grouping import with_fingerprint_input
 
@@ -190,3 +195,54 @@ def test_event_hash_variant(insta_snapshot: Any, input: Any) -> None:
             },
         }
     )
+
+
+@with_fingerprint_input("input")
+@django_db_all  # because of `options` usage
+def test_indexed_rules_match_linear_scan(input: Any) -> None:
+    config, evt = input.create_event()
+    expected = config.get_fingerprint_values_for_event(evt.data.data)
+
+    with override_options({"grouping.fingerprinting.indexed-rules": True}):
+        assert config.get_fingerprint_values_for_event(evt.data.data) == expected
+
+
+def test_rule_index_candidates() -> None:
+    rules = FingerprintingRules.from_config_string(
+        """
+type:DatabaseUnavailable                -> exact-type
+type:Database*                          -> type-prefix
+value:"*timeout*"                       -> no-literal
+level:ERROR                             -> level
+function:handle* module:app.views       -> module
+sdk:sentry.python,sentry.javascript     -> sdk
+!type:ValueError                        -> negated
+"""
+    )
+    index = rules.get_index()
+    assert index.unindexed == [2, 6]
+
+    def get_candidate_fingerprints(data: dict[str, object]) -> list[str]:
+        access = EventAccess(data)
+        return [rules.rules[i].fingerprint[0] for i in index.get_candidates(access)]
+
+    assert get_candidate_fingerprints({"exception": {"values": [{"type": "DatabaseError"}]}}) == [
+        "type-prefix",
+        "no-literal",
+        "negated",
+    ]
+    assert get_candidate_fingerprints(
+        {
+            "level": "error",
+            "exception": {
+                "values": [
+                    {
+                        "type": "DatabaseUnavailable",
+                        "stacktrace": {
+                            "frames": [{"function": "handler", "module": "app.views.index"}]
+                        },
+                    }
+                ]
+            },
+        }
+    ) == ["exact-type", "type-prefix", "no-literal", "level", "negated"]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from sentry.grouping.ingest.grouphashes import (
+    get_or_create_grouphashes,
+    get_or_create_grouphashes_many,
+    invalidate_grouphash_cache,
+)
+from sentry.models.grouphash import GroupHash
+from sentry.reprocessing2 import start_group_reprocessing
+from sentry.testutils.cases import TestCase
+
+
+class GetOrCreateGroupHashesTest(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.group = self.create_group(project=self.project)
+        self.other_project = self.create_project()
+        invalidate_grouphash_cache([self.project.id, self.other_project.id])
+
+    def test_single_query(self) -> None:
+        a = GroupHash.objects.create(project=self.project, hash="a" * 32, group=self.group)
+        b = GroupHash.objects.create(project=self.other_project, hash="b" * 32)
+
+        with self.assertNumQueries(1):
+            result = get_or_create_grouphashes_many(
+                [(self.project, ["a" * 32]), (self.other_project, ["b" * 32])]
+            )
+
+        assert result == [[a], [b]]
+        assert result[0][0].group_id == self.group.id
+
+    def test_creates_missing(self) -> None:
+        a = GroupHash.objects.create(project=self.project, hash="a" * 32)
+
+        result = get_or_create_grouphashes(self.project, ["c" * 32, "a" * 32])
+
+        assert [gh.hash for gh in result] == ["c" * 32, "a" * 32]
+        assert result[1] == a
+        assert GroupHash.objects.filter(project=self.project, hash="c" * 32).exists()
+        # A hash of another project is never returned
+        assert get_or_create_grouphashes(self.other_project, ["a" * 32])[0] != a
+
+    def test_cache(self) -> None:
+        a = GroupHash.objects.create(project=self.project, hash="a" * 32, group=self.group)
+        GroupHash.objects.create(project=self.project, hash="b" * 32)
+
+        with self.options({"grouping.grouphash-cache.enabled": True}):
+            get_or_create_grouphashes(self.project, ["a" * 32, "b" * 32])
+
+            # Grouphashes with a group are served from the cache
+            with self.assertNumQueries(0):
+                (cached,) = get_or_create_grouphashes(self.project, ["a" * 32])
+            assert cached.id == a.id
+            assert cached.group_id == self.group.id
+
+            # Grouphashes without a group are not cached
+            with self.assertNumQueries(1):
+                get_or_create_grouphashes(self.project, ["b" * 32])
+
+    def test_cache_invalidation(self) -> None:
+        GroupHash.objects.create(project=self.project, hash="a" * 32, group=self.group)
+        new_group = self.create_group(project=self.project)
+
+        with self.options({"grouping.grouphash-cache.enabled": True}):
+            get_or_create_grouphashes(self.project, ["a" * 32])
+
+            GroupHash.objects.filter(project=self.project, hash="a" * 32).update(group=new_group)
+            invalidate_grouphash_cache([self.project.id])
+
+            (grouphash,) = get_or_create_grouphashes(self.project, ["a" * 32])
+            assert grouphash.group_id == new_group.id
+
+    def test_cache_invalidated_by_reprocessing(self) -> None:
+        GroupHash.objects.create(project=self.project, hash="a" * 32, group=self.group)
+
+        with self.options({"grouping.grouphash-cache.enabled": True}):
+            get_or_create_grouphashes(self.project, ["a" * 32])
+
+            with mock.patch(
+                "sentry.reprocessing2.snuba.aliased_query",
+                return_value={"data": [{"times_seen": 0}]},
+            ):
+                new_group_id = start_group_reprocessing(
+                    project_id=self.project.id, group_id=self.group.id, remaining_events="delete"
+                )
+
+            (grouphash,) = get_or_create_grouphashes(self.project, ["a" * 32])
+            assert grouphash.group_id == new_group_id
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import patch
+
+from sentry import eventstore
+from sentry.event_manager import EventManager
+from sentry.eventstore.models import Event
+from sentry.grouping.api import (
+    GroupingConfig,
+    get_grouping_config_dict_for_project,
+    load_grouping_config,
+)
+from sentry.grouping.enhancer import Enhancements
+from sentry.grouping.ingest.caching import _local_cache, get_grouping_cache_key, get_hashes_cached
+from sentry.testutils.cases import TestCase
+
+
+class GroupingHashCacheTest(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        _local_cache.clear()
+        self.grouping_config = get_grouping_config_dict_for_project(self.project)
+        self.loaded_config = load_grouping_config(self.grouping_config)
+
+    def make_event(self, **kwargs: Any) -> Event:
+        data = {
+            "exception": {
+                "values": [
+                    {
+                        "type": "ValueError",
+                        "value": "invalid literal",
+                        "stacktrace": {
+                            "frames": [
+                                {"function": "main", "module": "app", "in_app": True},
+                                {"function": "parse", "module": "app.parser", "in_app": True},
+                            ]
+                        },
+                    }
+                ]
+            },
+            **kwargs,
+        }
+        manager = EventManager(data)
+        manager.normalize()
+        return eventstore.backend.create_event(project_id=self.project.id, data=manager.get_data())
+
+    def test_reuses_hashes(self) -> None:
+        expected = self.make_event().get_hashes(self.loaded_config)
+
+        with (
+            self.options({"grouping.hash-cache.enabled": True}),
+            patch.object(
+                Event, "get_hashes", autospec=True, side_effect=Event.get_hashes
+            ) as get_hashes,
+        ):
+            first = get_hashes_cached(
+                self.project, self.make_event(), self.grouping_config, self.loaded_config
+            )
+            second = get_hashes_cached(
+                self.project,
+                self.make_event(tags={"foo": "bar"}),
+                self.grouping_config,
+                self.loaded_config,
+            )
+
+        assert get_hashes.call_count == 1
+        assert first.hashes == second.hashes == expected.hashes
+        assert first.hashes is not second.hashes
+
+    def test_disabled(self) -> None:
+        with patch.object(
+            Event, "get_hashes", autospec=True, side_effect=Event.get_hashes
+        ) as get_hashes:
+            for _ in range(2):
+                get_hashes_cached(
+                    self.project, self.make_event(), self.grouping_config, self.loaded_config
+                )
+        assert get_hashes.call_count == 2
+
+    def test_key_changes_with_grouping_input(self) -> None:
+        event = self.make_event()
+        key = get_grouping_cache_key(self.project, event, self.grouping_config)
+        assert key is not None
+        assert key == get_grouping_cache_key(
+            self.project, self.make_event(tags={"foo": "bar"}), self.grouping_config
+        )
+        assert key != get_grouping_cache_key(
+            self.project, self.make_event(platform="javascript"), self.grouping_config
+        )
+        salted = self.make_event(fingerprint=["{{ default }}", "foo"])
+        assert key != get_grouping_cache_key(self.project, salted, self.grouping_config)
+
+    def test_key_changes_with_project_config(self) -> None:
+        event = self.make_event()
+        key = get_grouping_cache_key(self.project, event, self.grouping_config)
+
+        enhancements = Enhancements.loads(self.grouping_config["enhancements"])
+        custom = Enhancements.from_config_string("function:parse -app", bases=enhancements.bases)
+        config: GroupingConfig = {**self.grouping_config, "enhancements": custom.dumps()}
+        assert key != get_grouping_cache_key(self.project, event, config)
+
+        assert key != get_grouping_cache_key(
+            self.project, event, {**self.grouping_config, "id": "legacy:2019-03-12"}
+        )
+
+        self.project.update_option("sentry:fingerprinting_rules", "type:ValueError -> value-error")
+        assert key != get_grouping_cache_key(self.project, event, self.grouping_config)
+
+    def test_fingerprint_variables_are_not_cached(self) -> None:
+        event = self.make_event(fingerprint=["{{ default }}", "{{ transaction }}"])
+        assert get_grouping_cache_key(self.project, event, self.grouping_config) is None
+
+    def test_redis(self) -> None:
+        expected = self.make_event().get_hashes(self.loaded_config)
+
+        with self.options(
+            {"grouping.hash-cache.enabled": True, "grouping.hash-cache.use-redis": True}
+        ):
+            get_hashes_cached(
+                self.project, self.make_event(), self.grouping_config, self.loaded_config
+            )
+            _local_cache.clear()
+
+            with patch.object(Event, "get_hashes") as get_hashes:
+                hashes = get_hashes_cached(
+                    self.project, self.make_event(), self.grouping_config, self.loaded_config
+                )
+
+        assert not get_hashes.called
+        assert hashes.hashes == expected.hashes
+        assert hashes.hierarchical_hashes == expected.hierarchical_hashes
@@ -155,3 +155,18 @@ def test_cache(ns):
         ns.get("node_4")
         ns.get("node_4")
         assert mock_read_row.call_count == 2
+
+
+def test_get_multi_concurrent():
+    ns = MockedBigtableNodeStorage(project="test", multi_get_batch_size=2, multi_get_concurrency=4)
+    nodes = {f"{i}" * 32: {"foo": str(i)} for i in range(5)}
+    for node_id, data in nodes.items():
+        ns.set(node_id, data)
+    assert ns.cache is not None
+    ns.cache.clear()
+
+    table = ns.store._get_table()
+    with mock.patch.object(table, "read_rows", wraps=table.read_rows) as mock_read_rows:
+        assert ns.get_multi([*nodes, "missing"]) == {**nodes, "missing": None}
+        # 6 ids in batches of 2
+        assert mock_read_rows.call_count == 3
@@ -0,0 +1,57 @@
+import pytest
+
+from sentry.nodestore.dictionaries import DictionaryRegistry, train_dictionary
+from sentry.testutils.skips import requires_benchmark
+from sentry.utils.codecs import Codec, ZlibCodec, ZstdCodec
+from tests.sentry.nodestore.test_dictionaries import make_samples
+
+SAMPLES = make_samples(500)
+TRAINING, PAYLOADS = SAMPLES[:400], SAMPLES[400:]
+
+
+class DictionaryCodec(Codec[bytes, bytes]):
+    def __init__(self) -> None:
+        self.registry = DictionaryRegistry([("python", train_dictionary(TRAINING, 65536, 40000))])
+
+    def encode(self, value: bytes) -> bytes:
+        rv = self.registry.compress(value, ["python"])
+        assert rv is not None
+        return rv
+
+    def decode(self, value: bytes) -> bytes:
+        return self.registry.decompress(value)
+
+
+CODECS: dict[str, type[Codec[bytes, bytes]]] = {
+    "zlib": ZlibCodec,
+    "zstd": ZstdCodec,
+    "zstd_dictionary": DictionaryCodec,
+}
+
+
+@requires_benchmark
+@pytest.mark.parametrize("codec_name", sorted(CODECS))
+def test_benchmark_encode(codec_name, benchmark):
+    codec = CODECS[codec_name]()
+
+    def encode():
+        return [codec.encode(value) for value in PAYLOADS]
+
+    encoded = benchmark(encode)
+    raw_size = sum(len(value) for value in PAYLOADS)
+    benchmark.extra_info["ratio"] = raw_size / sum(len(value) for value in encoded)
+    benchmark.extra_info["mb_per_second"] = raw_size / benchmark.stats.stats.mean / 1e6
+
+
+@requires_benchmark
+@pytest.mark.parametrize("codec_name", sorted(CODECS))
+def test_benchmark_decode(codec_name, benchmark):
+    codec = CODECS[codec_name]()
+    encoded = [codec.encode(value) for value in PAYLOADS]
+
+    def decode():
+        return [codec.decode(value) for value in encoded]
+
+    assert benchmark(decode) == PAYLOADS
+    raw_size = sum(len(value) for value in PAYLOADS)
+    benchmark.extra_info["mb_per_second"] = raw_size / benchmark.stats.stats.mean / 1e6
@@ -7,6 +7,7 @@ from contextlib import nullcontext
 import pytest
 
 from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.nodestore.framing import FRAMED_MAGIC
 from sentry.testutils.helpers import override_options
 from tests.sentry.nodestore.bigtable.test_backend import (
     MockedBigtableNodeStorage,
@@ -97,3 +98,26 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+@override_options(
+    {
+        "nodestore.set-subkeys.enable-set-cache-item": False,
+        "nodestore.framed-subkeys.enabled": True,
+    }
+)
+def test_set_subkeys_framed(ns):
+    ns.set_subkeys(
+        "node_1", {None: {"foo": "a"}, "other": {"foo": "b"}, "unprocessed": {"foo": "c"}}
+    )
+    assert ns.get_bytes("node_1").startswith(FRAMED_MAGIC)
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_1", subkey="unprocessed") == {"foo": "c"}
+    assert ns.get("node_1", subkey="missing") is None
+    assert ns.get_multi(["node_1"], subkey="other") == {"node_1": {"foo": "b"}}
+
+    # Nodes without subkeys keep the plain layout
+    ns.set("node_2", {"foo": "a"})
+    assert ns.get_bytes("node_2").startswith(b"{")
+    assert ns.get("node_2") == {"foo": "a"}
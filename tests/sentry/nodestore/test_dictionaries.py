@@ -0,0 +1,177 @@
+import os
+import uuid
+from unittest import mock
+
+import pytest
+import zstandard
+from django.test import override_settings
+
+from sentry.nodestore.base import json_dumps
+from sentry.nodestore.dictionaries import (
+    ZSTD_MAGIC,
+    DictionaryRegistry,
+    MissingDictionary,
+    _registries,
+    get_dictionary_names,
+    get_dictionary_registry,
+    train_dictionary,
+    write_dictionary,
+)
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.testutils.helpers import override_options
+from tests.sentry.nodestore.bigtable.test_backend import MockedBigtableNodeStorage
+
+
+def make_event(i: int, platform: str = "python") -> dict:
+    return {
+        "event_id": uuid.uuid4().hex,
+        "project": 1,
+        "platform": platform,
+        "message": f"Something went wrong: {i}",
+        "sdk": {"name": "sentry.python", "version": "1.40.0", "integrations": ["django", "redis"]},
+        "contexts": {
+            "runtime": {"name": "CPython", "version": "3.11.4"},
+            "os": {"name": "Linux", "kernel_version": "6.1.0"},
+        },
+        "modules": {f"package-{n}": f"{n}.{i % 3}.0" for n in range(40)},
+        "exception": {
+            "values": [
+                {
+                    "type": "ValueError",
+                    "value": f"invalid literal for int() with base 10: '{i}'",
+                    "stacktrace": {
+                        "frames": [
+                            {
+                                "filename": f"app/views/view_{n}.py",
+                                "function": f"handler_{n}",
+                                "lineno": n * 10 + i % 7,
+                                "in_app": True,
+                            }
+                            for n in range(15)
+                        ]
+                    },
+                }
+            ]
+        },
+    }
+
+
+def make_samples(count: int, platform: str = "python") -> list[bytes]:
+    return [json_dumps(make_event(i, platform)).encode("utf8") for i in range(count)]
+
+
+@pytest.fixture
+def dictionaries_dir(tmp_path):
+    path = str(tmp_path)
+    dictionary = train_dictionary(make_samples(200), 16384, dict_id=40000)
+    write_dictionary(path, "python", dictionary)
+    _registries.clear()
+    with override_settings(SENTRY_NODESTORE_DICTIONARIES_DIR=path):
+        yield path
+    _registries.clear()
+
+
+def test_get_dictionary_names():
+    assert get_dictionary_names({"project": 1, "platform": "python"}) == ["project-1", "python"]
+    assert get_dictionary_names({"platform": "python"}) == ["python"]
+    assert get_dictionary_names({}) == []
+
+
+def test_registry_roundtrip(dictionaries_dir):
+    registry = DictionaryRegistry.from_directory(dictionaries_dir)
+    assert registry.next_dict_id() == 40001
+
+    value = make_samples(1)[0]
+    assert registry.compress(value, ["javascript"]) is None
+
+    compressed = registry.compress(value, ["project-1", "python"])
+    assert compressed is not None
+    assert compressed.startswith(ZSTD_MAGIC)
+    assert len(compressed) < len(zstandard.ZstdCompressor().compress(value))
+    assert registry.decompress(compressed) == value
+
+
+def test_registry_picks_newest_dictionary(dictionaries_dir):
+    newer = train_dictionary(make_samples(200), 16384, dict_id=40001)
+    write_dictionary(dictionaries_dir, "python", newer)
+    registry = DictionaryRegistry.from_directory(dictionaries_dir)
+
+    compressed = registry.compress(make_samples(1)[0], ["python"])
+    assert compressed is not None
+    assert zstandard.get_frame_parameters(compressed).dict_id == 40001
+
+
+def test_registry_missing_dictionary(dictionaries_dir):
+    registry = DictionaryRegistry.from_directory(dictionaries_dir)
+    compressed = registry.compress(make_samples(1)[0], ["python"])
+    assert compressed is not None
+
+    for filename in os.listdir(dictionaries_dir):
+        os.remove(os.path.join(dictionaries_dir, filename))
+    with pytest.raises(MissingDictionary):
+        DictionaryRegistry.from_directory(dictionaries_dir).decompress(compressed)
+
+
+@override_options(
+    {
+        "nodestore.set-subkeys.enable-set-cache-item": False,
+        "nodestore.zstd-dictionary.enabled": True,
+    }
+)
+def test_nodestore_roundtrip(dictionaries_dir):
+    ns = MockedBigtableNodeStorage(project="test")
+    data = make_event(1)
+    ns.set_subkeys("a" * 32, {None: data, "unprocessed": {"foo": "bar"}})
+    payload = ns.get_bytes("a" * 32)
+    assert payload is not None and payload.startswith(ZSTD_MAGIC)
+    assert ns.get("a" * 32) == data
+    assert ns.get("a" * 32, subkey="unprocessed") == {"foo": "bar"}
+
+    # Payloads without a matching dictionary are stored as before
+    other = make_event(2, platform="javascript")
+    ns.set("b" * 32, other)
+    payload = ns.get_bytes("b" * 32)
+    assert payload is not None and payload.startswith(b"{")
+    assert ns.get_multi(["a" * 32, "b" * 32]) == {"a" * 32: data, "b" * 32: other}
+
+
+@override_options({"nodestore.set-subkeys.enable-set-cache-item": False})
+def test_nodestore_disabled(dictionaries_dir):
+    ns = MockedBigtableNodeStorage(project="test")
+    data = make_event(1)
+    ns.set("a" * 32, data)
+    payload = ns.get_bytes("a" * 32)
+    assert payload is not None and payload.startswith(b"{")
+    assert ns.get("a" * 32) == data
+
+
+def test_nodestore_reloads_dictionaries(dictionaries_dir):
+    ns = MockedBigtableNodeStorage(project="test")
+    data = make_event(1)
+    assert get_dictionary_registry() is not None
+
+    # Another process picks up a newer dictionary and writes a node with it.
+    dictionary = train_dictionary(make_samples(200), 16384, dict_id=40001)
+    write_dictionary(dictionaries_dir, "python", dictionary)
+    compressed = DictionaryRegistry.from_directory(dictionaries_dir).compress(
+        json_dumps(data).encode("utf8"), ["python"]
+    )
+    assert compressed is not None
+    assert zstandard.get_frame_parameters(compressed).dict_id == 40001
+
+    with mock.patch("sentry.nodestore.dictionaries.RELOAD_INTERVAL", 0):
+        assert ns._decode(compressed, subkey=None) == data
+
+
+def test_django_nodestore_missing_dictionary(dictionaries_dir):
+    registry = get_dictionary_registry()
+    assert registry is not None
+    compressed = registry.compress(make_samples(1)[0], ["python"])
+    assert compressed is not None
+
+    # Nodes that can't be decompressed are not mistaken for empty ones.
+    for filename in os.listdir(dictionaries_dir):
+        os.remove(os.path.join(dictionaries_dir, filename))
+    _registries.clear()
+    with pytest.raises(MissingDictionary):
+        DjangoNodeStorage()._decode(compressed, subkey=None)
@@ -0,0 +1,16 @@
+from sentry.nodestore.framing import FRAMED_MAGIC, encode_framed, is_framed, read_framed
+
+
+def test_roundtrip():
+    value = encode_framed({None: b'{"foo":"a"}', "unprocessed": b'{"foo":"b"}', "x": b""})
+    assert value.startswith(FRAMED_MAGIC)
+    assert is_framed(value)
+    assert read_framed(value, None) == b'{"foo":"a"}'
+    assert read_framed(value, "unprocessed") == b'{"foo":"b"}'
+    assert read_framed(value, "x") == b""
+    assert read_framed(value, "missing") is None
+
+
+def test_not_framed():
+    assert not is_framed(b'{"foo":"a"}\nunprocessed\n{"foo":"b"}')
+    assert not is_framed(b"\x28\xb5\x2f\xfd")
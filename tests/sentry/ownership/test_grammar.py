@@ -8,9 +8,11 @@ from sentry.ownership.grammar import (
     convert_schema_to_rules_text,
     dump_schema,
     load_schema,
+    load_schema_compiled,
     parse_code_owners,
     parse_rules,
 )
+from sentry.testutils.skips import requires_benchmark
 
 fixture_data = """
 # cool stuff comment
@@ -1023,3 +1025,79 @@ def test_convert_schema_to_rules_text():
         )
         == "path:*.js #frontend m@robenolt.com\nurl:http://google.com/* #backend\npath:src/sentry/* david@sentry.io\ntags.foo:bar tagperson@sentry.io\ntags.foo:bar baz tagperson@sentry.io\nmodule:foo.bar #workflow\nmodule:foo bar meow@sentry.io\n"
     )
+
+
+def _make_event(filename, module, platform="python"):
+    return {
+        "platform": platform,
+        "request": {"url": "http://google.com/foo"},
+        "tags": [["foo", "bar"]],
+        "exception": {
+            "values": [
+                {
+                    "stacktrace": {
+                        "frames": [
+                            {"filename": filename, "module": module},
+                            {"filename": filename, "abs_path": f"/usr/src/{filename}"},
+                            {"filename": "src/components/Button.tsx"},
+                        ]
+                    }
+                }
+            ]
+        },
+    }
+
+
+def _codeowners_rules():
+    return [
+        Rule(Matcher("codeowners", pattern), [Owner("team", "frontend")])
+        for pattern in ("*.py", "/src/components/", "src/*/models.py", "**/app.js")
+    ]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        _make_event("src/sentry/models.py", "foo.bar"),
+        _make_event("app.js", "foo bar", platform="javascript"),
+        _make_event("src/other/file.py", "other"),
+        {"platform": "java", "exception": {"values": [{"stacktrace": {"frames": [{}]}}]}},
+        {},
+    ],
+)
+def test_compiled_schema_matches_rule_test(data):
+    schema = dump_schema(parse_rules(fixture_data) + _codeowners_rules())
+    expected = [rule for rule in load_schema(schema) if rule.test(data)]
+    assert load_schema_compiled(schema).get_matching_rules(data) == expected
+
+
+def test_load_schema_compiled_is_cached():
+    schema = dump_schema(parse_rules(fixture_data))
+    same_schema = dump_schema(parse_rules(fixture_data))
+    assert load_schema_compiled(schema) is load_schema_compiled(same_schema)
+    assert load_schema_compiled(schema) is not load_schema_compiled(dump_schema([]))
+
+
+@requires_benchmark
+@pytest.mark.parametrize("compiled", [False, True], ids=["rule_test", "compiled"])
+def test_benchmark_ownership_matching(benchmark, compiled):
+    rules = [
+        Rule(Matcher("codeowners", f"/src/team{i}/**/*.py"), [Owner("team", f"team{i}")])
+        for i in range(1000)
+    ]
+    schema = dump_schema(rules)
+    data = _make_event("src/team500/views/index.py", "team500.views")
+
+    if compiled:
+
+        def match():
+            return load_schema_compiled(schema).get_matching_rules(data)
+
+    else:
+
+        def match():
+            return [rule for rule in load_schema(schema) if rule.test(data)]
+
+    result = benchmark.pedantic(match, rounds=10, iterations=1)
+    assert [rule.owners[0].identifier for rule in result] == ["team500"]
+    benchmark.extra_info["rules"] = len(rules)
@@ -68,6 +68,23 @@ def test_is_rate_limited_script():
     assert list(map(bool, is_rate_limited(("orange", "apple"), (1, now + 60), client))) == [False]
 
 
+def test_is_rate_limited_script_usage():
+    now = int(time.time())
+
+    cluster = clusters.get("default")
+    client = cluster.get_local_client(next(iter(cluster.hosts)))
+    client.set("r:foo", 1)
+
+    # Usage follows the rejections if requested, and includes the item.
+    assert is_rate_limited(
+        ("foo", "r:foo", "bar", "r:bar"), (3, now + 60, -1, now + 60, 1), client
+    ) == [None, None, 0, 0]
+    assert is_rate_limited(
+        ("foo", "r:foo", "bar", "r:bar"), (3, now + 60, -1, now + 60, 1), client
+    ) == [None, None, 1, 0]
+    assert client.get("foo") == b"2"
+
+
 class RedisQuotaTest(TestCase):
     @cached_property
     def quota(self):
@@ -427,6 +444,59 @@ class RedisQuotaTest(TestCase):
             0,  # dummy quota is not consumed
         ]
 
+    def test_local_cache(self):
+        timestamp = time.time()
+        quota = RedisQuota(local_cache_ttl=60, local_cache_budget=5)
+
+        self.get_project_quota.return_value = (1000, 60)
+        self.get_organization_quota.return_value = (None, 60)
+        self.get_monitor_quota.return_value = (None, 60)
+        quotas = quota.get_quotas(self.project)
+
+        with mock.patch(
+            "sentry.quotas.redis.is_rate_limited", wraps=is_rate_limited
+        ) as mock_is_rate_limited:
+            # The first item goes to Redis, the next five are admitted locally ...
+            for _ in range(6):
+                assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+            assert mock_is_rate_limited.call_count == 1
+            assert quota.get_usage(self.organization.id, quotas, timestamp=timestamp) == [1]
+
+            # ... and counted once the budget is spent.
+            assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+            assert mock_is_rate_limited.call_count == 2
+            assert quota.get_usage(self.organization.id, quotas, timestamp=timestamp) == [7]
+
+    def test_local_cache_flushes_idle_projects(self):
+        timestamp = time.time()
+        quota = RedisQuota(local_cache_ttl=10, local_cache_budget=5)
+
+        self.get_project_quota.return_value = (1000, 60)
+        self.get_organization_quota.return_value = (None, 60)
+        self.get_monitor_quota.return_value = (None, 60)
+        quotas = quota.get_quotas(self.project)
+
+        for _ in range(3):
+            assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+        assert quota.get_usage(self.organization.id, quotas, timestamp=timestamp) == [1]
+
+        # The project goes quiet, a check for any other project flushes it.
+        other_project = self.create_project(organization=self.organization)
+        quota.is_rate_limited(other_project, timestamp=timestamp + 11)
+        assert quota.get_usage(self.organization.id, quotas, timestamp=timestamp) == [3]
+
+    def test_local_cache_near_limit(self):
+        timestamp = time.time()
+        quota = RedisQuota(local_cache_ttl=60, local_cache_budget=5)
+
+        self.get_project_quota.return_value = (2, 60)
+        self.get_organization_quota.return_value = (None, 60)
+        self.get_monitor_quota.return_value = (None, 60)
+
+        assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+        assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+        assert quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+
     @mock.patch.object(RedisQuota, "get_quotas")
     def test_refund_defaults(self, mock_get_quotas):
         timestamp = time.time()
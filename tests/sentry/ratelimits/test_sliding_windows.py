@@ -1,3 +1,7 @@
+import statistics
+import time
+from collections import defaultdict
+
 import pytest
 
 from sentry.ratelimits.sliding_windows import (
@@ -6,6 +10,7 @@ from sentry.ratelimits.sliding_windows import (
     RedisSlidingWindowRateLimiter,
     RequestedQuota,
 )
+from sentry.testutils.skips import requires_benchmark
 
 
 @pytest.fixture
@@ -71,3 +76,117 @@ def test_basic(limiter):
         )
 
         assert resp == [GrantedQuota(prefix="foo", granted=0, reached_quotas=quotas)]
+
+
+def test_leasing():
+    limiter = RedisSlidingWindowRateLimiter(lease_size=5, lease_seconds=2)
+    other = RedisSlidingWindowRateLimiter()
+    quotas = [Quota(window_seconds=100, granularity_seconds=10, limit=100)]
+    request = [RequestedQuota(prefix="leased", requested=1, quotas=quotas)]
+    timestamp = TIMESTAMP_OFFSET + 100
+
+    def remaining(timestamp: int) -> int:
+        _, (grant,) = other.check_within_quotas(
+            [RequestedQuota(prefix="leased", requested=100, quotas=quotas)], timestamp
+        )
+        return grant.granted
+
+    # The first request reserves five more tokens in Redis ...
+    resp = limiter.check_and_use_quotas(request, timestamp=timestamp)
+    assert resp == [GrantedQuota(prefix="leased", granted=1, reached_quotas=[])]
+    assert remaining(timestamp) == 94
+
+    # ... which the next requests spend locally.
+    for _ in range(5):
+        resp = limiter.check_and_use_quotas(request, timestamp=timestamp)
+        assert resp == [GrantedQuota(prefix="leased", granted=1, reached_quotas=[])]
+    assert remaining(timestamp) == 94
+
+    limiter.check_and_use_quotas(request, timestamp=timestamp)
+    assert remaining(timestamp) == 88
+
+    # Once expired, the unused tokens of the lease are given back.
+    limiter.check_and_use_quotas(request, timestamp=timestamp + 2)
+    assert remaining(timestamp + 2) == 87
+
+    limiter.release_leases(timestamp + 2)
+    assert remaining(timestamp + 2) == 92
+
+
+def test_leasing_returns_idle_leases():
+    limiter = RedisSlidingWindowRateLimiter(lease_size=5)
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=100)]
+    timestamp = TIMESTAMP_OFFSET
+
+    def remaining(prefix, timestamp):
+        request = [RequestedQuota(prefix=prefix, requested=100, quotas=quotas)]
+        _, grants = limiter.check_within_quotas(request, timestamp)
+        return grants[0].granted
+
+    limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="idle", requested=1, quotas=quotas)], timestamp=timestamp
+    )
+    assert remaining("idle", timestamp) == 94
+
+    # The lease of the idle prefix is returned by a request for another one.
+    limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="busy", requested=1, quotas=quotas)], timestamp=timestamp + 2
+    )
+    assert remaining("idle", timestamp + 2) == 99
+    assert [prefix for prefix, _ in limiter._leases] == ["busy"]
+
+
+def test_leasing_limit():
+    limiter = RedisSlidingWindowRateLimiter(lease_size=100)
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=20)]
+
+    # Leases never exceed a tenth of the limit, and leased tokens are not
+    # granted beyond what was requested.
+    resp = limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="leased", requested=19, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET,
+    )
+    assert resp == [GrantedQuota(prefix="leased", granted=19, reached_quotas=[])]
+
+    resp = limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="leased", requested=2, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET,
+    )
+    assert resp == [GrantedQuota(prefix="leased", granted=1, reached_quotas=quotas)]
+
+
+@requires_benchmark
+@pytest.mark.parametrize("lease_size", [0, 50], ids=["direct", "leased"])
+def test_benchmark_load(benchmark, lease_size):
+    """
+    Simulates eight workers sharing a quota of 1000 per 10 seconds at twice
+    that demand, and reports latency and how many requests were admitted.
+    """
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=1000)]
+    workers = [RedisSlidingWindowRateLimiter(lease_size=lease_size) for _ in range(8)]
+    request = [RequestedQuota(prefix="load", requested=1, quotas=quotas)]
+    latencies = []
+    admitted: dict[int, int] = defaultdict(int)
+
+    def run():
+        for timestamp in range(TIMESTAMP_OFFSET, TIMESTAMP_OFFSET + 30):
+            for i in range(200):
+                start = time.perf_counter()
+                (grant,) = workers[i % len(workers)].check_and_use_quotas(request, timestamp)
+                latencies.append(time.perf_counter() - start)
+                admitted[timestamp] += grant.granted
+
+    benchmark.pedantic(run, rounds=1, iterations=1)
+
+    max_admitted = max(
+        sum(admitted[timestamp + i] for i in range(10))
+        for timestamp in range(TIMESTAMP_OFFSET, TIMESTAMP_OFFSET + 21)
+    )
+    assert max_admitted <= 1000 + lease_size * len(workers)
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    benchmark.extra_info["p50_latency_ms"] = percentiles[49] * 1000
+    benchmark.extra_info["p99_latency_ms"] = percentiles[98] * 1000
+    benchmark.extra_info["max_admitted_per_window"] = max_admitted
+    # How closely the admitted requests match the limit, 1.0 being exact.
+    benchmark.extra_info["accuracy"] = max_admitted / 1000
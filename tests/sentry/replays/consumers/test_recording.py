@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 import time
 import uuid
 import zlib
@@ -8,6 +9,7 @@ from datetime import datetime
 from unittest.mock import ANY, patch
 
 import msgpack
+import pytest
 from arroyo.backends.kafka import KafkaPayload
 from arroyo.types import BrokerValue, Message, Partition, Topic
 from sentry_kafka_schemas.schema_types.ingest_replay_recordings_v1 import ReplayRecording
@@ -15,12 +17,17 @@ from sentry_kafka_schemas.schema_types.ingest_replay_recordings_v1 import Replay
 from sentry.models.organizationonboardingtask import OnboardingTask, OnboardingTaskStatus
 from sentry.replays.consumers.recording import ProcessReplayRecordingStrategyFactory
 from sentry.replays.consumers.recording_buffered import (
+    BufferCommitFailed,
+    RecordingBuffer,
     RecordingBufferedStrategyFactory,
+    SegmentUploader,
     cast_payload_from_bytes,
+    process_message,
 )
 from sentry.replays.lib.storage import _make_recording_filename, _make_video_filename, storage_kv
 from sentry.replays.models import ReplayRecordingSegment
 from sentry.testutils.cases import TransactionTestCase
+from sentry.testutils.helpers.options import override_options
 
 
 def test_multiprocessing_strategy():
@@ -459,6 +466,13 @@ class ThreadedRecordingTestCase(RecordingTestCase):
     force_synchronous = False
 
 
+class StreamingRecordingTestCase(RecordingTestCase):
+    @pytest.fixture(autouse=True)
+    def streaming_segment_parser(self):
+        with override_options({"replay.ingest.streaming-segment-parser": True}):
+            yield
+
+
 # Experimental Buffered Recording Consumer
 
 
@@ -470,3 +484,101 @@ class RecordingBufferedTestCase(RecordingTestCase):
             max_buffer_size_in_bytes=1000,
             max_buffer_time_in_seconds=1000,
         )
+
+    def test_buffer_byte_size(self):
+        buffer = RecordingBuffer(
+            max_buffer_message_count=1000,
+            max_buffer_size_in_bytes=100,
+            max_buffer_time_in_seconds=1000,
+        )
+        (message,) = self.nonchunked_messages(
+            message=b'[{"hello":"world"},{"hello":"world"},{"hello":"world"}]'
+        )
+        process_message(buffer, msgpack.packb(message))
+        assert not buffer.is_ready
+
+        process_message(buffer, msgpack.packb(message))
+        assert buffer.has_exceeded_buffer_byte_size
+        assert buffer.is_ready
+
+
+class StreamingRecordingBufferedTestCase(RecordingBufferedTestCase):
+    @pytest.fixture(autouse=True)
+    def streaming_segment_parser(self):
+        with override_options({"replay.ingest.streaming-segment-parser": True}):
+            yield
+
+
+class LatencyStorage:
+    """
+    Stands in for `storage_kv`, taking `latency` seconds per write and failing the first
+    `failures` writes of every key.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: int = 0) -> None:
+        self.latency = latency
+        self.failures = failures
+        self.data: dict[str, bytes] = {}
+        self.attempts: dict[str, int] = {}
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.lock = threading.Lock()
+
+    def set(self, key: str, value: bytes) -> None:
+        with self.lock:
+            self.attempts[key] = self.attempts.get(key, 0) + 1
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            time.sleep(self.latency)
+            if self.attempts[key] <= self.failures:
+                raise OSError("storage unavailable")
+            self.data[key] = value
+        finally:
+            with self.lock:
+                self.concurrent -= 1
+
+
+def make_upload_events(count: int) -> list:
+    return [{"key": f"segment-{i}", "value": b"x" * 100} for i in range(count)]
+
+
+def test_segment_uploader_concurrency():
+    storage = LatencyStorage(latency=0.05)
+    uploader = SegmentUploader(max_workers=4)
+    upload_events = make_upload_events(20)
+
+    with patch("sentry.replays.consumers.recording_buffered.storage_kv", storage):
+        start = time.monotonic()
+        uploader.upload(upload_events)
+        duration = time.monotonic() - start
+    uploader.shutdown()
+
+    assert storage.data == {event["key"]: event["value"] for event in upload_events}
+    assert storage.max_concurrent == 4
+    # Uploads run in parallel instead of taking the sum of their latencies.
+    assert duration < 20 * 0.05
+
+
+def test_segment_uploader_retry():
+    storage = LatencyStorage(failures=2)
+    uploader = SegmentUploader(max_workers=4, retry_backoff_seconds=0)
+
+    with patch("sentry.replays.consumers.recording_buffered.storage_kv", storage):
+        uploader.upload(make_upload_events(10))
+    uploader.shutdown()
+
+    assert len(storage.data) == 10
+    assert set(storage.attempts.values()) == {3}
+
+
+def test_segment_uploader_failure():
+    storage = LatencyStorage(failures=3)
+    uploader = SegmentUploader(max_workers=4, retry_backoff_seconds=0)
+
+    with patch("sentry.replays.consumers.recording_buffered.storage_kv", storage):
+        with pytest.raises(BufferCommitFailed):
+            uploader.upload(make_upload_events(10))
+    uploader.shutdown()
+
+    assert storage.data == {}
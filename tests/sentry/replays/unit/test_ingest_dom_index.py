@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import time
+import tracemalloc
 import uuid
 from typing import Any
 from unittest import mock
@@ -12,11 +14,15 @@ from sentry.replays.usecases.ingest.dom_index import (
     _parse_classes,
     encode_as_uuid,
     get_user_actions,
+    iter_custom_events,
+    iter_rrweb_events,
     log_canvas_size,
+    log_raw_canvas_size,
     parse_replay_actions,
 )
 from sentry.testutils.helpers.features import Feature
 from sentry.testutils.pytest.fixtures import django_db_all
+from sentry.testutils.skips import requires_benchmark
 from sentry.utils import json
 
 
@@ -1138,3 +1144,119 @@ def test_emit_click_negative_node_id():
 
     user_actions = get_user_actions(1, uuid.uuid4().hex, events, None)
     assert len(user_actions) == 0
+
+
+def _make_segment(snapshot_nodes: int) -> list[dict[str, Any]]:
+    """Return a segment with a full snapshot, mutations, a canvas mutation and a click."""
+    nodes = [
+        {"type": 2, "id": i, "tagName": "div", "attributes": {"class": "a[b]{c}"}, "childNodes": []}
+        for i in range(snapshot_nodes)
+    ]
+    return [
+        {"type": 4, "timestamp": 1, "data": {"href": "https://sentry.io", "width": 1, "height": 1}},
+        {"type": 2, "timestamp": 1, "data": {"node": {"type": 0, "childNodes": nodes}}},
+        {"type": 3, "timestamp": 2, "data": {"source": 0, "adds": nodes[:10], "texts": []}},
+        {"timestamp": 3, "data": {"source": 9, "id": 1, "commands": []}, "type": 3},
+        {
+            "type": 5,
+            "timestamp": 4,
+            "data": {
+                "tag": "breadcrumb",
+                "payload": {
+                    "timestamp": 4.1,
+                    "type": "default",
+                    "category": "ui.click",
+                    "message": 'div#hello "quoted" \\ [',
+                    "data": {
+                        "nodeId": 1,
+                        "node": {
+                            "id": 1,
+                            "tagName": "div",
+                            "attributes": {"id": "hello"},
+                            "textContent": "Hello, world!",
+                        },
+                    },
+                },
+            },
+        },
+    ]
+
+
+def test_iter_rrweb_events():
+    segment = _make_segment(snapshot_nodes=5)
+    events = list(iter_rrweb_events(json.dumps(segment).encode()))
+
+    assert [(event.type, event.source) for event in events] == [
+        (4, None),
+        (2, None),
+        (3, 0),
+        (3, 9),
+        (5, None),
+    ]
+    assert [json.loads(bytes(event.raw)) for event in events] == segment
+    assert list(iter_custom_events(events)) == [segment[4]]
+
+    assert list(iter_rrweb_events(b" [ ] ")) == []
+    assert list(iter_rrweb_events(b'[{"type": "5", "data": []}]'))[0].type is None
+
+
+@pytest.mark.parametrize("segment", [b"", b"{}", b"[{]", b'[{"a": [}]', b'[{"type": 5}', b"[]]"])
+def test_iter_rrweb_events_invalid(segment: bytes):
+    with pytest.raises(ValueError):
+        list(iter_rrweb_events(segment))
+
+
+def test_iter_custom_events_get_user_actions():
+    segment = _make_segment(snapshot_nodes=5)
+    segment_bytes = json.dumps(segment).encode()
+    replay_id = uuid.uuid4().hex
+
+    streamed = get_user_actions(
+        1, replay_id, iter_custom_events(iter_rrweb_events(segment_bytes)), None
+    )
+    assert len(streamed) == 1
+    assert streamed == get_user_actions(1, replay_id, json.loads(segment_bytes), None)
+
+
+def test_log_raw_canvas_size():
+    segment = _make_segment(snapshot_nodes=5)
+    segment_bytes = json.dumps(segment).encode()
+
+    with mock.patch("sentry.replays.usecases.ingest.dom_index.logger") as logger:
+        log_raw_canvas_size(1, 1, "a", iter_rrweb_events(segment_bytes))
+
+    (call,) = logger.info.call_args_list
+    assert call.kwargs["extra"]["size"] == len(json.dumps(segment[3]))
+
+
+@requires_benchmark
+@pytest.mark.parametrize("streaming", [False, True])
+def test_benchmark_get_user_actions(benchmark, streaming: bool):
+    # A full snapshot of a large page dominates the size of the segment.
+    segment_bytes = json.dumps(_make_segment(snapshot_nodes=20000)).encode()
+    replay_id = uuid.uuid4().hex
+
+    def run() -> list[Any]:
+        if streaming:
+            events = iter_custom_events(iter_rrweb_events(segment_bytes))
+        else:
+            events = json.loads(segment_bytes)
+        return get_user_actions(1, replay_id, events, None)
+
+    assert len(benchmark(run)) == 1
+
+    # The streaming parser trades CPU time for memory, report both.
+    start = time.process_time()
+    run()
+    cpu_seconds = time.process_time() - start
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info["segment_bytes"] = len(segment_bytes)
+    benchmark.extra_info["cpu_seconds"] = cpu_seconds
+    benchmark.extra_info["peak_memory_bytes"] = peak
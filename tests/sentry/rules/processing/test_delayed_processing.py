@@ -1,11 +1,33 @@
 from unittest.mock import Mock, patch
 
+import pytest
+from django.utils import timezone
+
 from sentry.db import models
+from sentry.models.rule import Rule
 from sentry.rules.processing.delayed_processing import (
+    ConditionQueryPlanner,
     apply_delayed,
+    get_batch_conditions,
+    get_rules_to_fire,
+    get_rules_to_groups,
     process_delayed_alert_conditions,
 )
 from sentry.testutils.cases import TestCase
+from sentry.testutils.pytest.fixtures import django_db_all
+from sentry.testutils.skips import requires_benchmark
+
+EVENT_FREQUENCY_CONDITION = "sentry.rules.conditions.event_frequency.EventFrequencyCondition"
+
+
+def make_tsdb(now, current_count, comparison_count):
+    def get_sums(model, keys, start, end, **kwargs):
+        count = current_count if end == now else comparison_count
+        return {key: count for key in keys}
+
+    tsdb = Mock()
+    tsdb.get_sums.side_effect = get_sums
+    return tsdb
 
 
 class ProcessDelayedAlertConditionsTest(TestCase):
@@ -51,3 +73,114 @@ class ProcessDelayedAlertConditionsTest(TestCase):
                 rule_group_event_mapping,
                 _with_transaction=False,
             )
+
+
+class GetRulesToFireTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.groups = [self.create_group(project=self.project) for _ in range(3)]
+
+    def create_frequency_rule(self, value, **condition_data):
+        return self.create_project_rule(
+            project=self.project,
+            condition_data=[
+                {
+                    "id": EVENT_FREQUENCY_CONDITION,
+                    "interval": "1h",
+                    "value": value,
+                    **condition_data,
+                }
+            ],
+        )
+
+    def test_get_rules_to_groups(self):
+        assert get_rules_to_groups({"1:2": "event_1", "1:3": "event_2", "invalid": ""}) == {
+            1: {2, 3}
+        }
+
+    def test_merges_queries(self):
+        low = self.create_frequency_rule(5)
+        high = self.create_frequency_rule(50)
+        percent = self.create_frequency_rule(50, comparisonType="percent", comparisonInterval="1d")
+        group_ids = {group.id for group in self.groups}
+        rules_to_groups = {low.id: group_ids, high.id: group_ids, percent.id: group_ids}
+
+        tsdb = make_tsdb(self.now, current_count=10, comparison_count=5)
+        with patch("sentry.rules.conditions.event_frequency.tsdb", tsdb):
+            rules_to_fire = get_rules_to_fire(self.project, rules_to_groups, self.now)
+
+        # The current hour is shared by all rules, the percent comparison
+        # needs the day before.
+        assert tsdb.get_sums.call_count == 2
+        for call in tsdb.get_sums.call_args_list:
+            assert sorted(call.kwargs["keys"]) == sorted(group_ids)
+        assert rules_to_fire == {low: group_ids, percent: group_ids}
+
+    def test_environments_are_not_merged(self):
+        environment = self.create_environment(project=self.project)
+        rule = self.create_frequency_rule(5)
+        env_rule = self.create_frequency_rule(5)
+        env_rule.update(environment_id=environment.id)
+        group_id = self.groups[0].id
+
+        tsdb = make_tsdb(self.now, current_count=10, comparison_count=0)
+        with patch("sentry.rules.conditions.event_frequency.tsdb", tsdb):
+            rules_to_fire = get_rules_to_fire(
+                self.project, {rule.id: {group_id}, env_rule.id: {group_id}}, self.now
+            )
+
+        assert tsdb.get_sums.call_count == 2
+        environment_ids = {call.kwargs["environment_id"] for call in tsdb.get_sums.call_args_list}
+        assert environment_ids == {None, environment.id}
+        assert rules_to_fire == {rule: {group_id}, env_rule: {group_id}}
+
+
+@requires_benchmark
+@pytest.mark.parametrize("planned", [False, True], ids=["per_rule", "planned"])
+@django_db_all
+def test_benchmark_condition_queries(benchmark, factories, default_project, planned):
+    intervals = ["1m", "5m", "15m", "1h"]
+    rules = [
+        factories.create_project_rule(
+            project=default_project,
+            condition_data=[
+                {
+                    "id": EVENT_FREQUENCY_CONDITION,
+                    "interval": intervals[i % len(intervals)],
+                    "value": i,
+                    "comparisonType": "percent" if i % 2 else "count",
+                    "comparisonInterval": "1d",
+                }
+            ],
+        )
+        for i in range(100)
+    ]
+    group_ids = [factories.create_group(project=default_project).id for _ in range(20)]
+    now = timezone.now()
+    tsdb = make_tsdb(now, current_count=10, comparison_count=5)
+
+    def run_per_rule():
+        for rule in Rule.objects.filter(id__in=[rule.id for rule in rules]):
+            for condition in get_batch_conditions(rule):
+                interval = condition.get_option("interval")
+                for start, end in condition.get_query_windows(interval, now):
+                    condition.batch_query(group_ids, start, end, rule.environment_id)
+
+    def run_planned():
+        planner = ConditionQueryPlanner(now)
+        for rule in Rule.objects.filter(id__in=[rule.id for rule in rules]):
+            for condition in get_batch_conditions(rule):
+                planner.add(condition, rule.environment_id, group_ids)
+        planner.execute()
+
+    def setup():
+        tsdb.get_sums.reset_mock()
+
+    with patch("sentry.rules.conditions.event_frequency.tsdb", tsdb):
+        benchmark.pedantic(run_planned if planned else run_per_rule, setup=setup, rounds=5)
+
+    benchmark.extra_info["rules"] = len(rules)
+    benchmark.extra_info["tsdb_queries"] = tsdb.get_sums.call_count
+    # Percent comparisons are only used with 5m and 1h intervals, which adds two windows to the
+    # current window of every interval.
+    assert tsdb.get_sums.call_count == (len(intervals) + 2 if planned else 150)
@@ -13,11 +13,12 @@ from sentry.models.grouprulestatus import GroupRuleStatus
 from sentry.models.projectownership import ProjectOwnership
 from sentry.models.rule import Rule
 from sentry.models.rulefirehistory import RuleFireHistory
+from sentry.models.rulesnooze import RuleSnooze
 from sentry.notifications.types import ActionTargetType
 from sentry.rules import init_registry
 from sentry.rules.conditions import EventCondition
 from sentry.rules.filters.base import EventFilter
-from sentry.rules.processing.processor import RuleProcessor
+from sentry.rules.processing.processor import RuleProcessor, get_rule_plan, plan_rule
 from sentry.testutils.cases import TestCase
 from sentry.testutils.helpers import install_slack
 from sentry.testutils.helpers.features import with_feature
@@ -776,3 +777,93 @@ class RuleProcessorTestFilters(TestCase):
             safe_execute(callback, self.group_event, futures, _with_transaction=False)
         mock_build.assert_called_once()
         assert "notification_uuid" in mock_build.call_args[1]["embeds"][0].url
+
+
+class RuleProcessorRulePlanTest(TestCase):
+    MOCK_SENTRY_RULES = (
+        "sentry.mail.actions.NotifyEmailAction",
+        "sentry.rules.conditions.every_event.EveryEventCondition",
+        "sentry.rules.filters.latest_release.LatestReleaseFilter",
+        "tests.sentry.rules.processing.test_processor.MockFilterTrue",
+    )
+
+    def setUp(self):
+        event = self.store_event(data={}, project_id=self.project.id)
+        self.group_event = next(event.build_group_events())
+        Rule.objects.filter(project=self.project).delete()
+        cache.clear()
+        ProjectOwnership.objects.create(project_id=self.project.id, fallthrough=True)
+
+    def create_rule(self, conditions):
+        return Rule.objects.create(
+            project=self.project, data={"conditions": conditions, "actions": [EMAIL_ACTION_DATA]}
+        )
+
+    def test_plan_is_cached_and_invalidated(self):
+        rule = self.create_rule([EVERY_EVENT_COND_DATA])
+
+        plan = get_rule_plan(self.project.id)
+        assert [planned.rule for planned in plan.rules] == [rule]
+        with self.assertNumQueries(0):
+            get_rule_plan(self.project.id)
+
+        self.snooze_rule(owner_id=self.user.id, rule=rule)
+        plan = get_rule_plan(self.project.id)
+        assert plan.rules == []
+        assert plan.snoozed_rule_ids == {rule.id}
+
+        RuleSnooze.objects.filter(rule=rule).delete()
+        other_rule = self.create_rule([EVERY_EVENT_COND_DATA])
+        plan = get_rule_plan(self.project.id)
+        assert [planned.rule for planned in plan.rules] == [rule, other_rule]
+
+    @patch("sentry.constants._SENTRY_RULES", MOCK_SENTRY_RULES)
+    def test_cheap_filters_first(self):
+        latest_release = {"id": "sentry.rules.filters.latest_release.LatestReleaseFilter"}
+        mock_filter = {"id": "tests.sentry.rules.processing.test_processor.MockFilterTrue"}
+        rule = self.create_rule([latest_release, EVERY_EVENT_COND_DATA, mock_filter])
+
+        with patch("sentry.rules.processing.processor.rules", init_registry()):
+            planned = plan_rule(rule)
+
+        assert [p.condition for p in planned.filters] == [mock_filter, latest_release]
+        assert [p.condition for p in planned.conditions] == [EVERY_EVENT_COND_DATA]
+
+    @patch("sentry.constants._SENTRY_RULES", MOCK_SENTRY_RULES)
+    def test_predicate_key_ignores_order(self):
+        mock_filter = {"id": "tests.sentry.rules.processing.test_processor.MockFilterTrue"}
+        rule = self.create_rule([EVERY_EVENT_COND_DATA, {**mock_filter, "value": "a"}])
+        other_rule = self.create_rule([EVERY_EVENT_COND_DATA, {"value": "a", **mock_filter}])
+
+        with patch("sentry.rules.processing.processor.rules", init_registry()):
+            (predicate,) = plan_rule(rule).filters
+            (other_predicate,) = plan_rule(other_rule).filters
+
+        assert list(predicate.condition) != list(other_predicate.condition)
+        assert predicate.key == other_predicate.key
+
+    @patch("sentry.constants._SENTRY_RULES", MOCK_SENTRY_RULES)
+    def test_predicates_evaluated_once(self):
+        mock_filter = {"id": "tests.sentry.rules.processing.test_processor.MockFilterTrue"}
+        rules = [
+            self.create_rule([EVERY_EVENT_COND_DATA, {**mock_filter, "name": f"Filter {i}"}])
+            for i in range(3)
+        ]
+
+        with (
+            self.options({"rules.processor.use-rule-plan": True}),
+            patch("sentry.rules.processing.processor.rules", init_registry()),
+            patch.object(MockFilterTrue, "passes", autospec=True, return_value=True) as passes,
+        ):
+            rp = RuleProcessor(
+                self.group_event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            results = list(rp.apply())
+
+        assert passes.call_count == 1
+        assert len(results) == 1
+        assert [future.rule for future in results[0][1]] == rules
@@ -26,6 +26,7 @@ from sentry.sentry_metrics.indexer.base import FetchType, FetchTypeExt, Metadata
 from sentry.sentry_metrics.use_case_id_registry import UseCaseID
 from sentry.snuba.metrics.naming_layer.mri import SessionMRI, TransactionMRI
 from sentry.testutils.helpers.options import override_options
+from sentry.testutils.skips import requires_benchmark
 from sentry.utils import json
 
 MOCK_METRIC_ID_AGG_OPTION = {
@@ -2065,3 +2066,115 @@ def test_cardinality_limiter(caplog, settings):
             ],
         )
     ]
+
+
+def _resolve_all(batch: IndexerBatch):
+    """
+    Reconstructs the messages of a batch, assigning an id to every string.
+    """
+    strings = batch.extract_strings()
+    mapping = {
+        use_case_id: {
+            org_id: {string: i for i, string in enumerate(sorted(org_strings), 1)}
+            for org_id, org_strings in org_mapping.items()
+        }
+        for use_case_id, org_mapping in strings.items()
+    }
+    meta = {
+        use_case_id: {
+            org_id: {
+                string: Metadata(id=id, fetch_type=FetchType.CACHE_HIT)
+                for string, id in org_mapping.items()
+            }
+            for org_id, org_mapping in use_case_mapping.items()
+        }
+        for use_case_id, use_case_mapping in mapping.items()
+    }
+    return batch.reconstruct_messages(mapping, meta).data
+
+
+def _make_generic_payloads(count: int) -> list[tuple[dict[str, Any], list[tuple[str, bytes]]]]:
+    return [
+        (
+            {
+                "name": TransactionMRI.DURATION.value,
+                "tags": {
+                    "environment": "production",
+                    "transaction": f"/api/{i % 100}/",
+                    "transaction.status": "ok",
+                    "release": "backend@1.0.é",
+                },
+                "timestamp": ts,
+                "type": "d",
+                "value": [i * 0.1, 4.5, 1e-05, 123456789.25],
+                "org_id": 1 + i % 10,
+                "retention_days": 90,
+                "project_id": 3,
+            },
+            [("namespace", b"transactions")],
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "should_index_tag_values, kafka_logical_topic",
+    [(True, "snuba-metrics"), (False, "snuba-generic-metrics")],
+)
+def test_orjson_fast_path(should_index_tag_values, kafka_logical_topic):
+    if should_index_tag_values:
+        payloads = [
+            (counter_payload, counter_headers),
+            (distribution_payload, distribution_headers),
+            (set_payload, set_headers),
+        ]
+        tags_validator = ReleaseHealthTagsValidator().is_allowed
+        rules_option = RELEASE_HEALTH_SCHEMA_VALIDATION_RULES_OPTION_NAME
+    else:
+        payloads = _make_generic_payloads(10)
+        tags_validator = GenericMetricsTagsValidator().is_allowed
+        rules_option = GENERIC_METRICS_SCHEMA_VALIDATION_RULES_OPTION_NAME
+
+    results = []
+    for rollout in (0.0, 1.0):
+        with override_options({"sentry-metrics.indexer.enable-orjson-fast-path": rollout}):
+            batch = IndexerBatch(
+                _construct_outer_message(payloads),
+                should_index_tag_values,
+                False,
+                tags_validator=tags_validator,
+                schema_validator=MetricsSchemaValidator(INGEST_CODEC, rules_option).validate,
+            )
+            assert not batch.invalid_msg_meta
+            results.append(_deconstruct_messages(_resolve_all(batch), kafka_logical_topic))
+
+    rapidjson_results, orjson_results = results
+    assert len(orjson_results) == len(payloads)
+    assert orjson_results == rapidjson_results
+
+
+@pytest.mark.django_db
+@requires_benchmark
+@pytest.mark.parametrize("rollout", [0.0, 1.0])
+def test_benchmark_indexer_batch(benchmark, rollout):
+    payloads = _make_generic_payloads(1000)
+    outer_message = _construct_outer_message(payloads)
+    schema_validator = MetricsSchemaValidator(
+        INGEST_CODEC, GENERIC_METRICS_SCHEMA_VALIDATION_RULES_OPTION_NAME
+    ).validate
+
+    def run():
+        batch = IndexerBatch(
+            outer_message,
+            False,
+            False,
+            tags_validator=GenericMetricsTagsValidator().is_allowed,
+            schema_validator=schema_validator,
+        )
+        _resolve_all(batch)
+
+    with override_options({"sentry-metrics.indexer.enable-orjson-fast-path": rollout}):
+        benchmark(run)
+
+    benchmark.extra_info["messages_per_second"] = len(payloads) / benchmark.stats.stats.mean
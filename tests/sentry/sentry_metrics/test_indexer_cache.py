@@ -1,12 +1,23 @@
+import random
 from datetime import timedelta
+from unittest.mock import patch
 
 import pytest
 from django.conf import settings
 from django.utils import timezone
 
-from sentry.sentry_metrics.indexer.cache import StringIndexerCache
+from sentry.sentry_metrics.indexer.base import FetchType
+from sentry.sentry_metrics.indexer.cache import (
+    BULK_RECORD_CACHE_NAMESPACE,
+    CachingIndexer,
+    FrequencySketch,
+    LocalStringIndexerCache,
+    StringIndexerCache,
+)
+from sentry.sentry_metrics.indexer.mock import RawSimpleIndexer
 from sentry.sentry_metrics.use_case_id_registry import UseCaseID
 from sentry.testutils.helpers.options import override_options
+from sentry.testutils.skips import requires_benchmark
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
 
@@ -240,3 +251,133 @@ def test_is_valid_timestamp() -> None:
 
     assert not indexer_cache._is_valid_timestamp(str(stale_ts))
     assert indexer_cache._is_valid_timestamp(str(new_ts))
+
+
+def test_frequency_sketch() -> None:
+    sketch = FrequencySketch(10)
+    for _ in range(5):
+        sketch.increment("hot")
+    sketch.increment("cold")
+
+    assert sketch.estimate("hot") >= 5
+    assert sketch.estimate("hot") > sketch.estimate("cold") >= 1
+
+    # Counters saturate, and are halved once enough increments have been seen
+    for _ in range(20):
+        sketch.increment("hot")
+    assert sketch.estimate("hot") == 15
+
+    i = 0
+    while sketch.estimate("hot") == 15:
+        sketch.increment(f"other-{i}")
+        i += 1
+    assert sketch.estimate("hot") == 7
+    assert i <= 100
+
+
+def test_local_cache_admission() -> None:
+    local_cache = LocalStringIndexerCache(maxsize=2)
+    for _ in range(3):
+        local_cache.get_many(["a", "b"])
+    local_cache.set_many({"a": 1, "b": 2})
+
+    # A one-off key doesn't push out keys that are looked up more often
+    local_cache.get_many(["c"])
+    local_cache.set_many({"c": 3})
+    assert local_cache.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+
+    # But it replaces the least recently used key once it is popular
+    for _ in range(10):
+        local_cache.get_many(["c"])
+    local_cache.get_many(["b"])
+    local_cache.set_many({"c": 3})
+    assert local_cache.get_many(["a", "b", "c"]) == {"b": 2, "c": 3}
+    assert len(local_cache) == 2
+
+
+def test_local_cache_ttl() -> None:
+    local_cache = LocalStringIndexerCache(maxsize=10, ttl=100)
+    with patch("sentry.sentry_metrics.indexer.cache.time.monotonic", return_value=1000):
+        local_cache.set_many({"a": 1})
+    with patch("sentry.sentry_metrics.indexer.cache.time.monotonic", return_value=1099):
+        assert local_cache.get_many(["a"]) == {"a": 1}
+    # TTLs are jittered by up to 25%, like the ones in memcache
+    with patch("sentry.sentry_metrics.indexer.cache.time.monotonic", return_value=1126):
+        assert local_cache.get_many(["a"]) == {}
+    assert len(local_cache) == 0
+
+
+def test_caching_indexer_local_cache(use_case_id: str) -> None:
+    with override_options(
+        {
+            "sentry-metrics.indexer.read-new-cache-namespace": False,
+            "sentry-metrics.indexer.write-new-cache-namespace": False,
+            "sentry-metrics.indexer.local-cache.enabled": True,
+        }
+    ):
+        cache.clear()
+        indexer = CachingIndexer(indexer_cache, RawSimpleIndexer())
+        use_case = UseCaseID(use_case_id)
+        strings = {use_case: {1: {"a", "b"}}}
+
+        first = indexer.bulk_record(strings)
+        assert first.get_fetch_metadata()[use_case][1]["a"].fetch_type == FetchType.FIRST_SEEN
+
+        with patch.object(indexer_cache, "get_many", wraps=indexer_cache.get_many) as get_many:
+            second = indexer.bulk_record(strings)
+
+        # Everything is served from the in-process cache
+        assert not get_many.called
+        assert second[use_case][1] == first[use_case][1]
+        assert second.get_fetch_metadata()[use_case][1]["a"].fetch_type == FetchType.CACHE_HIT
+
+        # Only keys missing from the in-process cache are looked up in memcache
+        indexer_cache.set_many(BULK_RECORD_CACHE_NAMESPACE, {f"{use_case_id}:1:c": 5})
+        with patch.object(indexer_cache, "get_many", wraps=indexer_cache.get_many) as get_many:
+            third = indexer.bulk_record({use_case: {1: {"a", "c"}}})
+        get_many.assert_called_once_with(BULK_RECORD_CACHE_NAMESPACE, [f"{use_case_id}:1:c"])
+        assert third[use_case][1]["c"] == 5
+
+
+@requires_benchmark
+@pytest.mark.parametrize("skew", [0.8, 1.1])
+@pytest.mark.parametrize("local_cache", [False, True])
+def test_benchmark_bulk_record(benchmark, skew: float, local_cache: bool) -> None:
+    # Strings of a batch follow a zipf distribution over many distinct tag
+    # values, spread over a few organizations.
+    rng = random.Random(0)
+    population = [(i % 50, f"tag-value-{i}") for i in range(50000)]
+    weights = [1 / (rank + 1) ** skew for rank in range(len(population))]
+    batches = []
+    for _ in range(20):
+        strings: dict[int, set[str]] = {}
+        for org_id, string in rng.choices(population, weights, k=1000):
+            strings.setdefault(org_id, set()).add(string)
+        batches.append({UseCaseID.TRANSACTIONS: strings})
+
+    with override_options(
+        {
+            "sentry-metrics.indexer.read-new-cache-namespace": False,
+            "sentry-metrics.indexer.write-new-cache-namespace": False,
+            "sentry-metrics.indexer.local-cache.enabled": local_cache,
+        }
+    ):
+        cache.clear()
+        indexer = CachingIndexer(indexer_cache, RawSimpleIndexer())
+        # Warm up both tiers
+        for batch in batches:
+            indexer.bulk_record(batch)
+
+        def run() -> None:
+            for batch in batches:
+                indexer.bulk_record(batch)
+
+        benchmark(run)
+
+        with patch.object(indexer_cache, "get_many", wraps=indexer_cache.get_many) as get_many:
+            run()
+
+    lookups = sum(len(call.args[1]) for call in get_many.call_args_list)
+    total = sum(len(strs) for batch in batches for strs in batch[UseCaseID.TRANSACTIONS].values())
+    benchmark.extra_info["memcache_lookups_per_batch"] = lookups / len(batches)
+    benchmark.extra_info["local_hit_ratio"] = 1 - lookups / total
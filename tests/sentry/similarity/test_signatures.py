@@ -1,8 +1,10 @@
 from collections import Counter
 
+import mmh3
 import pytest
 
 from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.testutils.skips import requires_benchmark
 
 
 def test_signatures() -> None:
@@ -24,3 +26,29 @@ def test_signatures() -> None:
     estimation = results[True] / float(sum(results.values()))
 
     assert similarity == pytest.approx(estimation, 0.1)
+
+
+def test_build_many() -> None:
+    get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+    feature_sets = [["foo", "bar"], ["bar", "baz", "bar"], ["qux"]]
+
+    expected = [
+        [min(mmh3.hash(feature, column) % 0xFFFF for feature in features) for column in range(16)]
+        for features in feature_sets
+    ]
+    assert get_signature.build_many(feature_sets) == expected
+    # Cached hashes give the same result.
+    assert [get_signature(features) for features in feature_sets] == expected
+
+
+@requires_benchmark
+def test_benchmark_signatures(benchmark) -> None:
+    # Character shingles of messages that share most of their text, similar to
+    # the events of a single issue.
+    messages = [f"invalid literal for int() with base 10: 'value-{i}'" for i in range(100)]
+    feature_sets = [{message[i : i + 5] for i in range(len(message) - 4)} for message in messages]
+
+    get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+    signatures = benchmark(get_signature.build_many, feature_sets)
+    assert len(signatures) == len(feature_sets)
+    benchmark.extra_info["signatures_per_second"] = len(feature_sets) / benchmark.stats.stats.mean
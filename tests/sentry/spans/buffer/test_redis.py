@@ -1,4 +1,23 @@
-from sentry.spans.buffer.redis import RedisSpansBuffer
+import pytest
+
+from sentry.spans.buffer.redis import BufferedSpan, RedisSpansBuffer
+from sentry.testutils.skips import requires_benchmark
+
+
+def make_spans(segments: int, spans_per_segment: int, partitions: int) -> list[BufferedSpan]:
+    # Spans of a segment arrive interleaved with the spans of other segments,
+    # one second apart.
+    return [
+        BufferedSpan(
+            project_id=1,
+            segment_id=f"segment_{segment}",
+            timestamp=1710280889 + i,
+            partition=segment % partitions,
+            span=f'{{"segment_id": "segment_{segment}", "span": {i}}}'.encode(),
+        )
+        for i in range(spans_per_segment)
+        for segment in range(segments)
+    ]
 
 
 class TestRedisSpansBuffer:
@@ -42,3 +61,81 @@ class TestRedisSpansBuffer:
             "bar", "foo", 1710280890, 0, b"other span data"
         )
         assert should_process is True
+
+    def test_write_spans(self):
+        spans = [
+            BufferedSpan("bar", "foo", 1710280889, 0, b"span data"),
+            BufferedSpan("baz", "foo", 1710280889, 1, b"span data"),
+            BufferedSpan("bar", "foo", 1710280890, 0, b"other span data"),
+            BufferedSpan("bar", "foo", 1710280890, 0, b"span data 3"),
+        ]
+
+        buffer = RedisSpansBuffer()
+        assert buffer.write_spans_and_check_processing(spans) == {0: 1710280890}
+        assert buffer.client.ttl("segment:foo:bar:process-segment") == 300
+        assert buffer.client.lrange(
+            "performance-issues:unprocessed-segments:partition:0", 0, -1
+        ) == [b'[1710280889,"segment:foo:bar:process-segment"]']
+        assert buffer.client.lrange(
+            "performance-issues:unprocessed-segments:partition:1", 0, -1
+        ) == [b'[1710280889,"segment:foo:baz:process-segment"]']
+
+        assert buffer.read_and_expire_many_segments(
+            ["segment:foo:bar:process-segment", "segment:foo:baz:process-segment"]
+        ) == [[b"span data", b"other span data", b"span data 3"], [b"span data"]]
+
+        # The last processed timestamp carries over to the next batch.
+        assert buffer.write_spans_and_check_processing(spans[1:2]) == {}
+        assert buffer.write_spans_and_check_processing(
+            [BufferedSpan("baz", "foo", 1710280891, 1, b"span data")]
+        ) == {1: 1710280891}
+
+    def test_write_spans_matches_single_writes(self):
+        spans = make_spans(segments=5, spans_per_segment=3, partitions=2)
+
+        buffer = RedisSpansBuffer()
+        expected = {}
+        for span in spans:
+            if buffer.write_span_and_check_processing(
+                span.project_id, span.segment_id, span.timestamp, span.partition, span.span
+            ):
+                expected[span.partition] = span.timestamp
+        single = {
+            partition: buffer.client.lrange(
+                f"performance-issues:unprocessed-segments:partition:{partition}", 0, -1
+            )
+            for partition in range(2)
+        }
+        buffer.client.flushdb()
+
+        assert buffer.write_spans_and_check_processing(spans) == expected
+        for partition in range(2):
+            assert (
+                buffer.client.lrange(
+                    f"performance-issues:unprocessed-segments:partition:{partition}", 0, -1
+                )
+                == single[partition]
+            )
+
+
+@requires_benchmark
+@pytest.mark.parametrize("bulk", [False, True], ids=["single", "bulk"])
+def test_benchmark_write_spans(benchmark, bulk):
+    buffer = RedisSpansBuffer()
+    batches = [make_spans(segments=20, spans_per_segment=5, partitions=4) for _ in range(10)]
+
+    def write():
+        for spans in batches:
+            if bulk:
+                buffer.write_spans_and_check_processing(spans)
+            else:
+                for span in spans:
+                    buffer.write_span_and_check_processing(
+                        span.project_id, span.segment_id, span.timestamp, span.partition, span.span
+                    )
+
+    try:
+        benchmark.pedantic(write, setup=buffer.client.flushdb, rounds=5)
+        benchmark.extra_info["spans"] = sum(len(spans) for spans in batches)
+    finally:
+        buffer.client.flushdb()
@@ -123,6 +123,41 @@ def test_consumer_pushes_to_redis():
     ]
 
 
+@override_options(
+    {
+        "standalone-spans.process-spans-consumer.enable": True,
+        "standalone-spans.process-spans-consumer.project-allowlist": [1],
+        "standalone-spans.process-spans-consumer.batch-writes": True,
+    }
+)
+def test_consumer_pushes_to_redis_in_batches():
+    redis_client = get_redis_client()
+
+    topic = ArroyoTopic(get_topic_definition(Topic.SNUBA_SPANS)["real_topic_name"])
+    partition = Partition(topic, 0)
+    strategy = process_spans_strategy().create_with_partitions(
+        commit=mock.Mock(),
+        partitions={},
+    )
+
+    span_data = build_mock_span(project_id=1, is_segment=True)
+    message1 = build_mock_message(span_data, topic)
+    strategy.submit(make_payload(message1, partition))
+
+    span_data = build_mock_span(project_id=1)
+    message2 = build_mock_message(span_data, topic)
+    strategy.submit(make_payload(message2, partition, 2))
+
+    strategy.poll()
+    strategy.join(1)
+    strategy.terminate()
+
+    assert redis_client.lrange("segment:a49b42af9fb69da0:1:process-segment", 0, -1) == [
+        message1.value().encode("utf-8"),
+        message2.value().encode("utf-8"),
+    ]
+
+
 @django_db_all
 @override_options(
     {
@@ -1,3 +1,4 @@
+import threading
 import uuid
 from unittest import mock
 
@@ -9,7 +10,7 @@ from sentry.digests.backends.redis import RedisBackend
 from sentry.digests.notifications import event_to_record
 from sentry.models.projectownership import ProjectOwnership
 from sentry.models.rule import Rule
-from sentry.tasks.digests import deliver_digest
+from sentry.tasks.digests import deliver_digest, deliver_digests
 from sentry.testutils.cases import TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.testutils.skips import requires_snuba
@@ -77,3 +78,68 @@ class DeliverDigestTest(TestCase):
     def test_no_records(self):
         # This shouldn't error if no records are present
         deliver_digest(f"mail:p:{self.project.id}:IssueOwners:")
+
+
+class DeliverDigestsTest(TestCase):
+    def add_records(self, backend: RedisBackend) -> list[str]:
+        projects = (self.project, self.create_project())
+        keys = [f"mail:p:{project.id}:IssueOwners::AllMembers" for project in projects]
+        for project, key in zip(projects, keys):
+            rule = Rule.objects.create(project=project, label="Test Rule", data={})
+            ProjectOwnership.objects.create(project_id=project.id, fallthrough=True)
+            for fingerprint in ("group-1", "group-2"):
+                event = self.store_event(
+                    data={
+                        "timestamp": iso_format(before_now(days=1)),
+                        "fingerprint": [fingerprint],
+                    },
+                    project_id=project.id,
+                )
+                backend.add(key, event_to_record(event, [rule]), increment_delay=0, maximum_delay=0)
+        return keys
+
+    def test_batch(self):
+        with (
+            mock.patch.object(sentry, "digests") as digests,
+            self.options({"digests.batch-delivery.workers": 1}),
+        ):
+            backend = RedisBackend()
+            digests.digest_many = backend.digest_many
+            keys = self.add_records(backend)
+
+            with self.tasks():
+                deliver_digests(
+                    [(key, None) for key in keys] + [("mail:p:0:IssueOwners::AllMembers", None)]
+                )
+
+        assert len(mail.outbox) == 2
+        assert all("2 new alerts since" in message.subject for message in mail.outbox)
+        digests.delete.assert_called_once_with("mail:p:0:IssueOwners::AllMembers")
+
+    def test_batch_threaded(self):
+        main_thread = threading.get_ident()
+        closed_threads = set()
+
+        def close_all():
+            closed_threads.add(threading.get_ident())
+
+        with (
+            mock.patch.object(sentry, "digests") as digests,
+            mock.patch("sentry.mail.mail_adapter.notify_digest") as notify_digest,
+            mock.patch("sentry.tasks.digests.connections") as connections,
+            self.options({"digests.batch-delivery.workers": 2}),
+        ):
+            connections.close_all.side_effect = close_all
+            backend = RedisBackend()
+            digests.digest_many = backend.digest_many
+            keys = self.add_records(backend)
+
+            with self.tasks():
+                deliver_digests([(key, None) for key in keys])
+
+        # Notifications are sent, and the connections closed, from the pool's threads only.
+        assert sorted(call.args[0].id for call in notify_digest.call_args_list) == sorted(
+            int(key.split(":")[2]) for key in keys
+        )
+        assert closed_threads
+        assert main_thread not in closed_threads
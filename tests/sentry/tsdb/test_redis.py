@@ -1,10 +1,13 @@
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
+from unittest import mock
 
 import pytest
 
 from sentry.testutils.cases import TestCase
+from sentry.testutils.helpers.datetime import freeze_time
 from sentry.testutils.helpers.options import override_options
+from sentry.testutils.skips import requires_benchmark
 from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
 from sentry.tsdb.redis import CountMinScript, RedisTSDB, SuppressionWrapper
 from sentry.utils.dates import to_datetime
@@ -185,6 +188,101 @@ class RedisTSDBTest(TestCase):
         sum_results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert sum_results == {1: 0, 2: 0}
 
+    def test_get_range_counter_scripts(self):
+        now = datetime.now(timezone.utc)
+        keys = list(range(1, 201))
+        for i in range(48):
+            self.db.incr_multi(
+                [(TSDBModel.group, key) for key in keys if key % (i + 1) == 0],
+                now - timedelta(hours=i),
+                count=i + 1,
+                environment_id=1,
+            )
+
+        start = now - timedelta(days=2)
+        for environment_ids in (None, [1], [2]):
+            expected = self.db.get_range(
+                TSDBModel.group, keys, start, now, environment_ids=environment_ids
+            )
+            self.db.enable_counter_scripts = True
+            try:
+                results = self.db.get_range(
+                    TSDBModel.group, keys, start, now, environment_ids=environment_ids
+                )
+            finally:
+                self.db.enable_counter_scripts = False
+            assert results == expected
+            assert any(count for _, count in results[1]) == (environment_ids != [2])
+
+    def test_rollup_compaction(self):
+        # In the middle of an hour, and in the future so that nothing expires.
+        now = (datetime.now(timezone.utc) + timedelta(hours=1)).replace(
+            minute=30, second=0, microsecond=0
+        )
+        hash_key, hash_field = self.db.make_counter_key(TSDBModel.project, ONE_HOUR, now, 1, None)
+
+        def get_hourly_count():
+            with self.db.cluster.map() as client:
+                promise = client.hget(hash_key, hash_field)
+            return int(promise.value or 0)
+
+        def get_sums(**kwargs):
+            return self.db.get_sums(
+                TSDBModel.project, [1], now - timedelta(minutes=5), now, **kwargs
+            )
+
+        with freeze_time(now):
+            self.db.enable_rollup_compaction = True
+            try:
+                # Nothing to compact before the first write.
+                assert self.db.compact_rollups(now) == 0
+
+                self.db.incr(TSDBModel.project, 1, now - timedelta(seconds=30), count=2)
+                self.db.incr(TSDBModel.project, 1, now, count=3, environment_id=1)
+                # Late writes go to every rollup.
+                self.db.incr(TSDBModel.project, 1, now - timedelta(minutes=4), count=7)
+
+                # Only the finest rollup is written, coarser rollups are completed
+                # with uncompacted buckets when reading.
+                assert get_hourly_count() == 7
+                assert get_sums(rollup=10) == {1: 12}
+                assert get_sums(rollup=ONE_HOUR) == {1: 12}
+                assert get_sums(rollup=ONE_HOUR, environment_id=1) == {1: 3}
+
+                later = now + timedelta(minutes=3)
+                assert self.db.compact_rollups(later) > 0
+                assert get_hourly_count() == 12
+                assert get_sums(rollup=10) == {1: 12}
+                assert get_sums(rollup=ONE_HOUR) == {1: 12}
+                assert get_sums(rollup=ONE_DAY, environment_id=1) == {1: 3}
+
+                # Compaction interrupted before advancing the watermark is retried
+                # without counting buckets twice.
+                with self.db.cluster.map() as client:
+                    client.set(self.db.get_compaction_watermark_key(), 0)
+                self.db.compact_rollups(later)
+                assert get_hourly_count() == 12
+                assert get_sums(rollup=ONE_HOUR) == {1: 12}
+
+                # Before compaction is disabled, the current bucket is compacted
+                # as well.
+                soon = now + timedelta(seconds=90)
+                self.db.incr(TSDBModel.project, 1, soon, count=5)
+                assert get_hourly_count() == 12
+                assert self.db.compact_rollups(soon, final=True) > 0
+                self.db.reset_compaction_watermark()
+                assert get_hourly_count() == 17
+
+                # Writers that still have compaction enabled initialize the
+                # watermark again.
+                with mock.patch("sentry.tsdb.redis.COMPACTION_WATERMARK_CHECK_INTERVAL", 0):
+                    self.db.incr(TSDBModel.project, 1, soon, count=1)
+                assert self.db.get_compaction_watermark(self.db.cluster) == (
+                    self.db.normalize_to_rollup(now - timedelta(seconds=60), 10)
+                )
+            finally:
+                self.db.enable_rollup_compaction = False
+
     def test_count_distinct(self):
         now = datetime.now(timezone.utc) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -323,6 +421,43 @@ class RedisTSDBTest(TestCase):
         )
         assert results == {1: 0, 2: 0}
 
+    def test_distinct_counts_union_cache(self):
+        model = TSDBModel.users_affected_by_group
+        now = datetime.now(timezone.utc)
+        dts = [now - timedelta(hours=i) for i in range(4, -1, -1)]
+
+        self.db.record(model, 1, ("foo", "bar"), dts[0])
+        self.db.record(model, 2, ("bar", "baz"), dts[1])
+        self.db.record(model, 1, ("qux",), dts[2], environment_id=1)
+
+        def get_union(**kwargs):
+            return self.db.get_distinct_counts_union(
+                model, [1, 2], dts[0], dts[-1], rollup=3600, **kwargs
+            )
+
+        self.db.enable_union_cache = True
+        try:
+            assert get_union() == 4
+            assert get_union(environment_id=1) == 1
+
+            # Only the current period is merged on top of the cached union.
+            self.db.record(model, 2, ("quux",), dts[-1])
+            self.db.record(model, 1, ("corge",), dts[-2])
+            assert get_union() == 5
+
+            # A shorter window with the same start doesn't see later periods.
+            assert (
+                self.db.get_distinct_counts_union(model, [1, 2], dts[0], dts[1], rollup=3600) == 3
+            )
+
+            with self.db.cluster.all() as client:
+                cached = client.keys("ts:u:*")
+            assert any(cached.value.values())
+        finally:
+            self.db.enable_union_cache = False
+
+        assert get_union() == 6
+
     def test_frequency_tables(self):
         now = datetime.now(timezone.utc)
         model = TSDBModel.frequent_issues_by_project
@@ -817,3 +952,33 @@ class RedisTSDBTest(TestCase):
             [b"eta", b"7"],
             [b"bar", b"7"],
         ]
+
+
+@requires_benchmark
+@pytest.mark.parametrize("enable_counter_scripts", [False, True], ids=["hget", "script"])
+def test_benchmark_get_range(benchmark, enable_counter_scripts):
+    with override_options(
+        {"redis.clusters": {"tsdb": {"hosts": {i - 6: {"db": i} for i in range(6, 9)}}}}
+    ):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24 * 14), (ONE_DAY, 30)),
+            vnodes=64,
+            enable_counter_scripts=enable_counter_scripts,
+            cluster="tsdb",
+        )
+    now = datetime.now(timezone.utc)
+    keys = list(range(1, 101))
+    try:
+        for hours in range(0, 24 * 14, 3):
+            db.incr_multi([(TSDBModel.group, key) for key in keys], now - timedelta(hours=hours))
+
+        results = benchmark(
+            db.get_range, TSDBModel.group, keys, now - timedelta(days=14), now, rollup=ONE_HOUR
+        )
+        assert len(results) == len(keys)
+        assert sum(count for _, count in results[1]) == 24 * 14 // 3
+        benchmark.extra_info["keys"] = len(keys)
+        benchmark.extra_info["points"] = len(results[1])
+    finally:
+        with db.cluster.all() as client:
+            client.flushdb()